@@ -0,0 +1,85 @@
+"""
+Throughput benchmark for the registered output writers.
+
+Usage:
+    python benchmarks/bench_exporters.py --rows 200000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from outputs.exporter import EXPORTERS, export_flights  # noqa: E402
+
+AIRPORTS = ["VIE", "BCN", "STN", "DUB", "BGY", "CRL", "MAD", "WMI"]
+
+def synthetic_flights(rows: int) -> Iterator[Dict[str, Any]]:
+    for i in range(rows):
+        origin = AIRPORTS[i % len(AIRPORTS)]
+        destination = AIRPORTS[(i * 3 + 1) % len(AIRPORTS)]
+        day = 1 + i % 28
+        yield {
+            "Origin": origin,
+            "Destination": destination,
+            "Flight duration": "02:20",
+            "Flight number": f"FR {1000 + i % 9000}",
+            "Price": 9.99 + (i % 500) * 0.37,
+            "Time departure": f"2021-05-{day:02d}T16:55:00.000",
+            "Time arrival": f"2021-05-{day:02d}T19:15:00.000",
+            "key": f"FR~{1000 + i % 9000}~ ~~{origin}~05/{day:02d}/2021 16:55~{destination}~~{i}",
+            "scrapedAt": "2021-03-16T14:56:12.589Z",
+            "regularFare": {
+                "fareClass": "W",
+                "fares": [{"type": "ADT", "amount": 19.79, "count": 1, "hasDiscount": i % 2 == 0}],
+            },
+            "operatedBy": "Buzz",
+        }
+
+def bench(rows: int, formats: List[str], compressions: List[Optional[str]]) -> List[Dict[str, Any]]:
+    data = list(synthetic_flights(rows))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            for compression in compressions:
+                path = Path(tmp) / f"out.{fmt}.{compression or 'raw'}"
+                started = time.perf_counter()
+                try:
+                    written = export_flights(data, path, fmt, compression=compression)
+                except RuntimeError as exc:  # optional dependency missing
+                    print(f"{fmt:<9} {compression or '-':<5} skipped: {exc}")
+                    continue
+                elapsed = time.perf_counter() - started
+                size = path.stat().st_size
+                result = {
+                    "format": fmt,
+                    "compression": compression,
+                    "rows": written,
+                    "seconds": round(elapsed, 4),
+                    "rowsPerSecond": round(written / elapsed),
+                    "bytes": size,
+                }
+                results.append(result)
+                print(
+                    f"{fmt:<9} {compression or '-':<5} {result['rowsPerSecond']:>10,} rows/s "
+                    f"{size / 1e6:>9.2f} MB"
+                )
+    return results
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark output writers.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--formats", nargs="*", default=sorted(EXPORTERS))
+    parser.add_argument("--compressions", nargs="*", default=["none", "gzip"])
+    args = parser.parse_args(argv)
+    compressions = [None if c == "none" else c for c in args.compressions]
+    bench(args.rows, args.formats, compressions)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Local stand-in for the Ryanair availability endpoint, for offline benchmarks.
+
+Usage as a standalone server:
+    python benchmarks/mock_server.py --port 8099 --latency-ms 20 --error-rate 0.01
+
+or from code:
+    with MockAvailabilityServer(latency=0.02, throttle_rate=0.05) as server:
+        client = RyanairApiClient(server.url)
+"""
+import argparse
+import gzip as gzip_module
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+AIRPORTS = ["VIE", "BCN", "STN", "DUB", "BGY", "CRL", "MAD", "WMI"]
+
+def synthetic_availability(
+    origin: str,
+    destination: str,
+    date_out: str,
+    days: int = 1,
+    trips: int = 1,
+    flights_per_day: int = 10,
+    adults: int = 1,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Build an availability payload shaped like the real endpoint's, including
+    the fields the scraper ignores (segments, fare keys, ...) so decode cost
+    is realistic.
+    """
+    rng = random.Random(f"{seed}|{origin}|{destination}|{date_out}")
+    start = date.fromisoformat(date_out)
+    trip_list: List[Dict[str, Any]] = []
+    for trip_index in range(trips):
+        trip_origin, trip_destination = (origin, destination) if trip_index % 2 == 0 else (destination, origin)
+        dates = []
+        for day_offset in range(days):
+            day = (start + timedelta(days=day_offset)).isoformat()
+            flights = []
+            for number in range(flights_per_day):
+                hour = 5 + (number * 17) % 18
+                minute = (number * 7) % 60
+                departure = f"{day}T{hour:02d}:{minute:02d}:00.000Z"
+                arrival = f"{day}T{min(23, hour + 2):02d}:{minute:02d}:00.000Z"
+                flight_number = f"FR {1000 + (trip_index * 997 + number * 31) % 9000}"
+                amount = round(9.99 + rng.random() * 190, 2)
+                flights.append(
+                    {
+                        "faresLeft": rng.choice([-1, -1, -1, 1, 3, 5]),
+                        "flightKey": f"{flight_number}~ ~~{trip_origin}~{departure}~{trip_destination}~{arrival}~~",
+                        "infantsLeft": rng.randint(0, 18),
+                        "regularFare": {
+                            "fareKey": f"{rng.getrandbits(64):016X}",
+                            "fareClass": rng.choice("ABCWZ"),
+                            "fares": [
+                                {
+                                    "type": "ADT",
+                                    "amount": amount,
+                                    "count": adults,
+                                    "hasDiscount": False,
+                                    "publishedFare": amount,
+                                    "discountInPercent": 0,
+                                    "hasPromoDiscount": False,
+                                    "discountAmount": 0.0,
+                                    "hasBogof": False,
+                                }
+                            ],
+                        },
+                        "operatedBy": rng.choice(["", "Buzz", "Malta Air", "Lauda Europe"]),
+                        "segments": [
+                            {
+                                "segmentNr": 0,
+                                "origin": trip_origin,
+                                "destination": trip_destination,
+                                "flightNumber": flight_number,
+                                "time": [departure[:-1], arrival[:-1]],
+                                "timeUTC": [departure, arrival],
+                                "duration": "02:00",
+                            }
+                        ],
+                        "flightNumber": flight_number,
+                        "time": [departure[:-1], arrival[:-1]],
+                        "timeUTC": [departure, arrival],
+                        "duration": "02:00",
+                        "key": f"{flight_number}~ ~~{trip_origin}~{day}~{trip_destination}~~{number}",
+                    }
+                )
+            dates.append({"dateOut": f"{day}T00:00:00.000", "flights": flights})
+        trip_list.append(
+            {
+                "origin": trip_origin,
+                "originName": trip_origin,
+                "destination": trip_destination,
+                "destinationName": trip_destination,
+                "routeGroup": "CITY",
+                "tripType": "REGULAR",
+                "upgradeType": "PLUS",
+                "dates": dates,
+            }
+        )
+    return {
+        "termsOfUse": "https://www.ryanair.com/ie/en/useful-info/help-centre/terms-and-conditions",
+        "currency": "EUR",
+        "currPrecision": 2,
+        "routeGroup": "CITY",
+        "tripType": "REGULAR",
+        "upgradeType": "PLUS",
+        "trips": trip_list,
+        "serverTimeUTC": "2024-01-01T00:00:00.000Z",
+    }
+
+class MockAvailabilityServer:
+    """
+    Threaded HTTP server answering availability requests with synthetic payloads.
+
+    Each request sleeps `latency` (+ up to `jitter`) seconds, then fails with
+    503 with probability `error_rate`, or 429 (with `Retry-After`) with
+    probability `throttle_rate`. Otherwise it returns a payload covering
+    `FlexDaysOut + 1` days with `flights_per_day` flights on each of `trips`
+    trips; encoded payloads are cached per query so the server costs little
+    CPU next to the client under test.
+
+    With `gzip` the body is gzip-encoded for clients that accept it; with
+    `etags` responses carry an `ETag` and matching `If-None-Match` requests
+    get an empty 304.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        trips: int = 1,
+        flights_per_day: int = 10,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+        gzip: bool = False,
+        etags: bool = False,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.trips = trips
+        self.flights_per_day = flights_per_day
+        self.seed = seed
+        self.gzip = gzip
+        self.etags = etags
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "not_modified": 0}
+        self._payloads: Dict[Tuple[str, ...], bytes] = {}
+        # payload bytes -> (etag, gzipped body); bytes cache their hash, so lookups are cheap
+        self._encoded: Dict[bytes, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/availability"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                status, headers, body = server.respond(parse_qs(urlparse(self.path).query), self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def payload(self, params: Dict[str, List[str]]) -> bytes:
+        def first(name: str, default: str) -> str:
+            return params.get(name, [default])[0]
+
+        key = (
+            first("Origin", "VIE"),
+            first("Destination", "BCN"),
+            first("DateOut", date.today().isoformat()),
+            first("FlexDaysOut", "0"),
+            first("ADT", "1"),
+        )
+        with self._lock:
+            cached = self._payloads.get(key)
+        if cached is None:
+            response = synthetic_availability(
+                key[0],
+                key[1],
+                key[2],
+                days=int(key[3]) + 1,
+                trips=self.trips,
+                flights_per_day=self.flights_per_day,
+                adults=int(key[4]),
+                seed=self.seed,
+            )
+            cached = json.dumps(response, separators=(",", ":")).encode("utf-8")
+            with self._lock:
+                self._payloads[key] = cached
+        return cached
+
+    def respond(
+        self, params: Dict[str, List[str]], request_headers: Optional[Any] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        with self._lock:
+            self.counts["requests"] += 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+            roll = self._random.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            with self._lock:
+                self.counts["errors"] += 1
+            return 503, {"Content-Type": "application/json"}, b'{"message":"Service Unavailable"}'
+        if roll < self.error_rate + self.throttle_rate:
+            with self._lock:
+                self.counts["throttled"] += 1
+            headers = {"Content-Type": "application/json", "Retry-After": f"{self.retry_after:g}"}
+            return 429, headers, b'{"message":"Too Many Requests"}'
+        body = self.payload(params)
+        request_headers = request_headers or {}
+        headers = {"Content-Type": "application/json"}
+        with self._lock:
+            encoded = self._encoded.get(body)
+        if encoded is None and (self.etags or self.gzip):
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            encoded = (etag, gzip_module.compress(body, compresslevel=5) if self.gzip else b"")
+            with self._lock:
+                self._encoded[body] = encoded
+        if self.etags:
+            etag = encoded[0]
+            if request_headers.get("If-None-Match") == etag:
+                with self._lock:
+                    self.counts["not_modified"] += 1
+                return 304, {"ETag": etag}, b""
+            headers["ETag"] = etag
+        if self.gzip and "gzip" in (request_headers.get("Accept-Encoding") or ""):
+            body = encoded[1]
+            headers["Content-Encoding"] = "gzip"
+        with self._lock:
+            self.counts["ok"] += 1
+        return 200, headers, body
+
+    def start(self) -> "MockAvailabilityServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockAvailabilityServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve synthetic Ryanair availability responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--trips", type=int, default=1)
+    parser.add_argument("--flights-per-day", type=int, default=10)
+    parser.add_argument("--gzip", action="store_true", help="gzip bodies for clients that accept it")
+    parser.add_argument("--etags", action="store_true", help="send ETags and answer If-None-Match with 304")
+    args = parser.parse_args(argv)
+
+    server = MockAvailabilityServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        trips=args.trips,
+        flights_per_day=args.flights_per_day,
+        gzip=args.gzip,
+        etags=args.etags,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving synthetic availability on {server.url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+if __name__ == "__main__":
+    main()
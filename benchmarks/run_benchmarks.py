@@ -0,0 +1,320 @@
+"""
+Offline benchmark suite: client, parser, exporter and end-to-end run_search,
+all against the local mock availability server.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --suites client e2e --latency-ms 20 --throttle-rate 0.05
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/baseline.json
+
+Results are written as JSON to benchmarks/results/ (or --output). With
+--baseline, throughput metrics that dropped by more than --tolerance exit
+with status 1, so the suite can gate CI.
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for path in (SRC, Path(__file__).resolve().parent):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from bench_exporters import synthetic_flights  # noqa: E402
+from flights.api_client import RyanairApiClient  # noqa: E402
+from flights.parser import parse_availability_response  # noqa: E402
+from flights.schema import build_availability_decoder  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from main import run_search  # noqa: E402
+from mock_server import MockAvailabilityServer, synthetic_availability  # noqa: E402
+from outputs.exporter import export_flights  # noqa: E402
+from utils.json_backend import available_backends  # noqa: E402
+from utils.logger import get_logger  # noqa: E402
+from utils.retry import RetryPolicy  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Metrics where higher is better; everything compared against a baseline.
+THROUGHPUT_METRICS = ("requestsPerSecond", "rowsPerSecond", "searchesPerSecond")
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50Ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p99Ms": round(percentile(samples, 0.99) * 1000, 3),
+        "maxMs": round(max(samples, default=0.0) * 1000, 3),
+    }
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak Python heap allocation (bytes) while running `fn`, via tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _search_input(index: int, flex_days: int) -> Dict[str, Any]:
+    day = date(2030, 1, 1) + timedelta(days=index % 300)
+    data = {
+        "origin": "VIE",
+        "destination": ["BCN", "STN", "DUB", "MAD"][index % 4],
+        "dateFrom": day.isoformat(),
+        "tripType": "ONE_WAY",
+        "adults": 1,
+        "currency": "EUR",
+    }
+    if flex_days:
+        data["dateFromEnd"] = (day + timedelta(days=flex_days)).isoformat()
+    return data
+
+def bench_client(args: argparse.Namespace, server: MockAvailabilityServer) -> Dict[str, Any]:
+    queries = [FlightSearchQuery.from_dict(_search_input(i, args.flex_days)) for i in range(args.requests)]
+    latencies: List[float] = []
+    failures = 0
+    lock = threading.Lock()
+    policy = RetryPolicy(max_retries=args.max_retries, base_delay=args.retry_base_delay)
+    before = dict(server.counts)
+
+    with RyanairApiClient(server.url, retry_policy=policy, pool_maxsize=args.workers) as client:
+
+        def _one(query: FlightSearchQuery) -> None:
+            nonlocal failures
+            started = time.perf_counter()
+            try:
+                client.search_flights(query)
+            except RuntimeError:
+                with lock:
+                    failures += 1
+                return
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(_one, queries))
+        elapsed = time.perf_counter() - started
+
+    upstream = server.counts["requests"] - before["requests"]
+    return dict(
+        {
+            "searches": len(queries),
+            "failedSearches": failures,
+            "upstreamRequests": upstream,
+            "throttled": server.counts["throttled"] - before["throttled"],
+            "serverErrors": server.counts["errors"] - before["errors"],
+            "seconds": round(elapsed, 4),
+            "requestsPerSecond": round(upstream / elapsed, 1),
+            "searchesPerSecond": round(len(queries) / elapsed, 1),
+        },
+        **latency_summary(latencies),
+    )
+
+def bench_parser(args: argparse.Namespace) -> Dict[str, Any]:
+    payload = synthetic_availability(
+        "VIE",
+        "BCN",
+        "2030-01-01",
+        days=args.flex_days + 1,
+        trips=args.trips,
+        flights_per_day=args.flights_per_day,
+    )
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    decoders: List[Tuple[str, Any]] = [
+        (name, build_availability_decoder(schema=False, backend=name))
+        for name, installed in available_backends().items()
+        if installed
+    ]
+    if available_backends()["msgspec"]:
+        decoders.append(("msgspec+schema", build_availability_decoder(schema=True)))
+
+    results: Dict[str, Any] = {"payloadBytes": len(body)}
+    for name, decode in decoders:
+        rows = 0
+        samples: List[float] = []
+        deadline = time.perf_counter() + args.parse_seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            rows += len(parse_availability_response(decode(body)))
+            samples.append(time.perf_counter() - started)
+        total = sum(samples)
+        results[name] = dict(
+            {
+                "iterations": len(samples),
+                "rowsPerSecond": round(rows / total),
+                "peakBytes": peak_memory(lambda: parse_availability_response(decode(body))),
+            },
+            **latency_summary(samples),
+        )
+    return results
+
+def bench_exporter(args: argparse.Namespace) -> Dict[str, Any]:
+    data = list(synthetic_flights(args.rows))
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            path = Path(tmp) / f"out.{fmt}"
+            started = time.perf_counter()
+            try:
+                written = export_flights(data, path, fmt)
+            except RuntimeError as exc:  # optional dependency missing
+                results[fmt] = {"skipped": str(exc)}
+                continue
+            elapsed = time.perf_counter() - started
+            results[fmt] = {
+                "rows": written,
+                "seconds": round(elapsed, 4),
+                "rowsPerSecond": round(written / elapsed),
+                "bytes": path.stat().st_size,
+                "peakBytes": peak_memory(lambda: export_flights(data, Path(tmp) / f"mem.{fmt}", fmt)),
+            }
+    return results
+
+def bench_e2e(args: argparse.Namespace, server: MockAvailabilityServer) -> Dict[str, Any]:
+    settings = {
+        "baseUrl": server.url,
+        "timeoutSeconds": 10,
+        "retry": {"maxRetries": args.max_retries, "baseDelaySeconds": args.retry_base_delay},
+        "outputFormat": "jsonl",
+    }
+    samples: List[float] = []
+    rows = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = Path(tmp) / "out.jsonl"
+        for index in range(args.searches):
+            started = time.perf_counter()
+            try:
+                rows += len(run_search(_search_input(index, args.flex_days), settings, output_path))
+            except RuntimeError:
+                continue
+            samples.append(time.perf_counter() - started)
+        total = sum(samples)
+        peak = peak_memory(lambda: run_search(_search_input(0, args.flex_days), settings, output_path))
+    return dict(
+        {
+            "searches": args.searches,
+            "completed": len(samples),
+            "rows": rows,
+            "searchesPerSecond": round(len(samples) / total, 2) if total else 0.0,
+            "rowsPerSecond": round(rows / total) if total else 0,
+            "peakBytes": peak,
+        },
+        **latency_summary(samples),
+    )
+
+def _throughputs(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    found: Dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            found.update(_throughputs(value, name + "."))
+        elif key in THROUGHPUT_METRICS and isinstance(value, (int, float)):
+            found[name] = float(value)
+    return found
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Names of throughput metrics that fell more than `tolerance` below the baseline."""
+    now = _throughputs(current["results"])
+    regressions = []
+    for name, before in _throughputs(baseline["results"]).items():
+        after = now.get(name)
+        if after is not None and before > 0 and after < before * (1 - tolerance):
+            regressions.append(f"{name}: {before:,.1f} -> {after:,.1f} ({after / before - 1:+.1%})")
+    return regressions
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a mock availability server.")
+    parser.add_argument("--suites", nargs="*", default=["client", "parser", "exporter", "e2e"])
+    parser.add_argument("--requests", type=int, default=500, help="client: number of searches")
+    parser.add_argument("--workers", type=int, default=8, help="client: concurrent threads")
+    parser.add_argument("--searches", type=int, default=50, help="e2e: sequential run_search calls")
+    parser.add_argument("--rows", type=int, default=50_000, help="exporter: rows per format")
+    parser.add_argument("--formats", nargs="*", default=["json", "jsonl", "csv", "columnar"])
+    parser.add_argument("--parse-seconds", type=float, default=2.0, help="parser: time per decoder")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--trips", type=int, default=1)
+    parser.add_argument("--flex-days", type=int, default=6, help="days per search beyond the first")
+    parser.add_argument("--flights-per-day", type=int, default=20)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--retry-base-delay", type=float, default=0.05)
+    parser.add_argument("--output", type=str, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", type=str, help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop vs baseline")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_arg_parser().parse_args(argv)
+    get_logger("ryanair_scraper").setLevel(logging.WARNING)
+    logging.getLogger("flights.api_client").setLevel(logging.ERROR)
+
+    results: Dict[str, Any] = {}
+    server = MockAvailabilityServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        trips=args.trips,
+        flights_per_day=args.flights_per_day,
+    )
+    with server:
+        for suite in args.suites:
+            print(f"running {suite} ...", flush=True)
+            if suite == "client":
+                results[suite] = bench_client(args, server)
+            elif suite == "parser":
+                results[suite] = bench_parser(args)
+            elif suite == "exporter":
+                results[suite] = bench_exporter(args)
+            elif suite == "e2e":
+                results[suite] = bench_e2e(args, server)
+            else:
+                raise SystemExit(f"Unknown suite '{suite}'")
+            print(json.dumps(results[suite], indent=2))
+
+    report = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in {"output", "baseline"}},
+        "results": results,
+    }
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_path = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"results written to {output_path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
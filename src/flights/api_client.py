@@ -1,12 +1,276 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Dict, Optional
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
+try:  # optional dependency, only needed for AsyncRyanairApiClient
+    import aiohttp
+except ImportError:  # pragma: no cover - depends on environment
+    aiohttp = None
+
+from utils.metrics import REGISTRY
+from utils.proxy_manager import ProxyPool, ProxyUnavailableError, build_proxies, redact_proxy_url
+from utils.rate_limiter import LocalStateBackend, RateLimiter
+from utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+from .parser import merge_availability_responses
+from .revalidation import ACCEPT_ENCODING, ASYNC_ACCEPT_ENCODING, ValidatorStore, record_transfer
+from .schema import AvailabilityDecoder, build_availability_decoder
 from .validator import FlightSearchQuery
 
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ryanair_http_request_seconds",
+    "Latency of availability HTTP requests by proxy and status (status=error for network failures).",
+    ("proxy", "status"),
+)
+RETRIES = REGISTRY.counter("ryanair_http_retries_total", "Availability requests retried, by cause.", ("reason",))
+DECODE_SECONDS = REGISTRY.histogram("ryanair_decode_seconds", "Time spent decoding availability JSON.")
+SEARCH_SECONDS = REGISTRY.histogram(
+    "ryanair_search_seconds",
+    "Wall time of search_flights including flex windows and retries.",
+    ("outcome",),
+)
+
+def _observe_request(proxy_url: Optional[str], status: Any, started: float) -> None:
+    proxy = redact_proxy_url(proxy_url) if proxy_url else "direct"
+    REQUEST_SECONDS.observe(time.perf_counter() - started, proxy=proxy, status=status)
+
+# Largest forward flex window the availability endpoint accepts for one call.
+MAX_FLEX_DAYS = 6
+
+def plan_flex_windows(query: FlightSearchQuery, max_flex_days: int = MAX_FLEX_DAYS) -> List[FlightSearchQuery]:
+    """
+    Split a date-range query into the fewest single-call queries.
+
+    Each planned query starts on its window's first day and sets
+    `flex_days_out` to cover up to `max_flex_days` following days. Plain
+    single-date queries are returned unchanged.
+    """
+    if not query.date_from_end:
+        return [query]
+
+    current = date.fromisoformat(query.date_from)
+    end = date.fromisoformat(query.date_from_end)
+    windows: List[FlightSearchQuery] = []
+    while current <= end:
+        span = min(max_flex_days, (end - current).days)
+        windows.append(
+            replace(query, date_from=current.isoformat(), date_from_end=None, flex_days_out=span)
+        )
+        current += timedelta(days=span + 1)
+    return windows
+
+def _wire_bytes(headers: Any, body: bytes, raw: Any = None) -> int:
+    """Size of the body as transferred: Content-Length (pre-decoding), else bytes read off the socket."""
+    length = headers.get("Content-Length")
+    if length and str(length).isdigit():
+        return int(length)
+    tell = getattr(raw, "tell", None)
+    if callable(tell):
+        try:
+            read = int(tell())
+        except (TypeError, ValueError, OSError):
+            read = 0
+        if read > 0:
+            return read
+    return len(body)
+
+def _check_circuit(breaker: Optional[CircuitBreaker]) -> None:
+    if breaker is not None and not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit breaker open for Ryanair API; retry in {breaker.retry_in():.1f}s")
+
+def _record_outcome(breaker: Optional[CircuitBreaker], ok: bool) -> None:
+    if breaker is None:
+        return
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+def _abandon_attempt(breaker: Optional[CircuitBreaker], exc: Optional[BaseException] = None) -> None:
+    """
+    Settle the breaker for an attempt that ended without a response: errors
+    count as failures, cancellation and pre-request failures (`exc` None) only
+    free a half-open probe so the breaker cannot stay stuck half-open.
+    """
+    if breaker is None:
+        return
+    if isinstance(exc, Exception):
+        breaker.record_failure()
+    else:
+        breaker.release_probe()
+
+# What a client does next with a response, as decided by `_WindowAttempts.on_response`.
+_RETRY = "retry"  # sleep for the returned delay, then run another attempt
+_REISSUE = "reissue"  # repeat the request without validators, within the same attempt
+_REVALIDATED = "revalidated"  # 304: return the stored payload
+_READ = "read"  # check the status and decode the body
+
+class _WindowAttempts:
+    """
+    Attempt bookkeeping and retry decisions for one availability request.
+
+    Both clients drive the same sequence (circuit check, rate-limit token,
+    proxy, request, outcome accounting, retry or revalidation) and differ
+    only in their I/O, so everything that is not I/O lives here: the
+    clients call `begin()` before acquiring a token and a proxy, one of
+    `no_proxy` / `network_error` / `abandon` / `on_response` with the
+    outcome, and `read()` to decode a body.
+    """
+
+    def __init__(self, client: Any, params: Dict[str, Any], route: str) -> None:
+        self.client = client
+        self.route = route
+        self.store: Optional[ValidatorStore] = client.validator_store
+        self.key = self.store.key(params) if self.store is not None else ""
+        self.conditional = self.store is not None
+        self.policy: RetryPolicy = client.retry_policy
+        self.policy.on_request()
+        self.attempt = 0
+        self.last_exc: Optional[BaseException] = None
+        self._reissue = False
+
+    def begin(self) -> bool:
+        """Start an attempt; returns whether it needs a rate-limit token (a reissue does not)."""
+        reissue, self._reissue = self._reissue, False
+        # repeating an attempt whose validators were evicted is not a retry
+        if not reissue:
+            self.attempt += 1
+        _check_circuit(self.client.circuit_breaker)
+        return not reissue
+
+    def headers(self) -> Dict[str, str]:
+        headers = dict(self.client._request_headers)
+        if self.conditional:
+            headers.update(self.store.conditional_headers(self.key))
+        self.client.logger.debug("Requesting Ryanair availability, attempt %d", self.attempt)
+        return headers
+
+    def _retry_delay(self, reason: Any, retry_after: Optional[str] = None) -> Optional[float]:
+        if not self.policy.can_retry(self.attempt):
+            return None
+        RETRIES.inc(reason=reason)
+        return self.policy.compute_delay(self.attempt, retry_after)
+
+    def no_proxy(self, exc: BaseException) -> Optional[float]:
+        """No proxy freed up in time: the delay before the next attempt, or None to give up."""
+        _abandon_attempt(self.client.circuit_breaker)
+        self.last_exc = exc
+        self.client.logger.warning("No proxy available (attempt %d/%d)", self.attempt, self.policy.max_retries + 1)
+        return self._retry_delay("proxy")
+
+    def network_error(self, exc: BaseException, proxy_url: Optional[str], started: float) -> Optional[float]:
+        """A timeout or connection error: the delay before the next attempt, or None to give up."""
+        self.last_exc = exc
+        if self.client.proxy_pool and proxy_url:
+            self.client.proxy_pool.report(proxy_url, time.perf_counter() - started, error=True)
+        _record_outcome(self.client.circuit_breaker, False)
+        _observe_request(proxy_url, "error", started)
+        self.client.logger.warning(
+            "Network error while calling Ryanair API (attempt %d/%d): %s",
+            self.attempt,
+            self.policy.max_retries + 1,
+            exc,
+        )
+        return self._retry_delay("network")
+
+    def abandon(
+        self, exc: Optional[BaseException] = None, proxy_url: Optional[str] = None, started: Optional[float] = None
+    ) -> None:
+        """The attempt ended with an exception that is re-raised (see `_abandon_attempt`)."""
+        _abandon_attempt(self.client.circuit_breaker, exc)
+        if started is not None:
+            _observe_request(proxy_url, "error", started)
+
+    def on_response(
+        self, status: int, retry_after: Optional[str], proxy_url: Optional[str], started: float
+    ) -> Tuple[str, Any]:
+        """Account a response and decide what the client does next (see the `_RETRY`... actions)."""
+        self.client.logger.debug("Ryanair API status code: %s", status)
+        _observe_request(proxy_url, status, started)
+        if self.client.proxy_pool and proxy_url:
+            self.client.proxy_pool.report(proxy_url, time.perf_counter() - started, status)
+
+        if self.policy.is_retryable_status(status):
+            _record_outcome(self.client.circuit_breaker, False)
+            self.last_exc = RuntimeError(f"HTTP {status}")
+            delay = self._retry_delay(status, retry_after)
+            if delay is not None:
+                self.client.logger.warning(
+                    "Ryanair API returned %s (attempt %d/%d), retrying in %.2fs",
+                    status,
+                    self.attempt,
+                    self.policy.max_retries + 1,
+                    delay,
+                )
+                return _RETRY, delay
+        else:
+            _record_outcome(self.client.circuit_breaker, True)
+
+        if status == 304 and self.conditional:
+            payload = self.store.revalidated(self.key, self.route)
+            if payload is not None:
+                return _REVALIDATED, payload
+            # validators were evicted meanwhile: ask again without them
+            self.conditional = False
+            self._reissue = True
+            return _REISSUE, None
+        return _READ, None
+
+    def read(self, status: int, reason: Any, headers: Any, body: bytes, wire_bytes: int) -> Any:
+        """Decode a final response, or raise RuntimeError for an error status or invalid JSON."""
+        if status >= 400:
+            self.client.logger.error(
+                "HTTP error from Ryanair API: %s - response: %s",
+                status,
+                body[:500].decode("utf-8", errors="replace"),
+            )
+            raise RuntimeError(f"Ryanair API responded with an error: {status} {reason}")
+        try:
+            with DECODE_SECONDS.time():
+                payload = self.client.json_decoder(body)
+        except ValueError as exc:
+            self.client.logger.error("Failed to decode Ryanair API JSON: %s", exc)
+            raise RuntimeError("Invalid JSON received from Ryanair API") from exc
+        record_transfer(self.route, wire_bytes, len(body))
+        if self.store is not None:
+            self.store.store(self.key, self.route, headers, payload, wire_bytes)
+        return payload
+
+    def exhausted(self) -> RuntimeError:
+        return RuntimeError(f"Failed to reach Ryanair API after {self.attempt} attempts: {self.last_exc}")
+
+def build_search_params(query: FlightSearchQuery) -> Dict[str, Any]:
+    """Translate a validated query into availability endpoint query parameters."""
+    params: Dict[str, Any] = {
+        "Origin": query.origin,
+        "Destination": query.destination,
+        "DateOut": query.date_from,
+        "ADT": query.adults,
+        "TEEN": query.teens,
+        "CHD": query.children,
+        "INF": query.infants,
+        "ToUs": "AGREED",
+        "IncludeConnectingFlights": "true" if query.include_connecting else "false",
+        "FlexDaysBeforeOut": 0,
+        "FlexDaysOut": query.flex_days_out,
+        "RoundTrip": "true" if query.trip_type == "ROUND_TRIP" else "false",
+        "Currency": query.currency,
+    }
+    if query.trip_type == "ROUND_TRIP" and query.date_to:
+        params["DateIn"] = query.date_to
+        params["FlexDaysBeforeIn"] = 0
+        params["FlexDaysIn"] = 0
+
+    return params
+
 class RyanairApiClient:
     """
     Simple HTTP client for Ryanair public availability endpoint.
@@ -14,7 +278,21 @@ class RyanairApiClient:
     This client is intentionally minimal but robust enough for production-style usage:
     - timeouts
     - proxy support
-    - basic retry loop (for transient network errors)
+    - retries with exponential backoff, jitter and `Retry-After` support on
+      network errors and 429/502/503/504 (see `utils.retry.RetryPolicy`)
+    - optional circuit breaker that fails fast while the endpoint is unhealthy
+    - optional shared `RateLimiter`, consulted before every attempt and fed
+      back every response status; closed with the client when
+      `owns_rate_limiter` is set
+    - a pooled keep-alive `requests.Session` shared by every call (and every retry)
+    - optional `ProxyPool`: a proxy is picked per attempt and its outcome
+      reported; an attempt that finds no proxy within `timeout` fails and is retried
+    - compressed responses (`compression`, on by default) and, with a
+      `ValidatorStore`, conditional requests: a 304 returns the payload
+      decoded for the previous identical request
+
+    The client owns its session unless one is passed in; use it as a context
+    manager or call `close()` to release pooled connections.
     """
 
     def __init__(
@@ -24,73 +302,341 @@ class RyanairApiClient:
         proxies: Optional[Dict[str, str]] = None,
         logger: Optional[logging.Logger] = None,
         max_retries: int = 2,
+        session: Optional[requests.Session] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        proxy_pool: Optional[ProxyPool] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        owns_rate_limiter: bool = False,
+        json_decoder: Optional[AvailabilityDecoder] = None,
+        compression: bool = True,
+        validator_store: Optional[ValidatorStore] = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.proxies = proxies
         self.logger = logger or logging.getLogger(__name__)
         self.max_retries = max_retries
+        self.proxy_pool = proxy_pool
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self._owns_rate_limiter = owns_rate_limiter
+        self.json_decoder = json_decoder or build_availability_decoder()
+        self.validator_store = validator_store
+        self._request_headers = {"Accept-Encoding": ACCEPT_ENCODING if compression else "identity"}
+        self._owns_session = session is None
+        self.session = session or self._build_session(pool_connections, pool_maxsize, pool_block)
+
+    @staticmethod
+    def _build_session(pool_connections: int, pool_maxsize: int, pool_block: bool) -> requests.Session:
+        """
+        Build a session with a tuned connection pool.
+
+        `pool_connections` is the number of distinct hosts kept in the pool and
+        `pool_maxsize` the number of keep-alive connections kept per host; it
+        should be at least the number of threads sharing the client.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive", "Accept": "application/json"})
+        return session
+
+    def close(self) -> None:
+        """Close pooled connections and the rate limiter, if owned by this client."""
+        if self.validator_store is not None:
+            self.logger.info("Conditional request stats: %s", self.validator_store.summary())
+        if self._owns_session:
+            self.session.close()
+        if self._owns_rate_limiter and self.rate_limiter is not None:
+            self.rate_limiter.close()
+
+    def __enter__(self) -> "RyanairApiClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
     def _build_params(self, query: FlightSearchQuery) -> Dict[str, Any]:
-        params: Dict[str, Any] = {
-            "Origin": query.origin,
-            "Destination": query.destination,
-            "DateOut": query.date_from,
-            "ADT": query.adults,
-            "TEEN": query.teens,
-            "CHD": query.children,
-            "INF": query.infants,
-            "ToUs": "AGREED",
-            "IncludeConnectingFlights": "false",
-            "FlexDaysBeforeOut": 0,
-            "FlexDaysOut": 0,
-            "RoundTrip": "true" if query.trip_type == "ROUND_TRIP" else "false",
-            "Currency": query.currency,
-        }
-        if query.trip_type == "ROUND_TRIP" and query.date_to:
-            params["DateIn"] = query.date_to
-            params["FlexDaysBeforeIn"] = 0
-            params["FlexDaysIn"] = 0
-
-        return params
+        return build_search_params(query)
 
     def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
-        params = self._build_params(query)
-        attempt = 0
-        last_exc: Optional[Exception] = None
+        """
+        Fetch availability for `query`.
+
+        Date-range queries are planned into flex-day windows and the window
+        responses merged into one payload.
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            windows = plan_flex_windows(query)
+            if len(windows) == 1:
+                response = self._search_window(windows[0])
+            else:
+                response = merge_availability_responses(self._search_window(window) for window in windows)
+            outcome = "ok"
+            return response
+        finally:
+            SEARCH_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    def fetch_windows(self, query: FlightSearchQuery) -> List[Any]:
+        """
+        Fetch every flex-day window of `query` without merging them.
 
-        while attempt <= self.max_retries:
-            attempt += 1
+        Each payload is whatever `json_decoder` returns; with `raw_body` these
+        are the undecoded response bodies, so decoding can happen elsewhere.
+        """
+        return [self._search_window(window) for window in plan_flex_windows(query)]
+
+    def _search_window(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        params = self._build_params(query)
+        attempts = _WindowAttempts(self, params, f"{query.origin}-{query.destination}")
+        while True:
+            needs_token = attempts.begin()
+            try:
+                if self.rate_limiter is not None and needs_token:
+                    self.rate_limiter.acquire()
+                # waiting out a long proxy cooldown would stall this thread; fail the attempt instead
+                proxy_url = self.proxy_pool.acquire(timeout=self.timeout) if self.proxy_pool else None
+            except ProxyUnavailableError as exc:
+                delay = attempts.no_proxy(exc)
+                if delay is None:
+                    break
+                time.sleep(delay)
+                continue
+            except BaseException:
+                attempts.abandon()
+                raise
+            started = time.perf_counter()
             try:
-                self.logger.debug("Requesting Ryanair availability, attempt %d", attempt)
-                resp = requests.get(
+                resp = self.session.get(
                     self.base_url,
                     params=params,
+                    headers=attempts.headers(),
                     timeout=self.timeout,
-                    proxies=self.proxies,
+                    proxies=build_proxies(proxy_url) if proxy_url else self.proxies,
                 )
-                self.logger.debug("Ryanair API status code: %s", resp.status_code)
-                resp.raise_for_status()
-                return resp.json()
             except (requests.Timeout, requests.ConnectionError) as exc:
-                last_exc = exc
-                self.logger.warning(
-                    "Network error while calling Ryanair API (attempt %d/%d): %s",
-                    attempt,
-                    self.max_retries + 1,
-                    exc,
-                )
-                if attempt > self.max_retries:
+                delay = attempts.network_error(exc, proxy_url, started)
+                if delay is None:
                     break
-            except requests.HTTPError as exc:
-                self.logger.error(
-                    "HTTP error from Ryanair API: %s - response: %s",
-                    exc,
-                    getattr(exc.response, "text", "")[:500],
-                )
-                raise RuntimeError(f"Ryanair API responded with an error: {exc}") from exc
-            except ValueError as exc:
-                self.logger.error("Failed to decode Ryanair API JSON: %s", exc)
-                raise RuntimeError("Invalid JSON received from Ryanair API") from exc
+                time.sleep(delay)
+                continue
+            except BaseException as exc:
+                # ChunkedEncodingError, ContentDecodingError, TooManyRedirects, ...
+                attempts.abandon(exc, proxy_url, started)
+                raise
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_response(resp.status_code)
+            action, value = attempts.on_response(resp.status_code, resp.headers.get("Retry-After"), proxy_url, started)
+            if action == _RETRY:
+                time.sleep(value)
+                continue
+            if action == _REISSUE:
+                continue
+            if action == _REVALIDATED:
+                return value
+            wire_bytes = _wire_bytes(resp.headers, resp.content, resp.raw)
+            return attempts.read(resp.status_code, resp.reason, resp.headers, resp.content, wire_bytes)
+
+        raise attempts.exhausted()
+
+class AsyncRyanairApiClient:
+    """
+    asyncio counterpart of `RyanairApiClient`, backed by `aiohttp`.
+
+    Parameters, timeouts, proxy handling and the retry loop mirror the
+    synchronous client so both can be swapped freely. One instance (and its
+    connection pool) is meant to be shared by every search on an event loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 10,
+        proxies: Optional[Dict[str, str]] = None,
+        logger: Optional[logging.Logger] = None,
+        max_retries: int = 2,
+        session: Optional["aiohttp.ClientSession"] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        proxy_pool: Optional[ProxyPool] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        owns_rate_limiter: bool = False,
+        json_decoder: Optional[AvailabilityDecoder] = None,
+        compression: bool = True,
+        validator_store: Optional[ValidatorStore] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise RuntimeError("AsyncRyanairApiClient requires the 'aiohttp' package to be installed.")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.proxies = proxies
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_retries = max_retries
+        # aiohttp has no per-scheme proxy mapping; the HTTPS proxy is used for the API.
+        self.proxy = (proxies or {}).get("https") or (proxies or {}).get("http")
+        self.proxy_pool = proxy_pool
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self._owns_rate_limiter = owns_rate_limiter
+        # a shared-state backend (e.g. FileStateBackend's flock) may block, so it runs off the event loop
+        backend = getattr(rate_limiter, "backend", None)
+        self._limiter_blocks = rate_limiter is not None and not isinstance(backend, LocalStateBackend)
+        self.json_decoder = json_decoder or build_availability_decoder()
+        self.validator_store = validator_store
+        self._request_headers = {"Accept-Encoding": ASYNC_ACCEPT_ENCODING if compression else "identity"}
+        self._owns_session = session is None
+        self._session = session
+        # pool_connections/pool_block have no aiohttp equivalent; they are
+        # accepted so settings can be shared with the synchronous client.
+        self._pool_maxsize = pool_maxsize
+
+    def _build_params(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        return build_search_params(query)
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        # created lazily so the session binds to the running event loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_maxsize, limit_per_host=self._pool_maxsize)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept": "application/json"},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close pooled connections and the rate limiter, if owned by this client."""
+        if self.validator_store is not None:
+            self.logger.info("Conditional request stats: %s", self.validator_store.summary())
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._owns_rate_limiter and self.rate_limiter is not None:
+            self.rate_limiter.close()
+
+    async def _call_limiter(self, method: Any, *args: Any) -> Any:
+        if self._limiter_blocks:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _acquire_rate_limit(self) -> None:
+        if self.rate_limiter is None:
+            return
+        while True:
+            wait = await self._call_limiter(self.rate_limiter.try_acquire)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _report_rate_limit(self, status: int) -> None:
+        if self.rate_limiter is not None:
+            await self._call_limiter(self.rate_limiter.on_response, status)
+
+    async def _acquire_proxy(self) -> Optional[str]:
+        if self.proxy_pool is None:
+            return self.proxy
+        # bounded like the sync client: at most one request timeout
+        deadline = time.monotonic() + self.timeout
+        while True:
+            proxy_url, wait = self.proxy_pool.try_acquire()
+            if proxy_url is not None:
+                return proxy_url
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ProxyUnavailableError("No proxy became available before the timeout.")
+            await asyncio.sleep(max(min(wait, remaining), 0.001))
+
+    async def __aenter__(self) -> "AsyncRyanairApiClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            windows = plan_flex_windows(query)
+            if len(windows) == 1:
+                response = await self._search_window(windows[0])
+            else:
+                responses = await asyncio.gather(*(self._search_window(window) for window in windows))
+                response = merge_availability_responses(responses)
+            outcome = "ok"
+            return response
+        finally:
+            SEARCH_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _search_window(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        # aiohttp only accepts str/int/float query values
+        params = {key: str(value) for key, value in self._build_params(query).items()}
+        attempts = _WindowAttempts(self, params, f"{query.origin}-{query.destination}")
+        while True:
+            needs_token = attempts.begin()
+            try:
+                if needs_token:
+                    await self._acquire_rate_limit()
+                proxy_url = await self._acquire_proxy()
+            except ProxyUnavailableError as exc:
+                delay = attempts.no_proxy(exc)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                attempts.abandon()
+                raise
+            started = time.perf_counter()
+            try:
+                async with self.session.get(
+                    self.base_url,
+                    params=params,
+                    headers=attempts.headers(),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    proxy=proxy_url,
+                ) as resp:
+                    status = resp.status
+                    reason = resp.reason
+                    response_headers = resp.headers.copy()
+                    body = await resp.read()
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as exc:
+                delay = attempts.network_error(exc, proxy_url, started)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+                continue
+            except BaseException as exc:
+                # other aiohttp.ClientError subclasses, or the task being cancelled
+                attempts.abandon(exc, proxy_url, started)
+                raise
+
+            await self._report_rate_limit(status)
+            action, value = attempts.on_response(status, response_headers.get("Retry-After"), proxy_url, started)
+            if action == _RETRY:
+                await asyncio.sleep(value)
+                continue
+            if action == _REISSUE:
+                continue
+            if action == _REVALIDATED:
+                return value
+            # aiohttp already decoded the content coding; Content-Length is the wire size
+            return attempts.read(status, reason, response_headers, body, _wire_bytes(response_headers, body))
 
-        raise RuntimeError(f"Failed to reach Ryanair API after {self.max_retries + 1} attempts: {last_exc}")
\ No newline at end of file
+        raise attempts.exhausted()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from utils.logger import correlation_scope
+
+from .revalidation import parse_response
+from .validator import FlightSearchQuery
+
+def _as_query(search_input: Union[Dict[str, Any], FlightSearchQuery]) -> FlightSearchQuery:
+    """Inputs may be raw dicts or queries already validated, e.g. by a watchlist expansion."""
+    if isinstance(search_input, FlightSearchQuery):
+        return search_input
+    return FlightSearchQuery.from_dict(search_input)
+
+@dataclass
+class BatchResult:
+    """Outcome of a single query inside a batch run."""
+
+    index: int
+    search_input: Union[Dict[str, Any], FlightSearchQuery]
+    query: Optional[FlightSearchQuery] = None
+    flights: List[Dict[str, Any]] = field(default_factory=list)
+    flight_count: int = 0
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    correlation_id: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "origin": self.query.origin if self.query else self.search_input.get("origin"),
+            "destination": self.query.destination if self.query else self.search_input.get("destination"),
+            "dateFrom": self.query.date_from if self.query else self.search_input.get("dateFrom"),
+            "ok": self.ok,
+            "flights": self.flight_count,
+            "error": self.error,
+            "elapsedSeconds": round(self.elapsed, 3),
+            "correlationId": self.correlation_id,
+        }
+
+class BatchSearchRunner:
+    """
+    Run many flight searches through one shared client using a bounded thread pool.
+
+    - at most `max_workers` queries are in flight at any time
+    - at most `max_in_flight` of them are inside `client.search_flights` at
+      once (e.g. fewer requests than worker threads, which still parse); the
+      per-host connection cap belongs to the client's connection pool
+    - results are yielded as they complete, one `BatchResult` per input
+    - a failing query is recorded and never aborts the rest of the batch
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if max_workers <= 0:
+            raise ValueError("max_workers must be a positive integer.")
+        if max_in_flight is not None and max_in_flight <= 0:
+            raise ValueError("max_in_flight must be a positive integer when provided.")
+        self.client = client
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers
+        self.logger = logger or logging.getLogger(__name__)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+
+    def _run_one(self, index: int, search_input: Dict[str, Any]) -> BatchResult:
+        result = BatchResult(index=index, search_input=search_input)
+        started = time.perf_counter()
+        with correlation_scope() as cid:
+            result.correlation_id = cid
+            try:
+                query = _as_query(search_input)
+                result.query = query
+                with self._slots:
+                    raw_response = self.client.search_flights(query)
+                result.flights = parse_response(
+                    self.client, raw_response, max_items=query.max_items, date_range=query.date_range
+                )
+                result.flight_count = len(result.flights)
+            except Exception as exc:
+                result.error = str(exc) or exc.__class__.__name__
+                self.logger.warning("Batch query #%d failed: %s", index, result.error)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def run(self, search_inputs: Iterable[Dict[str, Any]]) -> Iterator[BatchResult]:
+        """
+        Yield one `BatchResult` per input in completion order.
+
+        Inputs are consumed lazily so that at most `2 * max_workers` queries are
+        pending at once, which keeps memory bounded for very large batches.
+        """
+        inputs = enumerate(search_inputs)
+        pending: Dict[Future, int] = {}
+        high_water = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < high_water:
+                    try:
+                        index, search_input = next(inputs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(self._run_one, index, search_input)] = index
+
+                if not pending:
+                    return
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    yield future.result()
+
+def run_batch(
+    client: Any,
+    search_inputs: Iterable[Dict[str, Any]],
+    max_workers: int = 4,
+    max_in_flight: Optional[int] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Iterator[BatchResult]:
+    """Convenience wrapper around `BatchSearchRunner.run`."""
+    runner = BatchSearchRunner(
+        client,
+        max_workers=max_workers,
+        max_in_flight=max_in_flight,
+        logger=logger,
+    )
+    return runner.run(search_inputs)
+
+async def run_batch_async(
+    client: Any,
+    search_inputs: Iterable[Dict[str, Any]],
+    max_concurrency: int = 100,
+    logger: Optional[logging.Logger] = None,
+) -> AsyncIterator[BatchResult]:
+    """
+    asyncio variant of `run_batch` for clients with `async search_flights`.
+
+    Up to `max_concurrency` searches share the event loop; results are yielded
+    in completion order and failures are recorded per query. Searches still
+    in flight are cancelled when the generator is closed early.
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive integer.")
+    log = logger or logging.getLogger(__name__)
+
+    async def _run_one(index: int, search_input: Dict[str, Any]) -> BatchResult:
+        result = BatchResult(index=index, search_input=search_input)
+        started = time.perf_counter()
+        # each task runs in a copy of the context, so the id stays with this query
+        with correlation_scope() as cid:
+            result.correlation_id = cid
+            try:
+                query = _as_query(search_input)
+                result.query = query
+                raw_response = await client.search_flights(query)
+                result.flights = parse_response(
+                    client, raw_response, max_items=query.max_items, date_range=query.date_range
+                )
+                result.flight_count = len(result.flights)
+            except Exception as exc:
+                result.error = str(exc) or exc.__class__.__name__
+                log.warning("Batch query #%d failed: %s", index, result.error)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    inputs = enumerate(search_inputs)
+    pending: Set[asyncio.Task] = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_concurrency:
+                try:
+                    index, search_input = next(inputs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(_run_one(index, search_input)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # the consumer stopped early (or was cancelled): do not leave searches running
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import abc
+import inspect
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+from .validator import FlightSearchQuery
+
+CACHE_REQUESTS = REGISTRY.counter("ryanair_cache_requests_total", "Response cache lookups by result.", ("result",))
+
+def cache_key(query: FlightSearchQuery) -> str:
+    """
+    Normalized cache key for a query.
+
+    Only fields that change the API response are included, so queries that
+    differ in `locale` or `max_items` share one entry.
+    """
+    date_to = query.date_to if query.trip_type == "ROUND_TRIP" else ""
+    return "|".join(
+        str(part)
+        for part in (
+            query.origin,
+            query.destination,
+            query.date_from,
+            query.date_from_end or "",
+            query.flex_days_out,
+            date_to or "",
+            query.trip_type,
+            query.adults,
+            query.teens,
+            query.children,
+            query.infants,
+            query.currency,
+            query.include_connecting,
+        )
+    )
+
+def route_key(query: FlightSearchQuery) -> str:
+    return f"{query.origin}-{query.destination}"
+
+def _encoded_size(response: Dict[str, Any]) -> int:
+    return len(json.dumps(response, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+class _BaseResponseCache(abc.ABC):
+    """
+    Shared TTL handling for response caches.
+
+    `route_ttls` maps "ORIGIN-DESTINATION" to a TTL in seconds that overrides
+    `ttl_seconds` for that route. `max_bytes` bounds the UTF-8 encoded size
+    of the cached JSON bodies. `clock` defaults to the backend's own time
+    source and is mainly there for tests.
+    """
+
+    default_clock: Callable[[], float] = staticmethod(time.monotonic)
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        route_ttls: Optional[Dict[str, float]] = None,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive.")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer.")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive integer when provided.")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.route_ttls = {key.upper(): float(value) for key, value in (route_ttls or {}).items()}
+        self.clock = clock or self.default_clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, query: FlightSearchQuery) -> float:
+        return self.route_ttls.get(route_key(query), self.ttl_seconds)
+
+    @abc.abstractmethod
+    def get(self, query: FlightSearchQuery) -> Optional[Dict[str, Any]]:
+        """The cached response for `query`, or None on a miss or expired entry."""
+
+    @abc.abstractmethod
+    def set(self, query: FlightSearchQuery, response: Dict[str, Any]) -> None:
+        """Cache `response` for `query`, evicting the least recently used entries over the bounds."""
+
+    def close(self) -> None:
+        pass
+
+class MemoryResponseCache(_BaseResponseCache):
+    """
+    In-process LRU cache with TTL, bounded by entry count and approximate size.
+
+    Cached responses are returned as-is (not copied); callers must not mutate them.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # key -> (expires_at, size_bytes, response)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: FlightSearchQuery) -> Optional[Dict[str, Any]]:
+        key = cache_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, size, response = entry
+            if expires_at <= self.clock():
+                self._drop(key)
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return response
+
+    def set(self, query: FlightSearchQuery, response: Dict[str, Any]) -> None:
+        key = cache_key(query)
+        # size is only measured when a byte bound is configured
+        size = _encoded_size(response) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl_for(query), size, response)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+class SqliteResponseCache(_BaseResponseCache):
+    """
+    On-disk cache backed by sqlite so entries survive process restarts.
+
+    Expiry uses wall-clock time; LRU order is tracked with a last-access column.
+    """
+
+    default_clock = staticmethod(time.time)
+
+    def __init__(self, path: Path, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache(accessed_at)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def get(self, query: FlightSearchQuery) -> Optional[Dict[str, Any]]:
+        key = cache_key(query)
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, body FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            expires_at, body = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.hits += 1
+        return json.loads(body)
+
+    def set(self, query: FlightSearchQuery, response: Dict[str, Any]) -> None:
+        key = cache_key(query)
+        body = json.dumps(response, separators=(",", ":"), ensure_ascii=False)
+        size = len(body.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, expires_at, accessed_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, now + self.ttl_for(query), now, size, body),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY accessed_at ASC"
+        )
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        if doomed:
+            self._conn.executemany("DELETE FROM response_cache WHERE key = ?", doomed)
+            self.stats.evictions += len(doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class CachingClient:
+    """
+    Wrap any client exposing `search_flights(query)` with a response cache.
+
+    Other attributes (e.g. `base_url`) are delegated to the wrapped client.
+    """
+
+    def __init__(self, client: Any, cache: _BaseResponseCache, logger: Optional[logging.Logger] = None) -> None:
+        self.client = client
+        self.cache = cache
+        self.logger = logger or logging.getLogger(__name__)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        cached = self.cache.get(query)
+        if cached is not None:
+            CACHE_REQUESTS.inc(result="hit")
+            self.logger.debug("Cache hit for %s", cache_key(query))
+            return cached
+        CACHE_REQUESTS.inc(result="miss")
+        response = self.client.search_flights(query)
+        self.cache.set(query, response)
+        return response
+
+    def close(self) -> None:
+        self.logger.info("Response cache stats: %s", self.cache.stats.as_dict())
+        self.cache.close()
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            close()
+
+    def __enter__(self) -> "CachingClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+class AsyncCachingClient(CachingClient):
+    """
+    `CachingClient` for clients whose `search_flights` is a coroutine.
+
+    Lookups stay synchronous: both backends answer from memory or a local
+    SQLite file, which is cheap next to the request they save.
+    """
+
+    async def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        cached = self.cache.get(query)
+        if cached is not None:
+            CACHE_REQUESTS.inc(result="hit")
+            self.logger.debug("Cache hit for %s", cache_key(query))
+            return cached
+        CACHE_REQUESTS.inc(result="miss")
+        response = await self.client.search_flights(query)
+        self.cache.set(query, response)
+        return response
+
+    async def close(self) -> None:
+        self.logger.info("Response cache stats: %s", self.cache.stats.as_dict())
+        self.cache.close()
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self) -> "AsyncCachingClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+def build_response_cache(options: Dict[str, Any]) -> _BaseResponseCache:
+    """
+    Build a cache from the `cache` settings block:
+
+    {
+      "ttlSeconds": 300,
+      "maxEntries": 1000,
+      "maxBytes": 50000000,
+      "routeTtlSeconds": {"VIE-BCN": 60},
+      "sqlitePath": "data/cache.sqlite"
+    }
+    """
+    kwargs = {
+        "ttl_seconds": float(options.get("ttlSeconds", 300)),
+        "max_entries": int(options.get("maxEntries", 1000)),
+        "max_bytes": int(options["maxBytes"]) if options.get("maxBytes") else None,
+        "route_ttls": options.get("routeTtlSeconds"),
+    }
+    sqlite_path = options.get("sqlitePath")
+    if sqlite_path:
+        return SqliteResponseCache(Path(sqlite_path), **kwargs)
+    return MemoryResponseCache(**kwargs)
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .api_client import build_search_params, plan_flex_windows
+from .validator import FlightSearchQuery
+
+# Query parameters carrying passenger counts, and the fare type codes they map to.
+_PASSENGER_PARAMS = ("ADT", "TEEN", "CHD", "INF")
+
+Passengers = Tuple[int, int, int, int]
+
+def coalesce_key(
+    query: FlightSearchQuery, build_params: Callable[[FlightSearchQuery], Dict[str, Any]] = build_search_params
+) -> Tuple[Tuple[Tuple[Tuple[str, str], ...], ...], Passengers]:
+    """
+    Split a query into `(route_key, passengers)`.
+
+    `route_key` is built from the request parameters `build_params` gives for
+    every flex window the client would send, minus the passenger counts;
+    queries with equal route keys hit the same upstream inventory.
+    """
+    route_key = tuple(
+        tuple(
+            sorted(
+                (name, str(value))
+                for name, value in build_params(window).items()
+                if name not in _PASSENGER_PARAMS
+            )
+        )
+        for window in plan_flex_windows(query)
+    )
+    return route_key, (query.adults, query.teens, query.children, query.infants)
+
+def _covers(leader: Passengers, wanted: Passengers) -> bool:
+    return all(have >= need for have, need in zip(leader, wanted))
+
+def rewrite_passenger_counts(
+    response: Dict[str, Any], leader: Passengers, wanted: Passengers
+) -> Optional[Dict[str, Any]]:
+    """
+    Adapt a response fetched for `leader` passengers to a smaller `wanted` party.
+
+    Fares are quoted per passenger, so only the `count` of each fare changes
+    and fare types nobody in `wanted` needs are dropped. Reuse is only safe
+    when seat availability cannot have pushed the larger party into a more
+    expensive fare bucket: if any flight reports fewer `faresLeft` than the
+    leader's party size, None is returned and the caller must fetch its own.
+    """
+    party = sum(leader)
+    counts = dict(zip(_PASSENGER_PARAMS, wanted))
+    trips: List[Dict[str, Any]] = []
+    for trip in response.get("trips") or []:
+        dates = []
+        for date_block in trip.get("dates") or []:
+            flights = []
+            for flight in date_block.get("flights") or []:
+                fares_left = flight.get("faresLeft", -1)
+                if isinstance(fares_left, int) and 0 <= fares_left < party:
+                    return None
+                regular = flight.get("regularFare")
+                if regular:
+                    fares = [
+                        dict(fare, count=counts[fare.get("type")]) if fare.get("type") in counts else fare
+                        for fare in regular.get("fares") or []
+                        if counts.get(fare.get("type"), 1)
+                    ]
+                    flight = dict(flight, regularFare=dict(regular, fares=fares))
+                flights.append(flight)
+            dates.append(dict(date_block, flights=flights))
+        trips.append(dict(trip, dates=dates))
+    return dict(response, trips=trips)
+
+class CoalescingStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self.passenger_coalesced = 0
+        self.passenger_fallbacks = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "passengerCoalesced": self.passenger_coalesced,
+            "passengerFallbacks": self.passenger_fallbacks,
+        }
+
+class _Call:
+    """One upstream call that concurrent identical queries wait on."""
+
+    __slots__ = ("passengers", "done", "result", "error")
+
+    def __init__(self, passengers: Passengers, done: Any) -> None:
+        self.passengers = passengers
+        self.done = done
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+class _CoalescingBase:
+    def __init__(self, client: Any, coalesce_passengers: bool = False, logger: Optional[logging.Logger] = None) -> None:
+        self.client = client
+        self.coalesce_passengers = coalesce_passengers
+        # the wrapped client's own parameters, so an override of `_build_params` changes the key too
+        self._build_params = getattr(client, "_build_params", build_search_params)
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = CoalescingStats()
+        self._inflight: Dict[Any, List[_Call]] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def _join_or_lead(self, route_key: Any, passengers: Passengers, new_done: Any) -> Tuple[_Call, bool]:
+        """Return `(call, is_leader)`, preferring an exact match over a larger party."""
+        with self._lock:
+            calls = self._inflight.setdefault(route_key, [])
+            larger = None
+            for call in calls:
+                if call.passengers == passengers:
+                    self.stats.coalesced += 1
+                    return call, False
+                if larger is None and self.coalesce_passengers and _covers(call.passengers, passengers):
+                    larger = call
+            if larger is not None:
+                self.stats.passenger_coalesced += 1
+                return larger, False
+            call = _Call(passengers, new_done())
+            calls.append(call)
+            self.stats.calls += 1
+            return call, True
+
+    def _finish(self, route_key: Any, call: _Call) -> None:
+        with self._lock:
+            calls = self._inflight.get(route_key, [])
+            if call in calls:
+                calls.remove(call)
+            if not calls:
+                self._inflight.pop(route_key, None)
+
+    def _adapt(self, call: _Call, passengers: Passengers) -> Optional[Dict[str, Any]]:
+        if call.passengers == passengers:
+            return call.result
+        adapted = rewrite_passenger_counts(call.result, call.passengers, passengers)
+        if adapted is None:
+            with self._lock:
+                self.stats.passenger_fallbacks += 1
+        return adapted
+
+class CoalescingClient(_CoalescingBase):
+    """
+    Single-flight wrapper around a client exposing `search_flights(query)`.
+
+    Concurrent queries that map to the same request parameters share one
+    upstream call and all receive its result (or its exception). With
+    `coalesce_passengers` (off by default), a query also joins an in-flight
+    call for the same route made for a party at least as large in every
+    passenger type; see `rewrite_passenger_counts` for when that answer can
+    be reused.
+
+    Only calls that overlap in time are merged; use `CachingClient` on top for
+    reuse across time. Other attributes are delegated to the wrapped client.
+    """
+
+    def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        route_key, passengers = coalesce_key(query, self._build_params)
+        call, leader = self._join_or_lead(route_key, passengers, threading.Event)
+        if leader:
+            try:
+                call.result = self.client.search_flights(query)
+                return call.result
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                self._finish(route_key, call)
+                call.done.set()
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        adapted = self._adapt(call, passengers)
+        if adapted is None:
+            return self.client.search_flights(query)
+        return adapted
+
+    def close(self) -> None:
+        self.logger.info("Request coalescing stats: %s", self.stats.as_dict())
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            close()
+
+    def __enter__(self) -> "CoalescingClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+class AsyncCoalescingClient(_CoalescingBase):
+    """`CoalescingClient` for clients whose `search_flights` is a coroutine."""
+
+    async def search_flights(self, query: FlightSearchQuery) -> Dict[str, Any]:
+        route_key, passengers = coalesce_key(query, self._build_params)
+        loop = asyncio.get_running_loop()
+        call, leader = self._join_or_lead(route_key, passengers, loop.create_future)
+        if leader:
+            try:
+                call.result = await self.client.search_flights(query)
+                call.done.set_result(call.result)
+                return call.result
+            except asyncio.CancelledError:
+                call.done.cancel()
+                raise
+            except BaseException as exc:
+                call.done.set_exception(exc)
+                call.done.exception()  # mark as retrieved when nobody joined
+                raise
+            finally:
+                self._finish(route_key, call)
+
+        try:
+            await asyncio.shield(call.done)
+        except asyncio.CancelledError:
+            if not call.done.cancelled():
+                raise
+            # the leader was cancelled, not us
+            return await self.client.search_flights(query)
+        adapted = self._adapt(call, passengers)
+        if adapted is None:
+            return await self.client.search_flights(query)
+        return adapted
+
+    async def close(self) -> None:
+        self.logger.info("Request coalescing stats: %s", self.stats.as_dict())
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self) -> "AsyncCoalescingClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .batch import run_batch
+from .parser import format_utc_epoch, parse_utc_epoch
+from .validator import FlightSearchQuery, validate_airport_code
+
+DEFAULT_MIN_CONNECTION_MINUTES = 60
+DEFAULT_MAX_CONNECTION_HOURS = 24
+MAX_LEGS = 4
+
+@dataclass(frozen=True)
+class Leg:
+    """One bookable flight in the route graph; times are UTC epoch seconds."""
+
+    index: int
+    origin: str
+    destination: str
+    departure: int
+    arrival: int
+    price: float
+    flight: Dict[str, Any] = field(compare=False, repr=False)
+
+@dataclass(frozen=True)
+class Itinerary:
+    legs: Tuple[Leg, ...]
+
+    @property
+    def price(self) -> float:
+        return round(sum(leg.price for leg in self.legs), 2)
+
+    @property
+    def via(self) -> List[str]:
+        return [leg.destination for leg in self.legs[:-1]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        first, last = self.legs[0], self.legs[-1]
+        return {
+            "Origin": first.origin,
+            "Destination": last.destination,
+            "Price": self.price,
+            "Time departure": first.flight.get("Time departure") or format_utc_epoch(first.departure),
+            "Time arrival": last.flight.get("Time arrival") or format_utc_epoch(last.arrival),
+            "Stops": len(self.legs) - 1,
+            "Via": self.via,
+            "Duration minutes": (last.arrival - first.departure) // 60,
+            "legs": [leg.flight for leg in self.legs],
+        }
+
+class RouteGraph:
+    """
+    In-memory multigraph of flights: airports are vertices, flights are
+    timed, priced edges.
+
+    Outgoing flights are kept sorted by departure per airport, so the flights
+    that can follow an arrival are found with a binary search.
+    """
+
+    def __init__(self) -> None:
+        self._legs: List[Leg] = []
+        self._seen: Dict[Tuple[Any, ...], int] = {}
+        self._outgoing: Dict[str, List[Leg]] = {}
+        self._departures: Dict[str, List[int]] = {}
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add_flight(self, flight: Any) -> bool:
+        """Add one parsed flight; returns False for unusable or duplicate flights."""
+        if hasattr(flight, "to_dict"):
+            flight = flight.to_dict()
+        origin, destination, price = flight.get("Origin"), flight.get("Destination"), flight.get("Price")
+        departure = parse_utc_epoch(flight.get("Time departure"))
+        arrival = parse_utc_epoch(flight.get("Time arrival"))
+        if not origin or not destination or price is None or departure is None or arrival is None:
+            return False
+        # overlapping leg searches return the same flight more than once
+        identity = (flight.get("key") or flight.get("Flight number"), origin, departure)
+        existing = self._seen.get(identity)
+        if existing is not None:
+            if self._legs[existing].price <= float(price):
+                return False
+            old = self._legs[existing]
+            self._outgoing[origin].remove(old)
+        leg = Leg(len(self._legs), origin, destination, departure, arrival, float(price), flight)
+        self._legs.append(leg)
+        self._seen[identity] = leg.index
+        self._outgoing.setdefault(origin, []).append(leg)
+        self._dirty.add(origin)
+        return True
+
+    def add_flights(self, flights: Iterable[Any]) -> int:
+        return sum(1 for flight in flights if self.add_flight(flight))
+
+    def airports(self) -> Set[str]:
+        return set(self._outgoing) | {leg.destination for legs in self._outgoing.values() for leg in legs}
+
+    def departures(self, airport: str, earliest: Optional[int] = None, latest: Optional[int] = None) -> List[Leg]:
+        """Flights leaving `airport` with `earliest <= departure <= latest`, by departure."""
+        if airport in self._dirty:
+            legs = sorted(self._outgoing[airport], key=lambda leg: leg.departure)
+            self._outgoing[airport] = legs
+            self._departures[airport] = [leg.departure for leg in legs]
+            self._dirty.discard(airport)
+        legs = self._outgoing.get(airport)
+        if not legs:
+            return []
+        times = self._departures[airport]
+        lo = bisect_left(times, earliest) if earliest is not None else 0
+        hi = bisect_right(times, latest) if latest is not None else len(times)
+        return legs[lo:hi]
+
+    def cheapest_itineraries(
+        self,
+        origin: str,
+        destination: str,
+        depart_after: Optional[int] = None,
+        depart_before: Optional[int] = None,
+        min_connection_minutes: float = DEFAULT_MIN_CONNECTION_MINUTES,
+        max_connection_hours: float = DEFAULT_MAX_CONNECTION_HOURS,
+        max_legs: int = 2,
+        limit: int = 10,
+    ) -> List[Itinerary]:
+        """
+        The `limit` cheapest itineraries from `origin` to `destination`.
+
+        Best-first (Dijkstra) search over flights rather than airports, since
+        whether a flight can follow another depends on its times: a partial
+        itinerary ending with flight F extends only with flights leaving F's
+        arrival airport between `min_connection_minutes` and
+        `max_connection_hours` after it lands. Prices are non-negative, so
+        itineraries reach the destination in price order; settling each flight
+        at most `limit` times yields the k cheapest without enumerating every
+        path. Itineraries never revisit an airport.
+        """
+        if max_legs <= 0 or max_legs > MAX_LEGS:
+            raise ValueError(f"max_legs must be between 1 and {MAX_LEGS}.")
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        if min_connection_minutes < 0 or max_connection_hours * 60 < min_connection_minutes:
+            raise ValueError("Connection window must satisfy 0 <= minimum <= maximum.")
+        min_gap = int(min_connection_minutes * 60)
+        max_gap = int(max_connection_hours * 3600)
+
+        heap: List[Tuple[float, int, int, Tuple[Leg, ...]]] = []
+        for leg in self.departures(origin, depart_after, depart_before):
+            heap.append((leg.price, len(heap), 1, (leg,)))
+        heapq.heapify(heap)
+        tie = itertools.count(len(heap))
+
+        settled: Dict[int, int] = {}
+        found: List[Itinerary] = []
+        while heap and len(found) < limit:
+            cost, _, hops, path = heapq.heappop(heap)
+            last = path[-1]
+            times = settled.get(last.index, 0)
+            if times >= limit:
+                continue
+            settled[last.index] = times + 1
+            if last.destination == destination:
+                found.append(Itinerary(path))
+                continue
+            if hops >= max_legs:
+                continue
+            visited = {leg.origin for leg in path}
+            for leg in self.departures(last.destination, last.arrival + min_gap, last.arrival + max_gap):
+                if leg.destination in visited or (hops + 1 == max_legs and leg.destination != destination):
+                    continue
+                heapq.heappush(heap, (cost + leg.price, next(tie), hops + 1, path + (leg,)))
+        return found
+
+@dataclass
+class ItinerarySearchStats:
+    leg_queries: int = 0
+    failed_queries: int = 0
+    flights: int = 0
+    elapsed: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "legQueries": self.leg_queries,
+            "failedQueries": self.failed_queries,
+            "flights": self.flights,
+            "elapsedSeconds": round(self.elapsed, 3),
+        }
+
+def _date_span(query: FlightSearchQuery, extra_days: int) -> Tuple[str, Optional[str]]:
+    start = date.fromisoformat(query.date_from)
+    end = date.fromisoformat(query.date_from_end or query.date_from) + timedelta(days=extra_days)
+    return start.isoformat(), end.isoformat() if end > start else None
+
+class ItinerarySearch:
+    """
+    Find cheapest one-way itineraries, composing single-leg searches through hubs.
+
+    Legs are fetched breadth-first: the first round searches origin -> every
+    hub (and the direct route), each following round searches only from hubs
+    actually reached so far. Every round runs as one parallel batch, and each
+    (origin, destination) pair is searched at most once. Later legs are
+    searched over the outbound window plus enough days to cover the longest
+    allowed connection.
+
+    With `include_connecting` the direct search also asks the API for its own
+    connecting flights; those enter the graph as a single origin -> destination
+    edge.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        hubs: Sequence[str],
+        max_legs: int = 2,
+        min_connection_minutes: float = DEFAULT_MIN_CONNECTION_MINUTES,
+        max_connection_hours: float = DEFAULT_MAX_CONNECTION_HOURS,
+        include_connecting: bool = False,
+        max_workers: int = 8,
+        max_in_flight: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if max_legs <= 0 or max_legs > MAX_LEGS:
+            raise ValueError(f"max_legs must be between 1 and {MAX_LEGS}.")
+        self.client = client
+        self.hubs = list(dict.fromkeys(str(hub).upper() for hub in hubs))
+        for hub in self.hubs:
+            validate_airport_code(hub, "hub")
+        self.max_legs = max_legs
+        self.min_connection_minutes = min_connection_minutes
+        self.max_connection_hours = max_connection_hours
+        self.include_connecting = include_connecting
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = ItinerarySearchStats()
+
+    def _leg_input(
+        self, search_input: Dict[str, Any], query: FlightSearchQuery, origin: str, destination: str, first: bool
+    ) -> Dict[str, Any]:
+        extra_days = 0 if first else math.ceil(self.max_connection_hours / 24) * (self.max_legs - 1)
+        date_from, date_from_end = _date_span(query, extra_days)
+        leg = {
+            key: value
+            for key, value in search_input.items()
+            if key in {"adults", "teens", "children", "infants", "currency", "locale"}
+        }
+        leg.update(origin=origin, destination=destination, dateFrom=date_from, tripType="ONE_WAY")
+        if date_from_end:
+            leg["dateFromEnd"] = date_from_end
+        if self.include_connecting and first and destination == query.destination:
+            leg["includeConnectingFlights"] = True
+        return leg
+
+    def _fetch(self, graph: RouteGraph, inputs: List[Dict[str, Any]]) -> Set[str]:
+        """Run one round of leg searches in parallel; returns airports with flights."""
+        reached: Set[str] = set()
+        self.stats.leg_queries += len(inputs)
+        for result in run_batch(
+            self.client,
+            inputs,
+            max_workers=self.max_workers,
+            max_in_flight=self.max_in_flight,
+            logger=self.logger,
+        ):
+            if not result.ok:
+                self.stats.failed_queries += 1
+                continue
+            if graph.add_flights(result.flights):
+                reached.add(result.search_input["destination"])
+            result.flights = []
+        return reached
+
+    def build_graph(self, search_input: Dict[str, Any]) -> RouteGraph:
+        query = FlightSearchQuery.from_dict(search_input)
+        if query.trip_type == "ROUND_TRIP":
+            raise ValueError("Itinerary search supports ONE_WAY queries only; search each direction separately.")
+        origin, destination = query.origin, query.destination
+        hubs = [hub for hub in self.hubs if hub not in {origin, destination}]
+
+        graph = RouteGraph()
+        searched: Set[Tuple[str, str]] = set()
+        frontier = [origin]
+        for depth in range(self.max_legs):
+            last_round = depth == self.max_legs - 1
+            pairs = []
+            for airport in frontier:
+                targets = [destination] if last_round else hubs + [destination]
+                for target in targets:
+                    if target != airport and (airport, target) not in searched:
+                        searched.add((airport, target))
+                        pairs.append((airport, target))
+            if not pairs:
+                break
+            inputs = [self._leg_input(search_input, query, a, b, first=depth == 0) for a, b in pairs]
+            reached = self._fetch(graph, inputs)
+            frontier = sorted(reached - {origin, destination})
+        self.stats.flights = len(graph)
+        return graph
+
+    def search(self, search_input: Dict[str, Any], limit: Optional[int] = None) -> List[Itinerary]:
+        """Fetch the legs for `search_input` and return its cheapest itineraries."""
+        started = time.perf_counter()
+        query = FlightSearchQuery.from_dict(search_input)
+        graph = self.build_graph(search_input)
+        window_start = parse_utc_epoch(f"{query.date_from}T00:00:00")
+        window_end = parse_utc_epoch(f"{query.date_from_end or query.date_from}T23:59:59")
+        itineraries = graph.cheapest_itineraries(
+            query.origin,
+            query.destination,
+            depart_after=window_start,
+            depart_before=window_end,
+            min_connection_minutes=self.min_connection_minutes,
+            max_connection_hours=self.max_connection_hours,
+            max_legs=self.max_legs,
+            limit=limit or query.max_items or 10,
+        )
+        self.stats.elapsed = time.perf_counter() - started
+        self.logger.info(
+            "Itinerary search %s-%s: %d itineraries from %d flights (%s)",
+            query.origin,
+            query.destination,
+            len(itineraries),
+            len(graph),
+            self.stats.as_dict(),
+        )
+        return itineraries
+
+def search_itineraries(
+    client: Any,
+    search_input: Dict[str, Any],
+    max_workers: int = 8,
+    max_in_flight: Optional[int] = None,
+    logger: Optional[logging.Logger] = None,
+) -> List[Itinerary]:
+    """
+    Convenience wrapper reading the itinerary options from the search input:
+
+    {
+      "hubs": ["STN", "BGY"],
+      "maxLegs": 2,
+      "minConnectionMinutes": 90,
+      "maxConnectionHours": 12,
+      "includeConnectingFlights": true
+    }
+    """
+    engine = ItinerarySearch(
+        client,
+        hubs=search_input.get("hubs") or [],
+        max_legs=int(search_input.get("maxLegs", 2)),
+        min_connection_minutes=float(search_input.get("minConnectionMinutes", DEFAULT_MIN_CONNECTION_MINUTES)),
+        max_connection_hours=float(search_input.get("maxConnectionHours", DEFAULT_MAX_CONNECTION_HOURS)),
+        include_connecting=bool(search_input.get("includeConnectingFlights", False)),
+        max_workers=max_workers,
+        max_in_flight=max_in_flight,
+        logger=logger,
+    )
+    return engine.search(search_input)
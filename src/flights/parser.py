@@ -1,11 +1,203 @@
 from __future__ import annotations
 
+import calendar
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+PARSE_SECONDS = REGISTRY.histogram("ryanair_parse_seconds", "Time spent in parse_availability_response.")
+ROWS_PARSED = REGISTRY.counter("ryanair_parsed_rows_total", "Flights produced by parse_availability_response.")
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
+def parse_utc_epoch(value: Optional[str]) -> Optional[int]:
+    """Parse an API timestamp like '2021-05-02T16:55:00.000Z' into UTC epoch seconds."""
+    if not value or len(value) < 19:
+        return None
+    try:
+        return calendar.timegm(
+            (
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+                0,
+                0,
+                0,
+            )
+        )
+    except ValueError:
+        return None
+
+def format_utc_epoch(value: Optional[int], suffix: str = ".000") -> Optional[str]:
+    """Inverse of `parse_utc_epoch`; `suffix` is what followed the seconds in the source (e.g. '.000Z')."""
+    if value is None:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(value)) + suffix
+
+def _time_suffix(value: Optional[str]) -> Optional[str]:
+    """The part of a source timestamp that `parse_utc_epoch` does not capture (all of it if unparseable)."""
+    if value is None:
+        return None
+    if parse_utc_epoch(value) is None:
+        return value
+    # interned: nearly every timestamp of a payload shares the same suffix
+    return sys.intern(value[19:])
+
+def _restore_time(epoch: Optional[int], suffix: Optional[str]) -> Optional[str]:
+    return suffix if epoch is None else format_utc_epoch(epoch, suffix or "")
+
+_Scalar = (str, int, float, bool, type(None))
+
+def _scalar_items(mapping: Dict[str, Any], skip: Tuple[str, ...] = ()) -> Tuple[Tuple[str, Any], ...]:
+    return tuple((k, v) for k, v in mapping.items() if k not in skip and isinstance(v, _Scalar))
+
+# Keys of `regularFare` and of its first fare that `Flight` keeps as fields,
+# in the order the API sends them; `fare_fields` has one bit per key present.
+_FARE_KEYS = ("fareKey", "fareClass", "fares")
+_FIRST_FARE_KEYS = ("type", "amount", "count", "hasDiscount", "publishedFare")
+_HAS_REGULAR_FARE = 1 << (len(_FARE_KEYS) + len(_FIRST_FARE_KEYS))
+
+def _present(mapping: Dict[str, Any], keys: Tuple[str, ...], shift: int) -> int:
+    return sum(1 << (shift + i) for i, key in enumerate(keys) if key in mapping)
+
+@dataclass(frozen=True)
+class Flight:
+    """
+    Compact, typed flight record.
+
+    Only scalars are stored, so a record never keeps parts of the response
+    alive. Timestamps are UTC epoch seconds plus the text that followed the
+    seconds in the source (typically `.000Z`; the whole string when it
+    could not be parsed). `regularFare` is flattened into `fare_*`, `price`
+    and `published_fare`, with the remaining scalar entries of its fares as
+    `(key, value)` tuples, and `to_dict()` rebuilds it, reproducing the dict
+    returned by `parse_availability_response` (nested dicts or lists inside
+    a fare are not kept).
+    """
+
+    __slots__ = (
+        "origin",
+        "destination",
+        "duration",
+        "flight_number",
+        "price",
+        "departure",
+        "arrival",
+        "departure_suffix",
+        "arrival_suffix",
+        "key",
+        "scraped_at",
+        "fare_key",
+        "fare_class",
+        "fare_type",
+        "fare_count",
+        "has_discount",
+        "published_fare",
+        "fare_extras",
+        "other_fares",
+        "fare_fields",
+        "operated_by",
+    )
+
+    origin: Optional[str]
+    destination: Optional[str]
+    duration: Optional[str]
+    flight_number: Optional[str]
+    price: Optional[float]
+    departure: Optional[int]
+    arrival: Optional[int]
+    departure_suffix: Optional[str]
+    arrival_suffix: Optional[str]
+    key: Optional[str]
+    scraped_at: str
+    fare_key: Optional[str]
+    fare_class: Optional[str]
+    fare_type: Optional[str]
+    fare_count: Optional[int]
+    has_discount: Optional[bool]
+    published_fare: Optional[float]
+    fare_extras: Tuple[Tuple[str, Any], ...]
+    other_fares: Tuple[Tuple[Tuple[str, Any], ...], ...]
+    fare_fields: int
+    operated_by: Optional[str]
+
+    @classmethod
+    def from_payload(cls, trip: Dict[str, Any], flight: Dict[str, Any], scraped_at: str) -> "Flight":
+        time_utc = flight.get("timeUTC") or []
+        departure = time_utc[0] if len(time_utc) > 0 else None
+        arrival = time_utc[1] if len(time_utc) > 1 else None
+        regular_fare = flight.get("regularFare")
+        fare = regular_fare or {}
+        fares = fare.get("fares") or []
+        first = fares[0] if fares else {}
+        count = first.get("count")
+        has_discount = first.get("hasDiscount")
+        fare_fields = _present(fare, _FARE_KEYS, 0) | _present(first, _FIRST_FARE_KEYS, len(_FARE_KEYS))
+        if regular_fare is not None:
+            fare_fields |= _HAS_REGULAR_FARE
+        return cls(
+            origin=trip.get("origin"),
+            destination=trip.get("destination"),
+            duration=flight.get("duration"),
+            flight_number=flight.get("flightNumber"),
+            price=_extract_price(flight),
+            departure=parse_utc_epoch(departure),
+            arrival=parse_utc_epoch(arrival),
+            departure_suffix=_time_suffix(departure),
+            arrival_suffix=_time_suffix(arrival),
+            key=flight.get("key"),
+            scraped_at=scraped_at,
+            fare_key=fare.get("fareKey"),
+            fare_class=fare.get("fareClass"),
+            fare_type=first.get("type"),
+            fare_count=int(count) if count is not None else None,
+            has_discount=bool(has_discount) if has_discount is not None else None,
+            published_fare=first.get("publishedFare"),
+            fare_extras=_scalar_items(first, _FIRST_FARE_KEYS),
+            other_fares=tuple(_scalar_items(other) for other in fares[1:]),
+            fare_fields=fare_fields,
+            operated_by=flight.get("operatedBy"),
+        )
+
+    def _regular_fare(self) -> Optional[Dict[str, Any]]:
+        if not self.fare_fields & _HAS_REGULAR_FARE:
+            return None
+        values = (self.fare_key, self.fare_class, None)
+        regular_fare = {key: values[i] for i, key in enumerate(_FARE_KEYS) if self.fare_fields & (1 << i)}
+        if "fares" in regular_fare:
+            first_values = (self.fare_type, self.price, self.fare_count, self.has_discount, self.published_fare)
+            shift = len(_FARE_KEYS)
+            first = {
+                key: first_values[i] for i, key in enumerate(_FIRST_FARE_KEYS) if self.fare_fields & (1 << (shift + i))
+            }
+            first.update(self.fare_extras)
+            fares = [first] if first or self.other_fares else []
+            regular_fare["fares"] = fares + [dict(other) for other in self.other_fares]
+        return regular_fare
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "Origin": self.origin,
+            "Destination": self.destination,
+            "Flight duration": self.duration,
+            "Flight number": self.flight_number,
+            "Price": self.price,
+            "Time departure": _restore_time(self.departure, self.departure_suffix),
+            "Time arrival": _restore_time(self.arrival, self.arrival_suffix),
+            "key": self.key,
+            "scrapedAt": self.scraped_at,
+            "regularFare": self._regular_fare(),
+            "operatedBy": self.operated_by,
+        }
+
 def _extract_price(flight: Dict[str, Any]) -> Optional[float]:
     fare = flight.get("regularFare") or {}
     fares = fare.get("fares") or []
@@ -17,13 +209,132 @@ def _extract_price(flight: Dict[str, Any]) -> Optional[float]:
     except (TypeError, ValueError):
         return None
 
+def _date_of(date_block: Dict[str, Any]) -> str:
+    return str(date_block.get("dateOut") or "")[:10]
+
+def merge_availability_responses(responses: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge responses of several flex-window calls into one payload.
+
+    Trips are matched on (origin, destination); their `dates` blocks are
+    concatenated in date order, keeping the first block seen for each day.
+    """
+    merged_trips: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    seen_dates: Dict[Tuple[Any, Any], set] = {}
+    merged: Dict[str, Any] = {}
+
+    for response in responses:
+        for key, value in response.items():
+            if key != "trips":
+                merged.setdefault(key, value)
+        for trip in response.get("trips", []):
+            trip_key = (trip.get("origin"), trip.get("destination"))
+            target = merged_trips.get(trip_key)
+            if target is None:
+                target = dict(trip, dates=[])
+                merged_trips[trip_key] = target
+                seen_dates[trip_key] = set()
+            for date_block in trip.get("dates", []):
+                day = _date_of(date_block)
+                if day in seen_dates[trip_key]:
+                    continue
+                seen_dates[trip_key].add(day)
+                target["dates"].append(date_block)
+
+    for trip in merged_trips.values():
+        trip["dates"].sort(key=_date_of)
+    merged["trips"] = list(merged_trips.values())
+    return merged
+
+def parse_availability_by_date(
+    response: Dict[str, Any],
+    date_range: Optional[Tuple[str, str]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split a (possibly multi-date) payload into per-day flight lists.
+
+    Keys are outbound `YYYY-MM-DD` dates in response order; every day of the
+    outbound trip is present, even when it has no flights.
+    """
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    scraped_at = _utc_now_iso()
+    for trip_index, trip in enumerate(response.get("trips", [])):
+        for date_block in trip.get("dates", []):
+            day = _date_of(date_block)
+            if trip_index == 0 and not _in_range(day, date_range):
+                continue
+            bucket = by_date.setdefault(day, [])
+            for flight in date_block.get("flights", []):
+                bucket.append(_flight_item(trip, flight, scraped_at))
+    return by_date
+
+def _in_range(day: str, date_range: Optional[Tuple[str, str]]) -> bool:
+    if date_range is None:
+        return True
+    return date_range[0] <= day <= date_range[1]
+
+def _iter_raw_flights(
+    response: Dict[str, Any],
+    max_items: Optional[int],
+    date_range: Optional[Tuple[str, str]],
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    if max_items is not None and max_items <= 0:
+        return
+    produced = 0
+    for trip_index, trip in enumerate(response.get("trips", [])):
+        for date_block in trip.get("dates", []):
+            if trip_index == 0 and not _in_range(_date_of(date_block), date_range):
+                continue
+            for flight in date_block.get("flights", []):
+                yield trip, flight
+                produced += 1
+
+                if max_items is not None and produced >= max_items:
+                    return
+
+def _flight_item(trip: Dict[str, Any], flight: Dict[str, Any], scraped_at: str) -> Dict[str, Any]:
+    time_utc = flight.get("timeUTC") or []
+    time_departure = time_utc[0] if len(time_utc) > 0 else None
+    time_arrival = time_utc[1] if len(time_utc) > 1 else None
+
+    return {
+        "Origin": trip.get("origin"),
+        "Destination": trip.get("destination"),
+        "Flight duration": flight.get("duration"),
+        "Flight number": flight.get("flightNumber"),
+        "Price": _extract_price(flight),
+        "Time departure": time_departure,
+        "Time arrival": time_arrival,
+        "key": flight.get("key"),
+        "scrapedAt": scraped_at,
+        "regularFare": flight.get("regularFare"),
+        "operatedBy": flight.get("operatedBy"),
+    }
+
 def parse_availability_response(
     response: Dict[str, Any],
     max_items: Optional[int] = None,
+    date_range: Optional[Tuple[str, str]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Normalize Ryanair availability payload into a flat list of flight dicts.
 
+    See `iter_availability` for the payload schema; this is its list form.
+    """
+    with PARSE_SECONDS.time():
+        flights = list(iter_availability(response, max_items=max_items, date_range=date_range))
+    ROWS_PARSED.inc(len(flights))
+    return flights
+
+def iter_availability(
+    response: Dict[str, Any],
+    max_items: Optional[int] = None,
+    date_range: Optional[Tuple[str, str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield normalized flight dicts from a Ryanair availability payload,
+    stopping as soon as `max_items` flights have been produced.
+
     Expected (simplified) response schema:
 
     {
@@ -49,35 +360,21 @@ def parse_availability_response(
         }
       ]
     }
+
+    `date_range` (inclusive `YYYY-MM-DD` bounds) drops outbound date blocks
+    outside the requested window, e.g. the tail of a flex-day response.
+    Only the first (outbound) trip is filtered.
     """
-    results: List[Dict[str, Any]] = []
     scraped_at = _utc_now_iso()
+    for trip, flight in _iter_raw_flights(response, max_items, date_range):
+        yield _flight_item(trip, flight, scraped_at)
 
-    for trip in response.get("trips", []):
-        origin = trip.get("origin")
-        destination = trip.get("destination")
-        for date_block in trip.get("dates", []):
-            for flight in date_block.get("flights", []):
-                time_utc = flight.get("timeUTC") or []
-                time_departure = time_utc[0] if len(time_utc) > 0 else None
-                time_arrival = time_utc[1] if len(time_utc) > 1 else None
-
-                item = {
-                    "Origin": origin,
-                    "Destination": destination,
-                    "Flight duration": flight.get("duration"),
-                    "Flight number": flight.get("flightNumber"),
-                    "Price": _extract_price(flight),
-                    "Time departure": time_departure,
-                    "Time arrival": time_arrival,
-                    "key": flight.get("key"),
-                    "scrapedAt": scraped_at,
-                    "regularFare": flight.get("regularFare"),
-                    "operatedBy": flight.get("operatedBy"),
-                }
-                results.append(item)
-
-                if max_items is not None and len(results) >= max_items:
-                    return results
-
-    return results
\ No newline at end of file
+def iter_flights(
+    response: Dict[str, Any],
+    max_items: Optional[int] = None,
+    date_range: Optional[Tuple[str, str]] = None,
+) -> Iterator[Flight]:
+    """Like `iter_availability`, but yields compact `Flight` records."""
+    scraped_at = _utc_now_iso()
+    for trip, flight in _iter_raw_flights(response, max_items, date_range):
+        yield Flight.from_payload(trip, flight, scraped_at)
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.logger import correlation_scope
+from utils.metrics import REGISTRY
+
+from .batch import BatchResult, _as_query
+from .parser import PARSE_SECONDS, ROWS_PARSED, iter_availability, merge_availability_responses
+from .schema import build_availability_decoder
+
+STAGE_ITEMS = REGISTRY.counter("ryanair_pipeline_items_total", "Items completed per pipeline stage.", ("stage",))
+STAGE_BYTES = REGISTRY.counter("ryanair_pipeline_bytes_total", "Bytes handled per pipeline stage.", ("stage",))
+STAGE_BUSY = REGISTRY.counter(
+    "ryanair_pipeline_busy_seconds_total", "Time pipeline stages spent working, summed over workers.", ("stage",)
+)
+STAGE_WAIT = REGISTRY.counter(
+    "ryanair_pipeline_wait_seconds_total",
+    "Time pipeline stages spent waiting: fetch on a free slot, process in the pool queue, write on results.",
+    ("stage",),
+)
+SLOTS_IN_USE = REGISTRY.gauge("ryanair_pipeline_slots_in_use", "Shared-memory slots holding unwritten responses.")
+
+STAGES = ("fetch", "process", "write")
+
+# `(flight_count, encoded_length, overflow_text, busy_seconds, parse_seconds)` returned by a worker
+_ProcessOutcome = Tuple[int, int, Optional[bytes], float, float]
+
+EncodeItems = Callable[[str, Iterable[Any]], str]
+
+class StageStats:
+    """Running totals of one pipeline stage."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.bytes = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int = 1, nbytes: int = 0, busy: float = 0.0, wait: float = 0.0) -> None:
+        with self._lock:
+            self.items += items
+            self.bytes += nbytes
+            self.busy_seconds += busy
+            self.wait_seconds += wait
+        STAGE_ITEMS.inc(items, stage=self.name)
+        STAGE_BYTES.inc(nbytes, stage=self.name)
+        STAGE_BUSY.inc(busy, stage=self.name)
+        STAGE_WAIT.inc(wait, stage=self.name)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """Throughput over `elapsed` wall seconds; `utilisation` near 1.0 marks the bottleneck stage."""
+        elapsed = max(elapsed, 1e-9)
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "items": self.items,
+                "bytes": self.bytes,
+                "itemsPerSecond": round(self.items / elapsed, 1),
+                "megabytesPerSecond": round(self.bytes / elapsed / 1e6, 2),
+                "busySeconds": round(self.busy_seconds, 3),
+                "waitSeconds": round(self.wait_seconds, 3),
+                "utilisation": round(self.busy_seconds / (elapsed * self.workers), 3),
+            }
+
+class SharedSlotPool:
+    """
+    Fixed set of equally sized shared-memory buffers.
+
+    The queue of free slots is the bounded queue between fetching and
+    processing: `acquire` blocks while every slot holds a response that has
+    not been written yet.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int) -> None:
+        if slots <= 0:
+            raise ValueError("slots must be a positive integer.")
+        if slot_bytes <= 0:
+            raise ValueError("slot_bytes must be a positive integer.")
+        self.slot_bytes = slot_bytes
+        self._segments: List[shared_memory.SharedMemory] = []
+        self._free: "queue.Queue[int]" = queue.Queue()
+        try:
+            for slot in range(slots):
+                self._segments.append(shared_memory.SharedMemory(create=True, size=slot_bytes))
+                self._free.put(slot)
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def acquire(self, stop: threading.Event, poll: float = 0.1) -> Optional[int]:
+        """Wait for a free slot; None once `stop` is set."""
+        while not stop.is_set():
+            try:
+                slot = self._free.get(timeout=poll)
+            except queue.Empty:
+                continue
+            SLOTS_IN_USE.inc(1)
+            return slot
+        return None
+
+    def release(self, slot: int) -> None:
+        SLOTS_IN_USE.inc(-1)
+        self._free.put(slot)
+
+    def segment(self, slot: int) -> shared_memory.SharedMemory:
+        return self._segments[slot]
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+@dataclass
+class _Claim:
+    """Where one response sits in shared memory: a pool slot, plus an overflow segment if it did not fit."""
+
+    slot: int
+    segment: shared_memory.SharedMemory
+    pooled: bool
+    spans: Tuple[Tuple[int, int], ...]
+
+@dataclass
+class _Work:
+    result: BatchResult
+    started: float
+    claim: Optional[_Claim] = None
+    future: Optional[Future] = None
+    submitted: float = 0.0
+
+# per-process state of pool workers, set up by `_init_worker`
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(schema: bool, json_backend: Optional[str], fmt: str, encoder: EncodeItems) -> None:
+    _WORKER.update(
+        decoder=build_availability_decoder(schema=schema, backend=json_backend),
+        fmt=fmt,
+        encoder=encoder,
+        segments={},
+    )
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    segments = _WORKER["segments"]
+    segment = segments.get(name)
+    if segment is None:
+        segment = segments[name] = shared_memory.SharedMemory(name=name)
+    return segment
+
+def _decode(view: memoryview) -> Dict[str, Any]:
+    decoder = _WORKER["decoder"]
+    try:
+        return decoder(view)  # msgspec and orjson read the shared buffer in place
+    except TypeError:
+        return decoder(view.tobytes())  # json.loads only takes bytes/str
+
+def _process(
+    name: str,
+    pooled: bool,
+    spans: Tuple[Tuple[int, int], ...],
+    max_items: Optional[int],
+    date_range: Optional[Tuple[str, str]],
+) -> _ProcessOutcome:
+    """
+    Decode, parse and serialize one response held in shared memory.
+
+    The encoded output replaces the response in the same buffer when it fits
+    (the body is no longer needed once decoded); only larger outputs travel
+    back through the result pipe. Parse metrics recorded here would stay in
+    the worker's registry, so the parse time is returned for the parent to
+    record instead.
+    """
+    started = time.perf_counter()
+    segment = _attach(name) if pooled else shared_memory.SharedMemory(name=name)
+    try:
+        payloads = []
+        for offset, length in spans:
+            view = segment.buf[offset : offset + length]
+            try:
+                payloads.append(_decode(view))
+            finally:
+                view.release()
+        payload = payloads[0] if len(payloads) == 1 else merge_availability_responses(payloads)
+        parsing = time.perf_counter()
+        flights = list(iter_availability(payload, max_items=max_items, date_range=date_range))
+        parse_seconds = time.perf_counter() - parsing
+        encoded = _WORKER["encoder"](_WORKER["fmt"], flights).encode("utf-8")
+        overflow = None
+        if len(encoded) <= segment.size:
+            segment.buf[: len(encoded)] = encoded
+        else:
+            overflow = encoded
+        return len(flights), len(encoded), overflow, time.perf_counter() - started, parse_seconds
+    finally:
+        if not pooled:
+            segment.close()
+
+class ScrapePipeline:
+    """
+    Staged fetch -> process -> write pipeline for large batches.
+
+    - fetch: `fetch_workers` threads download raw response bodies through the
+      shared client (`fetch_windows`, built with the `raw_body` decoder) and
+      copy them into a free slot of a `SharedSlotPool`
+    - process: a pool of `process_workers` processes attaches to the slot,
+      decodes, parses and serializes the flights with `encoder` (see
+      `outputs.exporter.encode_items`) and writes the text back into the slot
+    - write: the calling thread passes the text to `writer.write_encoded`
+      and frees the slot
+
+    Only segment names and offsets are pickled between processes, never
+    payloads or flight dicts. Every stage applies backpressure: fetchers block
+    on a free slot, slots stay taken until their output is written, and
+    inputs are consumed lazily. Per-stage throughput is exported as metrics
+    and available from `summary()`; results are yielded as `BatchResult`s
+    (with `flight_count` set, `flights` left empty) in completion order.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        writer: Any,
+        encoder: EncodeItems,
+        fetch_workers: int = 4,
+        process_workers: Optional[int] = None,
+        slots: Optional[int] = None,
+        slot_bytes: int = 4 * 1024 * 1024,
+        schema: bool = True,
+        json_backend: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+        mp_context: Optional[Any] = None,
+    ) -> None:
+        process_workers = process_workers or os.cpu_count() or 1
+        if fetch_workers <= 0 or process_workers <= 0:
+            raise ValueError("fetch_workers and process_workers must be positive integers.")
+        if not hasattr(writer, "write_encoded"):
+            raise ValueError(f"{type(writer).__name__} cannot write pre-encoded output; use the json or jsonl format.")
+        self.client = client
+        self.writer = writer
+        self.encoder = encoder
+        self.fetch_workers = fetch_workers
+        self.process_workers = process_workers
+        self.slots = slots or 2 * process_workers
+        self.slot_bytes = slot_bytes
+        self.schema = schema
+        self.json_backend = json_backend
+        self.logger = logger or logging.getLogger(__name__)
+        # forking a process that runs network threads is unsafe, so workers are spawned
+        self.mp_context = mp_context or multiprocessing.get_context("spawn")
+        self.stats = {
+            "fetch": StageStats("fetch", fetch_workers),
+            "process": StageStats("process", process_workers),
+            "write": StageStats("write", 1),
+        }
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+
+    def summary(self) -> Dict[str, Any]:
+        return {name: self.stats[name].summary(self.elapsed) for name in STAGES}
+
+    def _fetch_bodies(self, query: Any) -> List[bytes]:
+        fetch_windows = getattr(self.client, "fetch_windows", None)
+        bodies = fetch_windows(query) if fetch_windows is not None else [self.client.search_flights(query)]
+        for body in bodies:
+            if not isinstance(body, (bytes, bytearray)):
+                raise RuntimeError("Pipeline clients must return raw response bodies; build them with json_decoder=raw_body.")
+        return bodies
+
+    def _claim(self, pool: SharedSlotPool, bodies: List[bytes]) -> _Claim:
+        total = sum(len(body) for body in bodies)
+        waited = time.perf_counter()
+        slot = pool.acquire(self._stop)
+        if slot is None:
+            raise RuntimeError("Pipeline stopped before the response could be queued.")
+        self.stats["fetch"].record(items=0, wait=time.perf_counter() - waited)
+        if total <= pool.slot_bytes:
+            segment, pooled = pool.segment(slot), True
+        else:
+            segment, pooled = shared_memory.SharedMemory(create=True, size=total), False
+        spans = []
+        offset = 0
+        for body in bodies:
+            segment.buf[offset : offset + len(body)] = body
+            spans.append((offset, len(body)))
+            offset += len(body)
+        return _Claim(slot, segment, pooled, tuple(spans))
+
+    def _release(self, pool: SharedSlotPool, claim: _Claim) -> None:
+        if not claim.pooled:
+            claim.segment.close()
+            claim.segment.unlink()
+        pool.release(claim.slot)
+
+    def _fetch(
+        self,
+        index: int,
+        search_input: Any,
+        pool: SharedSlotPool,
+        processes: ProcessPoolExecutor,
+        done: "queue.Queue[_Work]",
+    ) -> None:
+        work = _Work(BatchResult(index=index, search_input=search_input), time.perf_counter())
+        result = work.result
+        with correlation_scope() as cid:
+            result.correlation_id = cid
+            try:
+                query = _as_query(search_input)
+                result.query = query
+                bodies = self._fetch_bodies(query)
+                self.stats["fetch"].record(
+                    nbytes=sum(len(body) for body in bodies), busy=time.perf_counter() - work.started
+                )
+                work.claim = self._claim(pool, bodies)
+                work.submitted = time.perf_counter()
+                work.future = processes.submit(
+                    _process,
+                    work.claim.segment.name,
+                    work.claim.pooled,
+                    work.claim.spans,
+                    query.max_items,
+                    query.date_range,
+                )
+            except Exception as exc:
+                result.error = str(exc) or exc.__class__.__name__
+                if not self._stop.is_set():
+                    self.logger.warning("Pipeline query #%d failed: %s", index, result.error)
+                done.put(work)
+                return
+        work.future.add_done_callback(lambda _: done.put(work))
+
+    def _write(self, work: _Work, pool: SharedSlotPool) -> BatchResult:
+        result, claim = work.result, work.claim
+        try:
+            if work.future is not None:
+                try:
+                    count, length, overflow, busy, parse_seconds = work.future.result()
+                except Exception as exc:
+                    result.error = str(exc) or exc.__class__.__name__
+                    self.logger.warning("Pipeline query #%d failed: %s", result.index, result.error)
+                else:
+                    PARSE_SECONDS.observe(parse_seconds)
+                    ROWS_PARSED.inc(count)
+                    queued = time.perf_counter() - work.submitted - busy
+                    self.stats["process"].record(
+                        nbytes=sum(span[1] for span in claim.spans), busy=busy, wait=max(0.0, queued)
+                    )
+                    started = time.perf_counter()
+                    if overflow is not None:
+                        text = overflow.decode("utf-8")
+                    else:
+                        with claim.segment.buf[:length] as view:
+                            text = str(view, "utf-8")
+                    self.writer.write_encoded(text, count)
+                    result.flight_count = count
+                    self.stats["write"].record(nbytes=length, busy=time.perf_counter() - started)
+        finally:
+            if claim is not None:
+                self._release(pool, claim)
+        result.elapsed = time.perf_counter() - work.started
+        return result
+
+    def run(self, search_inputs: Iterable[Any]) -> Iterator[BatchResult]:
+        """
+        Run every input through the pipeline, yielding one `BatchResult` each.
+
+        At most `fetch_workers + slots` inputs are in flight at once.
+        """
+        self._stop.clear()
+        inputs = enumerate(search_inputs)
+        done: "queue.Queue[_Work]" = queue.Queue()
+        in_flight = 0
+        limit = self.fetch_workers + self.slots
+        started = time.perf_counter()
+        pool = SharedSlotPool(self.slots, self.slot_bytes)
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetchers, ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=self.mp_context,
+                initializer=_init_worker,
+                initargs=(self.schema, self.json_backend, self.writer.format_name, self.encoder),
+            ) as processes:
+                try:
+                    exhausted = False
+                    while True:
+                        while not exhausted and in_flight < limit:
+                            try:
+                                index, search_input = next(inputs)
+                            except StopIteration:
+                                exhausted = True
+                                break
+                            fetchers.submit(self._fetch, index, search_input, pool, processes, done)
+                            in_flight += 1
+                        if not in_flight:
+                            break
+                        waited = time.perf_counter()
+                        work = done.get()
+                        self.stats["write"].record(items=0, wait=time.perf_counter() - waited)
+                        in_flight -= 1
+                        yield self._write(work, pool)
+                finally:
+                    # unblock fetchers waiting on a slot if the consumer stopped early
+                    self._stop.set()
+        finally:
+            # both executors have shut down, so no more work arrives; free what was never written
+            while not done.empty():
+                work = done.get_nowait()
+                if work.claim is not None:
+                    self._release(pool, work.claim)
+            pool.close()
+            self.elapsed = time.perf_counter() - started
+            self.logger.info("Pipeline throughput: %s", self.summary())
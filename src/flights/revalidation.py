@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+from .parser import _utc_now_iso, parse_availability_response
+
+try:  # urllib3 lists the content codings it can decode (br/zstd when their packages are installed)
+    from urllib3.util.request import ACCEPT_ENCODING
+except ImportError:  # pragma: no cover - depends on environment
+    ACCEPT_ENCODING = "gzip,deflate"
+
+try:  # optional dependency, lets aiohttp decode brotli bodies
+    import brotli  # noqa: F401
+
+    ASYNC_ACCEPT_ENCODING = "gzip,deflate,br"
+except ImportError:  # pragma: no cover - depends on environment
+    ASYNC_ACCEPT_ENCODING = "gzip,deflate"
+
+RESPONSE_BYTES = REGISTRY.counter(
+    "ryanair_http_response_bytes_total",
+    "Availability response body bytes received over the wire, by route.",
+    ("route",),
+)
+BYTES_SAVED = REGISTRY.counter(
+    "ryanair_http_bytes_saved_total",
+    "Availability body bytes not transferred, by route and reason (compression or not_modified).",
+    ("route", "reason"),
+)
+NOT_MODIFIED = REGISTRY.counter(
+    "ryanair_http_not_modified_total",
+    "Conditional availability requests answered with 304 Not Modified, by route.",
+    ("route",),
+)
+
+def record_transfer(route: str, wire_bytes: int, body_bytes: int) -> None:
+    """Account one response body: `wire_bytes` as received, `body_bytes` once decoded."""
+    RESPONSE_BYTES.inc(wire_bytes, route=route)
+    if body_bytes > wire_bytes:
+        BYTES_SAVED.inc(body_bytes - wire_bytes, route=route, reason="compression")
+
+@dataclass
+class _Validated:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    payload: Dict[str, Any]
+    wire_bytes: int
+    # parsed flights per `(max_items, date_range)`, see `ValidatorStore.parse`
+    parsed: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = field(default_factory=dict)
+
+class ValidatorStore:
+    """
+    `ETag` / `Last-Modified` validators per request, with the decoded payload
+    they validate.
+
+    The client sends the validators as `If-None-Match` / `If-Modified-Since`
+    on the next identical request; a 304 answer returns the stored payload
+    as-is, skipping both the download and JSON decoding, and `parse` hands
+    back the flights parsed from it the first time. Stored payloads are
+    shared and must not be mutated. Entries are kept in LRU order, bounded by
+    `max_entries`; responses without validators are not stored.
+    """
+
+    def __init__(self, max_entries: int = 5000) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer.")
+        self.max_entries = max_entries
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_received: Dict[str, int] = {}
+        self.bytes_saved: Dict[str, int] = {}
+        self._entries: "OrderedDict[str, _Validated]" = OrderedDict()
+        self._payload_keys: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(params: Mapping[str, Any]) -> str:
+        return "&".join(f"{name}={params[name]}" for name in sorted(params))
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        with self._lock:
+            self.requests += 1
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers: Dict[str, str] = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, key: str, route: str, headers: Mapping[str, str], payload: Dict[str, Any], wire_bytes: int) -> None:
+        """Remember the validators of a 200 response (if it has any)."""
+        with self._lock:
+            self.bytes_received[route] = self.bytes_received.get(route, 0) + wire_bytes
+            etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+            self._forget(self._entries.pop(key, None))
+            if not etag and not last_modified:
+                return
+            self._entries[key] = _Validated(etag, last_modified, payload, wire_bytes)
+            self._payload_keys[id(payload)] = key
+            while len(self._entries) > self.max_entries:
+                self._forget(self._entries.popitem(last=False)[1])
+
+    def _forget(self, entry: Optional[_Validated]) -> None:
+        if entry is not None:
+            self._payload_keys.pop(id(entry.payload), None)
+
+    def revalidated(self, key: str, route: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored payload for a 304 answer, or None if it was evicted in the
+        meantime (the caller then repeats the request unconditionally).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.not_modified += 1
+            self.bytes_saved[route] = self.bytes_saved.get(route, 0) + entry.wire_bytes
+        NOT_MODIFIED.inc(route=route)
+        BYTES_SAVED.inc(entry.wire_bytes, route=route, reason="not_modified")
+        return entry.payload
+
+    def parse(
+        self,
+        payload: Dict[str, Any],
+        max_items: Optional[int] = None,
+        date_range: Optional[Tuple[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        `parse_availability_response` for a payload returned by the client.
+
+        A stored payload (the very object a 304 hands back) is parsed once;
+        later calls copy those flights with a fresh `scrapedAt` instead of
+        parsing again. Other payloads, e.g. windows merged for a date range,
+        are parsed as usual.
+        """
+        options = (max_items, date_range)
+        with self._lock:
+            entry = self._entries.get(self._payload_keys.get(id(payload), ""))
+            if entry is not None and entry.payload is not payload:
+                entry = None
+            parsed = entry.parsed.get(options) if entry is not None else None
+        if parsed is not None:
+            scraped_at = _utc_now_iso()
+            return [dict(flight, scrapedAt=scraped_at) for flight in parsed]
+        flights = parse_availability_response(payload, max_items=max_items, date_range=date_range)
+        if entry is not None:
+            with self._lock:
+                entry.parsed[options] = flights
+        return list(flights)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = sorted(set(self.bytes_received) | set(self.bytes_saved))
+            return {
+                "requests": self.requests,
+                "notModified": self.not_modified,
+                "routes": {
+                    route: {
+                        "bytesReceived": self.bytes_received.get(route, 0),
+                        "bytesSaved": self.bytes_saved.get(route, 0),
+                    }
+                    for route in routes
+                },
+            }
+
+def parse_response(
+    client: Any,
+    payload: Dict[str, Any],
+    max_items: Optional[int] = None,
+    date_range: Optional[Tuple[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Parse `payload` through the client's `ValidatorStore` when it has one (see `ValidatorStore.parse`)."""
+    store = getattr(client, "validator_store", None)
+    if isinstance(store, ValidatorStore):
+        return store.parse(payload, max_items=max_items, date_range=date_range)
+    return parse_availability_response(payload, max_items=max_items, date_range=date_range)
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logger import correlation_scope
+from utils.rate_limiter import TokenBucket
+
+from .api_client import plan_flex_windows
+from .cache import route_key
+from .revalidation import parse_response
+from .validator import FlightSearchQuery
+from .watchlist import WatchlistError, is_spec, iter_spec_queries, load_specs, schedule_fields
+
+@dataclass
+class WatchedRoute:
+    """A query refreshed periodically by `RouteScheduler`, plus its refresh history."""
+
+    query: FlightSearchQuery
+    refresh_seconds: Optional[float] = None
+    priority: int = 0  # among due routes, lower numbers are refreshed first
+    volatility: float = 0.0
+    failures: int = 0
+    refreshes: int = 0
+    last_prices: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return f"{self.query.origin}-{self.query.destination}@{self.query.date_from}"
+
+    @property
+    def cost(self) -> int:
+        """Number of API calls one refresh needs."""
+        return len(plan_flex_windows(self.query))
+
+    def observe(self, flights: Sequence[Dict[str, Any]]) -> float:
+        """Record a refresh and update the volatility estimate (EWMA of the share of re-priced flights)."""
+        prices = {flight.get("key"): flight.get("Price") for flight in flights if flight.get("key")}
+        if self.last_prices:
+            compared = [key for key in prices if key in self.last_prices]
+            changed = sum(1 for key in compared if prices[key] != self.last_prices[key])
+            changed += len(set(prices) ^ set(self.last_prices))
+            ratio = changed / max(1, len(set(prices) | set(self.last_prices)))
+            self.volatility = 0.7 * self.volatility + 0.3 * ratio
+        self.last_prices = prices
+        self.refreshes += 1
+        return self.volatility
+
+class RefreshPolicy:
+    """
+    Refresh interval for a route.
+
+    The base interval comes from `tiers`, a list of `(max_days_to_departure,
+    seconds)` pairs checked in order; volatile routes are refreshed up to
+    `volatility_speedup` times more often. An explicit `refresh_seconds` on
+    the route wins.
+    """
+
+    DEFAULT_TIERS: Tuple[Tuple[int, float], ...] = (
+        (3, 15 * 60),
+        (14, 60 * 60),
+        (60, 6 * 60 * 60),
+    )
+
+    def __init__(
+        self,
+        tiers: Sequence[Tuple[int, float]] = DEFAULT_TIERS,
+        default_seconds: float = 24 * 60 * 60,
+        volatility_speedup: float = 4.0,
+        min_seconds: float = 60.0,
+    ) -> None:
+        self.tiers = sorted(tiers)
+        self.default_seconds = default_seconds
+        self.volatility_speedup = volatility_speedup
+        self.min_seconds = min_seconds
+
+    def interval_for(self, route: WatchedRoute, today: date) -> float:
+        if route.refresh_seconds:
+            return float(route.refresh_seconds)
+        days = (date.fromisoformat(route.query.date_from) - today).days
+        base = next((seconds for max_days, seconds in self.tiers if days <= max_days), self.default_seconds)
+        speedup = 1.0 + (self.volatility_speedup - 1.0) * min(1.0, route.volatility)
+        return max(self.min_seconds, base / speedup)
+
+    def shortest_interval(self, route: WatchedRoute) -> float:
+        """The shortest interval `interval_for` can ever return for `route`."""
+        if route.refresh_seconds:
+            return float(route.refresh_seconds)
+        fastest = min([seconds for _, seconds in self.tiers] + [self.default_seconds])
+        return max(self.min_seconds, fastest / max(1.0, self.volatility_speedup))
+
+class RouteScheduler:
+    """
+    Long-running scheduler that keeps a watchlist of routes fresh.
+
+    Routes wait in a queue keyed by their next deadline. Once due, they move
+    to a ready queue ordered by `priority` (lower numbers first), then by
+    deadline, so priority decides among all routes due at the same time
+    rather than only breaking exact deadline ties. Due routes are refreshed on a persistent
+    thread pool through one warm client, so sessions, caches and proxy state
+    survive between cycles. An optional global `max_requests_per_minute`
+    budget caps the request rate: when more routes are due than the budget
+    allows, the most overdue ones go first and the rest slip, so adding
+    routes stretches intervals instead of raising traffic. Routes whose
+    departure date has passed are retired.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        routes: Iterable[WatchedRoute],
+        policy: Optional[RefreshPolicy] = None,
+        max_workers: int = 4,
+        max_requests_per_minute: Optional[float] = None,
+        on_result: Optional[Callable[[WatchedRoute, List[Dict[str, Any]]], None]] = None,
+        logger: Optional[logging.Logger] = None,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.client = client
+        self.policy = policy or RefreshPolicy()
+        self.max_workers = max_workers
+        self.on_result = on_result
+        self.logger = logger or logging.getLogger(__name__)
+        self.clock = clock
+        self.today = today
+        self._stop = threading.Event()
+        self._seq = itertools.count()
+        self._queue: List[Tuple[float, int, WatchedRoute]] = []
+        self._ready: List[Tuple[int, float, int, WatchedRoute]] = []
+        self.routes: List[WatchedRoute] = []
+        self._budget: Optional[TokenBucket] = None
+        now = self.clock()
+        for route in routes:
+            self.add_route(route, now)
+        if max_requests_per_minute:
+            largest = max((route.cost for route in self.routes), default=1)
+            self._budget = TokenBucket(max_requests_per_minute / 60.0, capacity=max(largest, self.max_workers))
+
+    def add_route(self, route: WatchedRoute, deadline: Optional[float] = None) -> None:
+        self.routes.append(route)
+        self._push(route, self.clock() if deadline is None else deadline)
+
+    def _push(self, route: WatchedRoute, deadline: float) -> None:
+        heapq.heappush(self._queue, (deadline, next(self._seq), route))
+
+    def _promote_due(self, now: float) -> None:
+        while self._queue and self._queue[0][0] <= now:
+            deadline, seq, route = heapq.heappop(self._queue)
+            heapq.heappush(self._ready, (route.priority, deadline, seq, route))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _is_expired(self, route: WatchedRoute) -> bool:
+        last_day = route.query.date_from_end or route.query.date_from
+        return date.fromisoformat(last_day) < self.today()
+
+    def _refresh(self, route: WatchedRoute) -> List[Dict[str, Any]]:
+        with correlation_scope():
+            raw_response = self.client.search_flights(route.query)
+            return parse_response(
+                self.client, raw_response, max_items=route.query.max_items, date_range=route.query.date_range
+            )
+
+    def _complete(self, route: WatchedRoute, future: Future) -> None:
+        now = self.clock()
+        try:
+            flights = future.result()
+        except Exception as exc:
+            route.failures += 1
+            retry_in = min(self.policy.interval_for(route, self.today()), 60.0 * 2 ** min(route.failures, 6))
+            self.logger.warning("Refresh of %s failed (%s); retrying in %.0fs", route.name, exc, retry_in)
+            self._push(route, now + retry_in)
+            return
+
+        route.failures = 0
+        route.observe(flights)
+        interval = self.policy.interval_for(route, self.today())
+        # the next deadline counts from completion so late routes never pile up catch-up runs
+        self._push(route, now + interval)
+        self.logger.info(
+            "Refreshed %s: %d flights, volatility %.2f, next in %.0fs",
+            route.name,
+            len(flights),
+            route.volatility,
+            interval,
+        )
+        if self.on_result is not None:
+            try:
+                self.on_result(route, flights)
+            except Exception as exc:  # pragma: no cover - callback guard
+                self.logger.error("Result handler failed for %s: %s", route.name, exc)
+
+    def _next_wait(self, now: float) -> float:
+        if self._ready:
+            return 0.0
+        if not self._queue:
+            return 1.0
+        return max(0.0, self._queue[0][0] - now)
+
+    def run(self, max_refreshes: Optional[int] = None) -> int:
+        """
+        Run until `stop()` is called, the watchlist is empty, or
+        `max_refreshes` refreshes have completed. Returns the refresh count.
+        """
+        completed = 0
+        in_flight: Dict[Future, WatchedRoute] = {}
+        started = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while not self._stop.is_set():
+                now = self.clock()
+                budget_wait = 0.0
+                self._promote_due(now)
+                while (
+                    self._ready
+                    and len(in_flight) < self.max_workers
+                    and (max_refreshes is None or started < max_refreshes)
+                ):
+                    route = self._ready[0][3]
+                    if self._is_expired(route):
+                        heapq.heappop(self._ready)
+                        self.routes.remove(route)
+                        self.logger.info("Retiring %s: departure date has passed", route.name)
+                        continue
+                    if self._budget is not None:
+                        budget_wait = self._budget.try_acquire(route.cost)
+                        if budget_wait:
+                            break
+                    heapq.heappop(self._ready)
+                    in_flight[pool.submit(self._refresh, route)] = route
+                    started += 1
+
+                idle = not self._queue and not self._ready
+                if not in_flight and (idle or (max_refreshes is not None and started >= max_refreshes)):
+                    break
+
+                if budget_wait:
+                    timeout: Optional[float] = budget_wait
+                elif len(in_flight) >= self.max_workers or (
+                    max_refreshes is not None and started >= max_refreshes
+                ):
+                    timeout = None
+                else:
+                    timeout = self._next_wait(now)
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._complete(in_flight.pop(future), future)
+                        completed += 1
+                else:
+                    self._stop.wait(timeout if timeout is not None else 1.0)
+
+        return completed
+
+def cap_cache_ttls(
+    options: Dict[str, Any], routes: Iterable[WatchedRoute], policy: RefreshPolicy
+) -> Optional[Dict[str, Any]]:
+    """
+    Copy of the `cache` settings block with each watched route's TTL capped
+    at half its shortest refresh interval, so a refresh never gets back the
+    answer cached by the previous one while retries and overlapping windows
+    still hit the cache. Returns None when a route refreshes too often for
+    any TTL to be useful.
+    """
+    ttl = float(options.get("ttlSeconds", 300))
+    route_ttls = {key.upper(): float(value) for key, value in (options.get("routeTtlSeconds") or {}).items()}
+    for route in routes:
+        key = route_key(route.query)
+        cap = policy.shortest_interval(route) / 2
+        if cap <= 0:
+            return None
+        route_ttls[key] = min(route_ttls.get(key, ttl), cap)
+    return dict(options, routeTtlSeconds=route_ttls)
+
+def load_watchlist(data: Any) -> List[WatchedRoute]:
+    """
+    Build watched routes from a watchlist document.
+
+    Accepts a list of search inputs, `{"defaults": {...}, "routes": [...]}`
+    where each route may add `refreshSeconds` and `priority` next to the
+    usual search fields, or a declarative spec document (see `WatchlistSpec`).
+    Every invalid entry is reported together in one `WatchlistError`.
+    """
+    if is_spec(data):
+        return [
+            WatchedRoute(query=query, refresh_seconds=spec.refresh_seconds, priority=spec.priority)
+            for spec, query in iter_spec_queries(load_specs(data))
+        ]
+
+    if isinstance(data, dict):
+        defaults = data.get("defaults", {})
+        entries = data.get("routes", [])
+    else:
+        defaults, entries = {}, data
+
+    routes: List[WatchedRoute] = []
+    errors: List[str] = []
+    for index, entry in enumerate(entries):
+        merged = dict(defaults, **entry)
+        before = len(errors)
+        refresh_seconds, priority = schedule_fields(merged, f"routes[{index}]", errors)
+        merged.pop("refreshSeconds", None)
+        merged.pop("priority", None)
+        try:
+            query = FlightSearchQuery.from_dict(merged)
+        except (ValueError, TypeError) as exc:
+            errors.append(f"routes[{index}]: {exc}")
+            continue
+        if len(errors) == before:
+            routes.append(WatchedRoute(query=query, refresh_seconds=refresh_seconds, priority=priority))
+    if errors:
+        raise WatchlistError(errors)
+    return routes
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from utils.json_backend import get_json_decoder
+
+try:  # optional dependency, enables the typed availability decoder
+    import msgspec
+except ImportError:  # pragma: no cover - depends on environment
+    msgspec = None
+
+AvailabilityDecoder = Callable[[Union[bytes, str]], Dict[str, Any]]
+
+if msgspec is not None:
+    # Only the fields read by the parser (plus `faresLeft`, used when coalescing
+    # passenger counts) are declared; msgspec skips everything else in C
+    # without building objects for it. `regularFare` is copied to the output
+    # verbatim, so it stays a plain mapping.
+
+    class _Flight(msgspec.Struct, omit_defaults=True):
+        flightNumber: Optional[str] = None
+        timeUTC: Optional[List[str]] = None
+        duration: Optional[str] = None
+        regularFare: Optional[Dict[str, Any]] = None
+        operatedBy: Optional[str] = None
+        key: Optional[str] = None
+        faresLeft: Optional[int] = None
+
+    # Containers are required so they survive `to_builtins` even when empty;
+    # payloads without them fall back to the generic decoder.
+    class _DateBlock(msgspec.Struct, omit_defaults=True):
+        flights: List[_Flight]
+        dateOut: Optional[str] = None
+
+    class _Trip(msgspec.Struct, omit_defaults=True):
+        dates: List[_DateBlock]
+        origin: Optional[str] = None
+        destination: Optional[str] = None
+
+    class _Availability(msgspec.Struct, omit_defaults=True):
+        trips: List[_Trip]
+        currency: Optional[str] = None
+        serverTimeUTC: Optional[str] = None
+
+def _schema_decoder() -> AvailabilityDecoder:
+    decoder = msgspec.json.Decoder(_Availability)
+    generic = get_json_decoder("msgspec")
+
+    def decode(data: Union[bytes, str]) -> Dict[str, Any]:
+        try:
+            return msgspec.to_builtins(decoder.decode(data))
+        except msgspec.ValidationError:
+            # well-formed JSON that does not match the schema (e.g. a field
+            # changed type upstream): fall back to a full generic decode
+            return generic(data)
+
+    return decode
+
+def build_availability_decoder(schema: bool = True, backend: Optional[str] = None) -> AvailabilityDecoder:
+    """
+    Return a `bytes -> dict` decoder for availability responses.
+
+    With `schema` and msgspec installed, the body is decoded against a typed
+    schema that keeps only the fields `parse_availability_response` reads, so
+    unused payload never becomes Python objects. Otherwise the generic decoder
+    of `backend` (see `utils.json_backend.get_json_decoder`) is used. Both
+    raise ValueError on malformed JSON.
+    """
+    if schema and msgspec is not None and backend in (None, "msgspec"):
+        return _schema_decoder()
+    return get_json_decoder(backend)
+
+def raw_body(data: Union[bytes, str]) -> bytes:
+    """Pass-through decoder that leaves bodies undecoded, for clients feeding `flights.pipeline`."""
+    return data if isinstance(data, bytes) else data.encode("utf-8")
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 @dataclass
 class FlightSearchQuery:
@@ -18,6 +19,19 @@ class FlightSearchQuery:
     currency: str
     locale: str
     max_items: Optional[int]
+    # date-range mode: search every outbound date from date_from to date_from_end
+    date_from_end: Optional[str] = None
+    # forward flex window sent to the API; set by the flex-window planner
+    flex_days_out: int = 0
+    # also return the API's own connecting (one-stop) flights
+    include_connecting: bool = False
+
+    @property
+    def date_range(self) -> Optional[Tuple[str, str]]:
+        """Inclusive outbound date range for date-range queries, else None."""
+        if not self.date_from_end:
+            return None
+        return self.date_from, self.date_from_end
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "FlightSearchQuery":
@@ -32,6 +46,8 @@ class FlightSearchQuery:
         destination = str(_get("destination", required=True)).upper()
         date_from = str(_get("dateFrom", required=True))
         date_to = data.get("dateTo")
+        date_from_end_raw = data.get("dateFromEnd")
+        date_from_end = str(date_from_end_raw) if date_from_end_raw else None
         trip_type_raw = str(_get("tripType", required=True)).upper().replace("-", "_")
         trip_type = "ROUND_TRIP" if trip_type_raw in {"ROUND_TRIP", "RETURN"} else "ONE_WAY"
 
@@ -43,14 +59,16 @@ class FlightSearchQuery:
         locale = str(_get("locale", "en-gb")).lower()
         max_items_raw = data.get("maxItems")
         max_items = int(max_items_raw) if max_items_raw is not None else None
+        include_connecting = bool(data.get("includeConnectingFlights", False))
 
-        _validate_airport_code(origin, "origin")
-        _validate_airport_code(destination, "destination")
-        _validate_dates(date_from, date_to, trip_type)
-        _validate_passengers(adults, teens, children, infants)
-        _validate_currency(currency)
-        _validate_locale(locale)
-        _validate_max_items(max_items)
+        validate_airport_code(origin, "origin")
+        validate_airport_code(destination, "destination")
+        validate_dates(date_from, date_to, trip_type)
+        validate_date_range(date_from, date_from_end, date_to, trip_type)
+        validate_passengers(adults, teens, children, infants)
+        validate_currency(currency)
+        validate_locale(locale)
+        validate_max_items(max_items)
 
         return cls(
             origin=origin,
@@ -65,15 +83,22 @@ class FlightSearchQuery:
             currency=currency,
             locale=locale,
             max_items=max_items,
+            date_from_end=date_from_end,
+            include_connecting=include_connecting,
         )
 
-def _validate_airport_code(code: str, field: str) -> None:
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> datetime:
+    """Parse a `YYYY-MM-DD` date; cached, since bulk queries repeat a few hundred dates."""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def validate_airport_code(code: str, field: str) -> None:
     if len(code) != 3 or not code.isalpha():
         raise ValueError(f"Invalid {field} IATA code '{code}', expected 3-letter code.")
 
-def _validate_dates(date_from: str, date_to: Optional[str], trip_type: str) -> None:
+def validate_dates(date_from: str, date_to: Optional[str], trip_type: str) -> None:
     try:
-        df = datetime.strptime(date_from, "%Y-%m-%d")
+        df = parse_date(date_from)
     except ValueError as exc:
         raise ValueError(f"Invalid dateFrom '{date_from}', expected YYYY-MM-DD.") from exc
 
@@ -81,13 +106,32 @@ def _validate_dates(date_from: str, date_to: Optional[str], trip_type: str) -> N
         if not date_to:
             raise ValueError("dateTo is required for ROUND_TRIP searches.")
         try:
-            dt = datetime.strptime(date_to, "%Y-%m-%d")
+            dt = parse_date(date_to)
         except ValueError as exc:
             raise ValueError(f"Invalid dateTo '{date_to}', expected YYYY-MM-DD.") from exc
         if dt < df:
             raise ValueError("dateTo must be on or after dateFrom for ROUND_TRIP.")
 
-def _validate_passengers(adults: int, teens: int, children: int, infants: int) -> None:
+MAX_DATE_RANGE_DAYS = 366
+
+def validate_date_range(
+    date_from: str, date_from_end: Optional[str], date_to: Optional[str], trip_type: str
+) -> None:
+    if not date_from_end:
+        return
+    try:
+        de = parse_date(date_from_end)
+    except ValueError as exc:
+        raise ValueError(f"Invalid dateFromEnd '{date_from_end}', expected YYYY-MM-DD.") from exc
+    df = parse_date(date_from)
+    if de < df:
+        raise ValueError("dateFromEnd must be on or after dateFrom.")
+    if (de - df).days >= MAX_DATE_RANGE_DAYS:
+        raise ValueError(f"Date range cannot span more than {MAX_DATE_RANGE_DAYS} days.")
+    if trip_type == "ROUND_TRIP" and date_to and parse_date(date_to) < de:
+        raise ValueError("dateTo must be on or after dateFromEnd for ROUND_TRIP.")
+
+def validate_passengers(adults: int, teens: int, children: int, infants: int) -> None:
     for name, value in [
         ("adults", adults),
         ("teens", teens),
@@ -103,15 +147,15 @@ def _validate_passengers(adults: int, teens: int, children: int, infants: int) -
     if infants > adults:
         raise ValueError("Number of infants cannot exceed number of adults.")
 
-def _validate_currency(currency: str) -> None:
+def validate_currency(currency: str) -> None:
     if len(currency) != 3 or not currency.isalpha():
         raise ValueError(f"Invalid currency '{currency}', expected 3-letter ISO code.")
 
-def _validate_locale(locale: str) -> None:
+def validate_locale(locale: str) -> None:
     if "-" not in locale:
         raise ValueError(f"Invalid locale '{locale}', expected pattern like 'en-gb'.")
 
-def _validate_max_items(max_items: Optional[int]) -> None:
+def validate_max_items(max_items: Optional[int]) -> None:
     if max_items is None:
         return
     if max_items <= 0:
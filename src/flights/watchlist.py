@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .validator import (
+    FlightSearchQuery,
+    parse_date,
+    validate_airport_code,
+    validate_currency,
+    validate_locale,
+    validate_max_items,
+    validate_passengers,
+)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Upper bound on the queries one spec may describe, to catch runaway cross products.
+MAX_SPEC_QUERIES = 5_000_000
+
+class WatchlistError(ValueError):
+    """A watchlist failed validation; `errors` lists every problem found, not just the first."""
+
+    def __init__(self, errors: Sequence[str]) -> None:
+        self.errors = list(errors)
+        shown = "; ".join(self.errors[:10])
+        more = f" (+{len(self.errors) - 10} more)" if len(self.errors) > 10 else ""
+        super().__init__(f"{len(self.errors)} invalid watchlist entries: {shown}{more}")
+
+@dataclass(frozen=True)
+class PassengerProfile:
+    adults: int = 1
+    teens: int = 0
+    children: int = 0
+    infants: int = 0
+    name: Optional[str] = None
+
+    @property
+    def counts(self) -> Tuple[int, int, int, int]:
+        return self.adults, self.teens, self.children, self.infants
+
+def _weekday_index(value: Any) -> int:
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 6:
+        return value
+    name = str(value).strip().lower()[:3]
+    if name not in WEEKDAYS:
+        raise ValueError(f"Invalid weekday '{value}', expected mon..sun or 0..6.")
+    return WEEKDAYS.index(name)
+
+class WatchlistSpec:
+    """
+    Declarative description of many searches:
+
+    {
+      "origins": ["VIE", "BUD"],
+      "destinations": ["BCN", "STN"],
+      "dates": {"from": "2024-06-01", "to": "2024-08-31", "weekdays": ["fri", "sat"]},
+      "stayNights": [3, 7],
+      "passengers": [{"name": "solo", "adults": 1}, {"name": "family", "adults": 2, "children": 2}],
+      "currency": "EUR"
+    }
+
+    `routes` (a list of `[origin, destination]` pairs) may replace or extend
+    the origins x destinations product; `dates` may also be a plain list of
+    dates. `stayNights` turns every query into a ROUND_TRIP returning that
+    many nights later. `refreshSeconds` and `priority` are passed through to
+    the scheduler.
+
+    Every field is validated once when the spec is built, and every problem
+    found is reported together in one `WatchlistError`. Expansion then builds
+    queries directly from the validated parts, without per-query parsing.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[Tuple[str, str]],
+        dates: Sequence[date],
+        passengers: Sequence[PassengerProfile],
+        stay_nights: Sequence[int] = (),
+        currency: str = "EUR",
+        locale: str = "en-gb",
+        max_items: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+        priority: int = 0,
+    ) -> None:
+        self.routes = list(routes)
+        self.dates = list(dates)
+        self.passengers = list(passengers)
+        self.stay_nights = list(stay_nights)
+        self.currency = currency
+        self.locale = locale
+        self.max_items = max_items
+        self.refresh_seconds = refresh_seconds
+        self.priority = priority
+
+    def __len__(self) -> int:
+        """Number of queries before cross-spec deduplication."""
+        return len(self.routes) * len(self.dates) * len(self.passengers) * max(1, len(self.stay_nights))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], label: str = "spec") -> "WatchlistSpec":
+        errors: List[str] = []
+
+        def _check(func, *args) -> bool:
+            try:
+                func(*args)
+                return True
+            except ValueError as exc:
+                errors.append(f"{label}: {exc}")
+                return False
+
+        def _airports(field: str) -> List[str]:
+            codes = [str(code).upper() for code in dict.fromkeys(data.get(field) or [])]
+            return [code for code in codes if _check(validate_airport_code, code, field)]
+
+        origins, destinations = _airports("origins"), _airports("destinations")
+        routes: Dict[Tuple[str, str], None] = {}
+        for origin in origins:
+            for destination in destinations:
+                if origin != destination:
+                    routes[(origin, destination)] = None
+        for pair in data.get("routes") or []:
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+                errors.append(f"{label}: invalid route {pair!r}, expected [origin, destination]")
+                continue
+            origin, destination = str(pair[0]).upper(), str(pair[1]).upper()
+            if _check(validate_airport_code, origin, "origin") and _check(
+                validate_airport_code, destination, "destination"
+            ):
+                if origin == destination:
+                    errors.append(f"{label}: route {origin}-{destination} has the same origin and destination")
+                else:
+                    routes[(origin, destination)] = None
+        if not routes and not errors:
+            errors.append(f"{label}: no routes; set origins and destinations, or routes")
+
+        dates = _parse_dates(data.get("dates"), label, errors)
+
+        passengers: List[PassengerProfile] = []
+        for index, raw in enumerate(data.get("passengers") or [{"adults": 1}]):
+            try:
+                profile = PassengerProfile(
+                    adults=int(raw.get("adults", 1)),
+                    teens=int(raw.get("teens", 0)),
+                    children=int(raw.get("children", 0)),
+                    infants=int(raw.get("infants", 0)),
+                    name=raw.get("name"),
+                )
+            except (AttributeError, TypeError, ValueError):
+                errors.append(f"{label}: passengers[{index}] must be an object of integer counts")
+                continue
+            if _check(validate_passengers, *profile.counts):
+                passengers.append(profile)
+        passengers = list({profile.counts: profile for profile in passengers}.values())
+
+        stay_nights: List[int] = []
+        for nights in dict.fromkeys(data.get("stayNights") or []):
+            if isinstance(nights, bool) or not isinstance(nights, int) or nights < 0:
+                errors.append(f"{label}: stayNights must be non-negative integers (got {nights!r})")
+            else:
+                stay_nights.append(nights)
+
+        currency = str(data.get("currency", "EUR")).upper()
+        locale = str(data.get("locale", "en-gb")).lower()
+        max_items = data.get("maxItems")
+        _check(validate_currency, currency)
+        _check(validate_locale, locale)
+        if max_items is not None:
+            try:
+                max_items = int(max_items)
+            except (TypeError, ValueError):
+                errors.append(f"{label}: maxItems must be an integer")
+            else:
+                _check(validate_max_items, max_items)
+
+        refresh_seconds, priority = schedule_fields(data, label, errors)
+
+        spec = cls(
+            routes=list(routes),
+            dates=dates,
+            passengers=passengers,
+            stay_nights=stay_nights,
+            currency=currency,
+            locale=locale,
+            max_items=max_items,
+            refresh_seconds=refresh_seconds,
+            priority=priority,
+        )
+        if len(spec) > MAX_SPEC_QUERIES:
+            errors.append(f"{label}: expands to {len(spec)} queries, more than {MAX_SPEC_QUERIES}")
+        if errors:
+            raise WatchlistError(errors)
+        return spec
+
+    def iter_queries(self) -> Iterator[FlightSearchQuery]:
+        """Lazily yield one validated query per route x date x stay x passenger profile."""
+        iso = _iso_dates(self.dates, self.stay_nights)
+        stays = self.stay_nights or [None]
+        for origin, destination in self.routes:
+            for day in self.dates:
+                date_from = iso[day]
+                for nights in stays:
+                    date_to = iso[day + timedelta(days=nights)] if nights is not None else None
+                    for profile in self.passengers:
+                        yield FlightSearchQuery(
+                            origin=origin,
+                            destination=destination,
+                            date_from=date_from,
+                            date_to=date_to,
+                            trip_type="ROUND_TRIP" if date_to else "ONE_WAY",
+                            adults=profile.adults,
+                            teens=profile.teens,
+                            children=profile.children,
+                            infants=profile.infants,
+                            currency=self.currency,
+                            locale=self.locale,
+                            max_items=self.max_items,
+                        )
+
+def schedule_fields(data: Dict[str, Any], label: str, errors: List[str]) -> Tuple[Optional[float], int]:
+    """Validate the scheduler fields `refreshSeconds` and `priority`, recording problems in `errors`."""
+    refresh, priority = data.get("refreshSeconds"), data.get("priority", 0)
+    refresh_seconds: Optional[float] = None
+    if refresh is not None:
+        try:
+            refresh_seconds = float(refresh)
+        except (TypeError, ValueError):
+            refresh_seconds = -1.0
+        if refresh_seconds <= 0:
+            errors.append(f"{label}: refreshSeconds must be a positive number (got {refresh!r})")
+            refresh_seconds = None
+    if isinstance(priority, str) and priority.strip().lstrip("-").isdigit():
+        priority = int(priority)
+    elif isinstance(priority, bool) or not isinstance(priority, int):
+        errors.append(f"{label}: priority must be an integer (got {priority!r})")
+        priority = 0
+    return refresh_seconds, priority
+
+def _iso_dates(dates: Sequence[date], stay_nights: Sequence[int]) -> Dict[date, str]:
+    """`isoformat()` of every outbound and return date, computed once per distinct date."""
+    days = set(dates)
+    for nights in stay_nights:
+        days.update(day + timedelta(days=nights) for day in dates)
+    return {day: day.isoformat() for day in days}
+
+def _parse_dates(raw: Any, label: str, errors: List[str]) -> List[date]:
+    if raw is None:
+        errors.append(f"{label}: dates is required")
+        return []
+
+    def _date(value: Any, field: str) -> Optional[date]:
+        try:
+            return parse_date(str(value)).date()
+        except ValueError:
+            errors.append(f"{label}: invalid {field} '{value}', expected YYYY-MM-DD")
+            return None
+
+    if isinstance(raw, list):
+        parsed = [_date(value, "date") for value in raw]
+        return sorted({day for day in parsed if day is not None})
+    if not isinstance(raw, dict):
+        errors.append(f"{label}: dates must be a list or an object with from/to")
+        return []
+
+    start = _date(raw.get("from"), "dates.from")
+    end = _date(raw["to"], "dates.to") if raw.get("to") is not None else start
+    weekdays: Set[int] = set()
+    for value in raw.get("weekdays") or []:
+        try:
+            weekdays.add(_weekday_index(value))
+        except ValueError as exc:
+            errors.append(f"{label}: {exc}")
+    if start is None or end is None:
+        return []
+    if end < start:
+        errors.append(f"{label}: dates.to must be on or after dates.from")
+        return []
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [day for day in days if day.weekday() in weekdays] if weekdays else days
+
+def _query_key(query: FlightSearchQuery) -> Tuple[Any, ...]:
+    return (
+        query.origin,
+        query.destination,
+        query.date_from,
+        query.date_to,
+        query.adults,
+        query.teens,
+        query.children,
+        query.infants,
+        query.currency,
+        query.locale,
+        query.max_items,
+        query.trip_type,
+        query.date_from_end,
+        query.include_connecting,
+    )
+
+def load_specs(data: Any) -> List[WatchlistSpec]:
+    """
+    Validate every spec of a watchlist document (`{"specs": [...]}`, a single
+    spec, or a list of specs), reporting all errors of all specs together.
+    """
+    if isinstance(data, dict):
+        raw_specs = data["specs"] if "specs" in data else [data]
+        defaults = data.get("defaults", {}) if "specs" in data else {}
+    else:
+        raw_specs, defaults = list(data), {}
+    specs: List[WatchlistSpec] = []
+    errors: List[str] = []
+    for index, raw in enumerate(raw_specs):
+        try:
+            specs.append(WatchlistSpec.from_dict(dict(defaults, **raw), label=f"specs[{index}]"))
+        except WatchlistError as exc:
+            errors.extend(exc.errors)
+    if errors:
+        raise WatchlistError(errors)
+    return specs
+
+def is_spec(data: Any) -> bool:
+    """True for a watchlist document in spec form rather than a list of search inputs."""
+    return isinstance(data, dict) and ("specs" in data or "origins" in data or "dates" in data)
+
+def iter_spec_queries(specs: Sequence[WatchlistSpec]) -> Iterator[Tuple[WatchlistSpec, FlightSearchQuery]]:
+    """Lazily yield `(spec, query)` for all specs, dropping duplicates (first spec wins)."""
+    seen: Set[Tuple[Any, ...]] = set()
+    for spec in specs:
+        for query in spec.iter_queries():
+            key = _query_key(query)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield spec, query
+
+def expand_specs(specs: Sequence[WatchlistSpec]) -> Iterator[FlightSearchQuery]:
+    """Lazily yield the deduplicated queries of all specs."""
+    return (query for _, query in iter_spec_queries(specs))
+
+def expand_watchlist(data: Any) -> Iterator[FlightSearchQuery]:
+    """Validate a watchlist spec document up front, then expand it lazily."""
+    return expand_specs(load_specs(data))
+
+def validate_search_inputs(inputs: Sequence[Dict[str, Any]]) -> List[FlightSearchQuery]:
+    """
+    Validate plain search input dicts in bulk: duplicates are dropped and every
+    invalid entry is reported in one `WatchlistError`.
+    """
+    queries: List[FlightSearchQuery] = []
+    errors: List[str] = []
+    seen: Set[Tuple[Any, ...]] = set()
+    for index, search_input in enumerate(inputs):
+        try:
+            query = FlightSearchQuery.from_dict(search_input)
+        except (ValueError, TypeError) as exc:
+            errors.append(f"#{index}: {exc}")
+            continue
+        key = _query_key(query)
+        if key not in seen:
+            seen.add(key)
+            queries.append(query)
+    if errors:
+        raise WatchlistError(errors)
+    return queries
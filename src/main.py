@@ -1,15 +1,32 @@
 import argparse
+import inspect
 import json
 import sys
+import threading
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
 from flights.validator import FlightSearchQuery
-from flights.api_client import RyanairApiClient
+from flights.api_client import AsyncRyanairApiClient, RyanairApiClient
+from flights.batch import BatchResult, run_batch
+from flights.cache import AsyncCachingClient, CachingClient, build_response_cache
+from flights.coalesce import AsyncCoalescingClient, CoalescingClient
+from flights.itinerary import search_itineraries
+from flights.scheduler import RefreshPolicy, RouteScheduler, WatchedRoute, cap_cache_ttls, load_watchlist
+from flights.watchlist import expand_watchlist, is_spec
 from flights.parser import parse_availability_response
-from outputs.exporter import export_to_json
-from utils.logger import get_logger
-from utils.proxy_manager import build_proxies
+from flights.revalidation import ValidatorStore
+from flights.pipeline import ScrapePipeline
+from flights.schema import build_availability_decoder, raw_body
+from outputs.analytics import load_fare_frame
+from outputs.exporter import EXPORTERS, PREENCODED_FORMATS, encode_items, export_flights, open_exporter
+from outputs.history import FareHistoryStore, since_days
+from outputs.snapshot import SnapshotDiffer, diff_and_update
+from utils.logger import configure_logging_from_settings, correlation_scope, get_logger, shutdown_logging
+from utils.metrics import REGISTRY, MetricsServer
+from utils.proxy_manager import build_proxies, build_proxy_pool
+from utils.rate_limiter import build_rate_limiter
+from utils.retry import build_circuit_breaker, build_retry_policy
 
 DEFAULT_BASE_URL = "https://www.ryanair.com/api/booking/v4/en-gb/availability"
 
@@ -19,6 +36,30 @@ def _load_json(path: Path) -> Dict[str, Any]:
     with path.open("r", encoding="utf-8") as f:
         return json.load(f)
 
+def _load_search_inputs(path: Path) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Load search input(s) from disk.
+
+    A `.jsonl` file yields one search per line; a JSON file may contain either a
+    single search object or a list of them.
+    """
+    if path.suffix.lower() != ".jsonl":
+        return _load_json(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"JSONL file not found: {path}")
+    return list(_iter_jsonl(path))
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"Invalid JSON on line {line_no} of {path}: {exc}") from exc
+
 def _resolve_default_paths() -> Dict[str, Path]:
     root = Path(__file__).resolve().parents[1]
     src_dir = Path(__file__).resolve().parent
@@ -38,28 +79,440 @@ def run_search(
     client_cls=RyanairApiClient,
 ) -> List[Dict[str, Any]]:
     logger = get_logger("ryanair_scraper")
-    logger.info("Starting Ryanair flights search")
+    with correlation_scope():
+        logger.info("Starting Ryanair flights search")
+
+        query = FlightSearchQuery.from_dict(search_input)
+        client = _build_client(settings, logger, client_cls)
+
+        try:
+            raw_response = client.search_flights(query)
+        except Exception as exc:  # pragma: no cover - top-level guard
+            logger.error("Failed to fetch flights: %s", exc)
+            raise
+        finally:
+            _close_client(client)
+
+        flights = parse_availability_response(
+            raw_response, max_items=query.max_items, date_range=query.date_range
+        )
+        _record_history(flights, settings)
+        _export(_deltas_or_flights(flights, settings, logger, query.max_items), output_path, settings)
+
+        logger.info("Completed search: %d flights exported to %s", len(flights), output_path)
+        return flights
+
+async def run_search_async(
+    search_input: Dict[str, Any],
+    settings: Dict[str, Any],
+    output_path: Path,
+    client_cls=AsyncRyanairApiClient,
+) -> List[Dict[str, Any]]:
+    """Async counterpart of `run_search` for clients with `async search_flights`."""
+    logger = get_logger("ryanair_scraper")
+    with correlation_scope():
+        logger.info("Starting Ryanair flights search")
 
-    query = FlightSearchQuery.from_dict(search_input)
+        query = FlightSearchQuery.from_dict(search_input)
+        client = _build_client(settings, logger, client_cls)
 
+        try:
+            raw_response = await client.search_flights(query)
+        except Exception as exc:  # pragma: no cover - top-level guard
+            logger.error("Failed to fetch flights: %s", exc)
+            raise
+        finally:
+            await _aclose_client(client)
+
+        flights = parse_availability_response(
+            raw_response, max_items=query.max_items, date_range=query.date_range
+        )
+        _record_history(flights, settings)
+        _export(_deltas_or_flights(flights, settings, logger, query.max_items), output_path, settings)
+
+        logger.info("Completed search: %d flights exported to %s", len(flights), output_path)
+        return flights
+
+def _output_options(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "fmt": settings.get("outputFormat", "json"),
+        "append": bool(settings.get("appendOutput", False)),
+        "compression": settings.get("outputCompression"),
+    }
+
+def _open_output(output_path: Path, settings: Dict[str, Any]):
+    return open_exporter(output_path, **_output_options(settings))
+
+def _export(flights: List[Dict[str, Any]], output_path: Path, settings: Dict[str, Any]) -> int:
+    return export_flights(flights, output_path, **_output_options(settings))
+
+def _open_history(settings: Dict[str, Any]) -> Optional[FareHistoryStore]:
+    path = settings.get("historyPath")
+    return FareHistoryStore(Path(path)) if path else None
+
+def _max_in_flight(settings: Dict[str, Any]) -> Optional[int]:
+    """`maxInFlight`, still read from its old name `maxConnectionsPerHost` so existing configs keep working."""
+    value = settings.get("maxInFlight", settings.get("maxConnectionsPerHost"))
+    return int(value) if value is not None else None
+
+def _record_history(flights: List[Dict[str, Any]], settings: Dict[str, Any]) -> None:
+    """Append every scraped flight (not just snapshot deltas) to the fare history, if configured."""
+    history = _open_history(settings)
+    if history is not None:
+        with history:
+            history.add_all(flights)
+
+def _deltas_or_flights(
+    flights: List[Dict[str, Any]], settings: Dict[str, Any], logger, max_items: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """With `snapshotPath` configured, diff against the last snapshot and return only deltas."""
+    snapshot_path = settings.get("snapshotPath")
+    if not snapshot_path:
+        return flights
+    deltas = diff_and_update(Path(snapshot_path), flights, max_items)
+    logger.info("Fare deltas vs. snapshot %s: %d of %d flights", snapshot_path, len(deltas), len(flights))
+    return deltas
+
+def _build_client(settings: Dict[str, Any], logger, client_cls=RyanairApiClient, raw: bool = False):
+    """
+    Build the configured client. With `raw`, responses are returned undecoded
+    and the coalescing/caching wrappers (which work on decoded payloads) are
+    skipped, for `flights.pipeline`.
+    """
     base_url = settings.get("baseUrl", DEFAULT_BASE_URL)
     timeout = int(settings.get("timeoutSeconds", 10))
     proxy_url = settings.get("proxyUrl")
     proxies = build_proxies(proxy_url) if proxy_url else None
 
-    client = client_cls(base_url=base_url, timeout=timeout, proxies=proxies, logger=logger)
+    options = _client_options(settings)
+    proxy_pool = build_proxy_pool(settings, logger=logger)
+    if proxy_pool is not None:
+        options["proxy_pool"] = proxy_pool
+    if settings.get("retry"):
+        options["retry_policy"] = build_retry_policy(
+            settings["retry"], max_retries=options.get("max_retries", 2)
+        )
+    circuit_breaker = build_circuit_breaker(settings.get("circuitBreaker"))
+    if circuit_breaker is not None:
+        options["circuit_breaker"] = circuit_breaker
+    rate_limiter = build_rate_limiter(settings.get("rateLimit"))
+    if rate_limiter is not None:
+        # built for this client only, so the client closes it (and its state file)
+        options["rate_limiter"] = rate_limiter
+        options["owns_rate_limiter"] = True
+    revalidation = settings.get("revalidation")
+    if revalidation:
+        options["validator_store"] = ValidatorStore(max_entries=int(revalidation.get("maxEntries", 5000)))
+    if settings.get("jsonBackend") is not None or settings.get("schemaDecode") is not None:
+        options["json_decoder"] = build_availability_decoder(
+            schema=bool(settings.get("schemaDecode", True)), backend=settings.get("jsonBackend")
+        )
+    if raw:
+        options["json_decoder"] = raw_body
+
+    client = client_cls(
+        base_url=base_url,
+        timeout=timeout,
+        proxies=proxies,
+        logger=logger,
+        **options,
+    )
+
+    if raw:
+        return client
+
+    is_async = inspect.iscoroutinefunction(client.search_flights)
+    if settings.get("coalesceRequests", True):
+        coalescing_cls = AsyncCoalescingClient if is_async else CoalescingClient
+        client = coalescing_cls(
+            client, coalesce_passengers=bool(settings.get("coalescePassengers", False)), logger=logger
+        )
+
+    cache_options = settings.get("cache")
+    if cache_options:
+        caching_cls = AsyncCachingClient if is_async else CachingClient
+        client = caching_cls(client, build_response_cache(cache_options), logger=logger)
+    return client
+
+# Optional tuning settings, forwarded to the client only when configured so that
+# custom client classes with the basic constructor keep working.
+_CLIENT_OPTION_SETTINGS = {
+    "maxRetries": ("max_retries", int),
+    "poolConnections": ("pool_connections", int),
+    "poolMaxSize": ("pool_maxsize", int),
+    "poolBlock": ("pool_block", bool),
+    "requestCompression": ("compression", bool),
+}
+
+def _client_options(settings: Dict[str, Any]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    for setting, (kwarg, cast) in _CLIENT_OPTION_SETTINGS.items():
+        if settings.get(setting) is not None:
+            options[kwarg] = cast(settings[setting])
+    return options
+
+def _close_client(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+
+async def _aclose_client(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+def run_batch_search(
+    search_inputs: Iterable[Union[Dict[str, Any], FlightSearchQuery]],
+    settings: Dict[str, Any],
+    output_path: Path,
+    client_cls=RyanairApiClient,
+    max_workers: Optional[int] = None,
+) -> List[BatchResult]:
+    """
+    Run many searches concurrently through one shared client.
+
+    Every input produces a `BatchResult`; failed queries are logged and reported
+    but do not stop the others. Flights from all successful queries are exported
+    to `output_path` in completion order; each result keeps its
+    `flight_count` but releases the flight list once written.
+    """
+    logger = get_logger("ryanair_scraper")
+    workers = int(max_workers or settings.get("maxWorkers", 4))
+    in_flight = _max_in_flight(settings)
+    if isinstance(search_inputs, list):
+        logger.info("Starting Ryanair batch search: %d queries, %d workers", len(search_inputs), workers)
+    else:
+        logger.info("Starting Ryanair batch search over expanded watchlist, %d workers", workers)
+
+    client = _build_client(settings, logger, client_cls)
+
+    snapshot_path = settings.get("snapshotPath")
+    differ = SnapshotDiffer(Path(snapshot_path)) if snapshot_path else None
+    history = _open_history(settings)
 
+    results: List[BatchResult] = []
     try:
-        raw_response = client.search_flights(query)
-    except Exception as exc:  # pragma: no cover - top-level guard
-        logger.error("Failed to fetch flights: %s", exc)
-        raise
+        # flights are written as each query completes and then released, so
+        # memory stays bounded by the in-flight queries rather than the batch
+        with _open_output(output_path, settings) as writer:
+            for result in run_batch(
+                client,
+                search_inputs,
+                max_workers=workers,
+                max_in_flight=in_flight,
+                logger=logger,
+            ):
+                if history is not None:
+                    history.add_all(result.flights)
+                if differ is not None:
+                    max_items = result.query.max_items if result.query else None
+                    writer.write_all(differ.feed_all(result.flights, max_items))
+                else:
+                    writer.write_all(result.flights)
+                result.flights = []
+                results.append(result)
 
-    flights = parse_availability_response(raw_response, max_items=query.max_items)
-    export_to_json(flights, output_path)
+            if differ is not None:
+                # a failed query would make all of its flights look removed, so
+                # removals are only reported when every query succeeded
+                complete = all(result.ok for result in results)
+                if complete:
+                    writer.write_all(differ.removed())
+                differ.commit(carry_over_unseen=not complete)
+                logger.info("Fare deltas vs. snapshot %s: %s", snapshot_path, differ.stats)
+    finally:
+        if history is not None:
+            history.close()
+        _close_client(client)
 
-    logger.info("Completed search: %d flights exported to %s", len(flights), output_path)
-    return flights
+    results.sort(key=lambda r: r.index)
+    failed = [result for result in results if not result.ok]
+    logger.info(
+        "Completed batch: %d/%d queries succeeded, %d flights exported to %s",
+        len(results) - len(failed),
+        len(results),
+        writer.count,
+        output_path,
+    )
+    return results
+
+def run_pipeline_search(
+    search_inputs: Iterable[Union[Dict[str, Any], FlightSearchQuery]],
+    settings: Dict[str, Any],
+    output_path: Path,
+    client_cls=RyanairApiClient,
+    max_workers: Optional[int] = None,
+) -> List[BatchResult]:
+    """
+    Like `run_batch_search`, but decoding, parsing and serialization run in a
+    process pool fed through shared memory (see `flights.pipeline`), so they
+    never stall the network threads.
+
+    Enabled by the `pipeline` setting, e.g. `{"processWorkers": 8,
+    "fetchWorkers": 16, "slots": 16, "slotBytes": 4194304}` (all optional;
+    processes default to the CPU count). It writes json/jsonl output only and
+    cannot be combined with `snapshotPath` or `historyPath`, which need the
+    parsed flights in this process. It serves batch inputs, watchlist spec
+    documents passed as the input file, and single searches; `--watchlist`
+    runs `run_scheduler`, which does not use it.
+    """
+    options = settings.get("pipeline") or {}
+    # checked before the output file is opened, which would truncate it
+    if settings.get("snapshotPath") or settings.get("historyPath"):
+        raise ValueError("The pipeline cannot be combined with snapshotPath or historyPath.")
+    fmt = _output_options(settings)["fmt"]
+    if fmt not in PREENCODED_FORMATS:
+        raise ValueError(f"The pipeline cannot write '{fmt}' output, expected one of: {', '.join(PREENCODED_FORMATS)}.")
+    logger = get_logger("ryanair_scraper")
+    fetch_workers = int(options.get("fetchWorkers") or max_workers or settings.get("maxWorkers", 4))
+    client = _build_client(settings, logger, client_cls, raw=True)
+
+    results: List[BatchResult] = []
+    try:
+        with _open_output(output_path, settings) as writer:
+            pipeline = ScrapePipeline(
+                client,
+                writer,
+                encode_items,
+                fetch_workers=fetch_workers,
+                process_workers=options.get("processWorkers"),
+                slots=options.get("slots"),
+                slot_bytes=int(options.get("slotBytes", 4 * 1024 * 1024)),
+                schema=bool(settings.get("schemaDecode", True)),
+                json_backend=settings.get("jsonBackend"),
+                logger=logger,
+            )
+            logger.info(
+                "Starting Ryanair pipeline search: %d fetch threads, %d processes",
+                pipeline.fetch_workers,
+                pipeline.process_workers,
+            )
+            results.extend(pipeline.run(search_inputs))
+    finally:
+        _close_client(client)
+
+    results.sort(key=lambda r: r.index)
+    failed = [result for result in results if not result.ok]
+    logger.info(
+        "Completed pipeline: %d/%d queries succeeded, %d flights exported to %s",
+        len(results) - len(failed),
+        len(results),
+        writer.count,
+        output_path,
+    )
+    return results
+
+def run_itinerary_search(
+    search_input: Dict[str, Any],
+    settings: Dict[str, Any],
+    output_path: Path,
+    client_cls=RyanairApiClient,
+) -> List[Dict[str, Any]]:
+    """
+    Search connecting itineraries through the input's `hubs` and export the
+    cheapest ones (one row per itinerary, with its flights under `legs`).
+    """
+    logger = get_logger("ryanair_scraper")
+    with correlation_scope():
+        logger.info("Starting Ryanair itinerary search via %d hubs", len(search_input.get("hubs") or []))
+        client = _build_client(settings, logger, client_cls)
+        in_flight = _max_in_flight(settings)
+        try:
+            itineraries = search_itineraries(
+                client,
+                search_input,
+                max_workers=int(settings.get("maxWorkers", 4)),
+                max_in_flight=in_flight,
+                logger=logger,
+            )
+        finally:
+            _close_client(client)
+
+        rows = [itinerary.to_dict() for itinerary in itineraries]
+        _export(rows, output_path, settings)
+        logger.info("Completed itinerary search: %d itineraries exported to %s", len(rows), output_path)
+        return rows
+
+def run_scheduler(
+    watchlist: Any,
+    settings: Dict[str, Any],
+    output_path: Path,
+    client_cls=RyanairApiClient,
+    max_refreshes: Optional[int] = None,
+) -> RouteScheduler:
+    """
+    Keep every route of a watchlist fresh until interrupted.
+
+    One client is built up front and reused for every refresh; each refresh
+    appends its flights to `output_path`. `max_refreshes` bounds the run (used
+    by tests and one-off catch-up runs).
+
+    The response cache stays warm between cycles, but each route's TTL is
+    capped below its refresh interval (see `cap_cache_ttls`) so a refresh
+    never returns the fares of the previous one. `snapshotPath` is rejected:
+    one snapshot shared by routes refreshed at different times would report
+    the flights of every other route as removed.
+    """
+    if settings.get("snapshotPath"):
+        raise ValueError("snapshotPath is not supported in scheduler mode; use historyPath to track fare changes.")
+    logger = get_logger("ryanair_scraper")
+    routes = load_watchlist(watchlist)
+    if settings.get("pipeline"):
+        logger.info("The pipeline setting is ignored in scheduler mode: refreshes are parsed in this process")
+    policy = RefreshPolicy(min_seconds=float(settings.get("minRefreshSeconds", 60)))
+    cache_options = settings.get("cache")
+    if cache_options:
+        cache_options = cap_cache_ttls(cache_options, routes, policy)
+        if cache_options is None:
+            logger.info("Response cache disabled: some routes refresh too often to cache")
+    output_settings = dict(settings, appendOutput=True)
+    _open_output(output_path, output_settings)  # reject outputs that cannot be appended to before any refresh
+    client = _build_client(dict(settings, cache=cache_options), logger, client_cls)
+    history = _open_history(settings)
+    write_lock = threading.Lock()
+
+    def _on_result(route: WatchedRoute, flights: List[Dict[str, Any]]) -> None:
+        with write_lock:
+            if history is not None:
+                history.add_all(flights)
+                history.flush()
+            _export(flights, output_path, output_settings)
+            _dump_metrics(settings)
+
+    scheduler = RouteScheduler(
+        client,
+        routes,
+        policy=policy,
+        max_workers=int(settings.get("maxWorkers", 4)),
+        max_requests_per_minute=settings.get("maxRequestsPerMinute"),
+        on_result=_on_result,
+        logger=logger,
+    )
+    logger.info("Starting scheduler for %d routes", len(routes))
+    try:
+        scheduler.run(max_refreshes=max_refreshes)
+    except KeyboardInterrupt:
+        logger.info("Scheduler interrupted, shutting down")
+        scheduler.stop()
+    finally:
+        if history is not None:
+            history.close()
+        _close_client(client)
+    return scheduler
+
+def _start_metrics_server(settings: Dict[str, Any]) -> Optional[MetricsServer]:
+    port = (settings.get("metrics") or {}).get("port")
+    if port is None:
+        return None
+    host = settings["metrics"].get("host", "127.0.0.1")
+    return MetricsServer(REGISTRY, host=host, port=int(port)).start()
+
+def _dump_metrics(settings: Dict[str, Any]) -> None:
+    path = (settings.get("metrics") or {}).get("file")
+    if path:
+        REGISTRY.write_to(Path(path))
 
 def build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -73,13 +526,99 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--input",
         type=str,
-        help="Path to flight search input JSON (default: data/sample_input.json)",
+        help=(
+            "Path to flight search input JSON (default: data/sample_input.json). "
+            "A JSON list or a .jsonl file runs a batch search."
+        ),
     )
     parser.add_argument(
         "--output",
         type=str,
-        help="Path to output JSON file (default: data/sample_output.json)",
+        help="Path to output file (default: data/sample_output.json)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(EXPORTERS),
+        help="Output format (default: settings outputFormat or json)",
     )
+    parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd"],
+        help="Compress the output file (default: settings outputCompression or none)",
+    )
+    parser.add_argument(
+        "--watchlist",
+        type=str,
+        help="Path to a watchlist JSON; runs the long-lived refresh scheduler instead of a one-shot search",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        help="Log format (default: settings logging.format or text)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Write Prometheus text-format metrics to this file when the run ends",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while running",
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        help="Path to a fare snapshot; when set only new, removed and re-priced flights are exported",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Append to the output file instead of overwriting it",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of concurrent workers for batch searches (default: settings maxWorkers or 4)",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        help="Also record every scraped flight in this fare history database (default: settings historyPath)",
+    )
+
+    commands = parser.add_subparsers(dest="command", title="fare history queries")
+    for name, help_text in (
+        ("cheapest", "Cheapest recorded fares for a route"),
+        ("price-history", "How a route's (or one flight's) price moved over time"),
+        ("route-summary", "Observation count and min/avg/max price per route"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--db", type=str, help="Fare history database (default: --history / settings historyPath)")
+        command.add_argument("--origin", type=str, required=name == "cheapest")
+        command.add_argument("--destination", type=str, required=name == "cheapest")
+        command.add_argument("--days", type=float, help="Only consider fares scraped in the last N days")
+        if name == "cheapest":
+            command.add_argument("--date-from", type=str, help="Earliest departure date (YYYY-MM-DD)")
+            command.add_argument("--date-to", type=str, help="Latest departure date (YYYY-MM-DD)")
+            command.add_argument("--limit", type=int, default=10)
+        elif name == "price-history":
+            command.add_argument("--date", type=str, help="Departure date (YYYY-MM-DD)")
+            command.add_argument("--key", type=str, help="Flight key; tracks a single flight")
+
+    analyze = commands.add_parser("analyze", help="Fare analytics over an exported file (requires numpy)")
+    analyze.add_argument("--file", type=str, help="Exported flights file (default: --output)")
+    analyze.add_argument(
+        "--report",
+        choices=["daily", "rolling", "percentiles", "alerts"],
+        default="daily",
+        help="Cheapest fare per route/day, trailing window stats, per-route percentiles or price alerts",
+    )
+    analyze.add_argument("--route", type=str, help="Only analyze this route, e.g. VIE-BCN")
+    analyze.add_argument("--window", type=int, default=7, help="Window in days for rolling stats and drop alerts")
+    analyze.add_argument("--percentiles", type=str, default="10,50,90", help="Comma-separated percentiles")
+    analyze.add_argument("--max-price", type=float, help="Alert when a day's cheapest fare is at or below this")
+    analyze.add_argument("--drop-pct", type=float, help="Alert when a fare drops this many percent below the window mean")
     return parser
 
 def main(argv=None) -> None:
@@ -100,14 +639,125 @@ def main(argv=None) -> None:
         print(f"Error loading settings from {config_path}: {exc}", file=sys.stderr)
         sys.exit(1)
 
+    if args.format:
+        settings["outputFormat"] = args.format
+    if args.compression:
+        settings["outputCompression"] = args.compression
+    if args.append:
+        settings["appendOutput"] = True
+    if args.snapshot:
+        settings["snapshotPath"] = args.snapshot
+    if args.history:
+        settings["historyPath"] = args.history
+
+    if args.command == "analyze":
+        _run_analytics(args, Path(args.file) if args.file else output_path)
+        return
+    if args.command:
+        _run_history_query(args, settings)
+        return
+
+    if args.log_format:
+        settings.setdefault("logging", {})["format"] = args.log_format
+    if settings.get("logging"):
+        try:
+            configure_logging_from_settings(settings["logging"])
+        except ValueError as exc:
+            print(f"Invalid logging settings: {exc}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.metrics_file:
+        settings.setdefault("metrics", {})["file"] = args.metrics_file
+    if args.metrics_port is not None:
+        settings.setdefault("metrics", {})["port"] = args.metrics_port
+
+    metrics_server = _start_metrics_server(settings)
+    try:
+        _dispatch(args, settings, input_path, output_path)
+    finally:
+        _dump_metrics(settings)
+        if metrics_server is not None:
+            metrics_server.stop()
+        shutdown_logging()
+
+def _run_history_query(args: argparse.Namespace, settings: Dict[str, Any]) -> None:
+    db_path = args.db or settings.get("historyPath")
+    if not db_path or not Path(db_path).is_file():
+        print(f"Fare history database not found: {db_path or '(set --db or historyPath)'}", file=sys.stderr)
+        sys.exit(1)
+    since = since_days(args.days) if args.days is not None else None
+    try:
+        with FareHistoryStore(Path(db_path)) as store:
+            if args.command == "cheapest":
+                rows = store.cheapest(
+                    args.origin, args.destination, args.date_from, args.date_to, since=since, limit=args.limit
+                )
+            elif args.command == "price-history":
+                rows = store.price_history(
+                    args.origin, args.destination, departure_date=args.date, flight_key=args.key, since=since
+                )
+            else:
+                rows = store.route_summary(args.origin, args.destination, since=since)
+    except ValueError as exc:
+        print(f"Invalid query: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(rows, indent=2))
+
+def _run_analytics(args: argparse.Namespace, path: Path) -> None:
     try:
-        search_input = _load_json(input_path)
+        frame = load_fare_frame(path)
+        if args.route:
+            frame = frame.select_route(args.route.upper())
+        if args.report == "daily":
+            columns = frame.daily_min()
+        elif args.report == "rolling":
+            columns = frame.rolling_stats(window=args.window)
+        elif args.report == "percentiles":
+            columns = frame.percentiles([float(q) for q in args.percentiles.split(",") if q.strip()])
+        else:
+            columns = frame.price_alerts(max_price=args.max_price, drop_pct=args.drop_pct, window=args.window)
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"Analytics failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(frame.to_records(columns), indent=2))
+
+def _dispatch(args: argparse.Namespace, settings: Dict[str, Any], input_path: Path, output_path: Path) -> None:
+    if args.watchlist:
+        try:
+            watchlist = _load_json(Path(args.watchlist))
+            run_scheduler(watchlist, settings, output_path)
+        except Exception as exc:
+            print(f"Scheduler failed: {exc}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    try:
+        search_input = _load_search_inputs(input_path)
     except Exception as exc:
         print(f"Error loading search input from {input_path}: {exc}", file=sys.stderr)
         sys.exit(1)
 
+    if isinstance(search_input, list) or is_spec(search_input):
+        try:
+            # a watchlist spec is validated up front, then expanded lazily into the batch
+            inputs = expand_watchlist(search_input) if is_spec(search_input) else search_input
+            runner = run_pipeline_search if settings.get("pipeline") else run_batch_search
+            results = runner(inputs, settings, output_path, max_workers=args.workers)
+        except Exception as exc:
+            print(f"Scraper failed: {exc}", file=sys.stderr)
+            sys.exit(1)
+        if results and not any(result.ok for result in results):
+            print("Scraper failed: every query in the batch failed.", file=sys.stderr)
+            sys.exit(1)
+        return
+
     try:
-        run_search(search_input, settings, output_path)
+        if search_input.get("hubs"):
+            run_itinerary_search(search_input, settings, output_path)
+        elif settings.get("pipeline"):
+            run_pipeline_search([search_input], settings, output_path)
+        else:
+            run_search(search_input, settings, output_path)
     except Exception as exc:
         print(f"Scraper failed: {exc}", file=sys.stderr)
         sys.exit(1)
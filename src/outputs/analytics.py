@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:  # optional dependency, only needed for fare analytics
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+from flights.parser import Flight, parse_utc_epoch
+from utils.json_backend import get_json_decoder
+
+from .exporter import _BLOCK_HEADER, _INT64_NULL, COLUMNAR_MAGIC, _open_read_binary
+
+_DAY = 86400
+_EPOCH = date(1970, 1, 1)
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Fare analytics require the 'numpy' package to be installed.")
+
+def _day_iso(day: int) -> str:
+    return (_EPOCH + timedelta(days=int(day))).isoformat()
+
+class _Codes:
+    """Dictionary encoder: string -> dense int code, in first-seen order."""
+
+    def __init__(self) -> None:
+        self.index: Dict[Optional[str], int] = {}
+        self.names: List[Optional[str]] = []
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.names)
+            self.names.append(value)
+        return code
+
+class FareFrame:
+    """
+    Parsed flights as NumPy columns, one element per flight:
+
+    - `route`: int32 code into `route_names` ("VIE-BCN")
+    - `departure`: int64 UTC epoch seconds
+    - `price`: float64, NaN where the flight had no fare
+    - `fare_class`: int32 code into `fare_class_names`
+
+    Flights without a route or departure time are dropped on construction.
+    Every query below is a handful of array operations (sorts, reductions,
+    sliding windows) instead of a Python loop over flights.
+    """
+
+    def __init__(
+        self,
+        route: "np.ndarray",
+        departure: "np.ndarray",
+        price: "np.ndarray",
+        fare_class: "np.ndarray",
+        route_names: Sequence[str],
+        fare_class_names: Sequence[Optional[str]],
+    ) -> None:
+        _require_numpy()
+        self.route = np.asarray(route, dtype=np.int32)
+        self.departure = np.asarray(departure, dtype=np.int64)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.fare_class = np.asarray(fare_class, dtype=np.int32)
+        self.route_names = list(route_names)
+        self.fare_class_names = list(fare_class_names)
+
+    def __len__(self) -> int:
+        return int(self.route.size)
+
+    @property
+    def day(self) -> "np.ndarray":
+        """Departure day as days since 1970-01-01 (UTC)."""
+        return self.departure // _DAY
+
+    @classmethod
+    def from_flights(cls, flights: Iterable[Any]) -> "FareFrame":
+        """Build from parsed flight dicts (or `Flight` records) in a single pass."""
+        _require_numpy()
+        routes, classes = _Codes(), _Codes()
+        route_col: List[int] = []
+        departure_col: List[int] = []
+        price_col: List[float] = []
+        class_col: List[int] = []
+        nan = float("nan")
+        for flight in flights:
+            if isinstance(flight, Flight):
+                origin, destination, departure = flight.origin, flight.destination, flight.departure
+                price, fare_class = flight.price, flight.fare_class
+            else:
+                origin, destination = flight.get("Origin"), flight.get("Destination")
+                departure = flight.get("Time departure")
+                departure = parse_utc_epoch(departure) if isinstance(departure, str) else departure
+                price = flight.get("Price")
+                fare = flight.get("regularFare")
+                fare_class = fare.get("fareClass") if isinstance(fare, dict) else flight.get("fareClass")
+            if not origin or not destination or departure is None:
+                continue
+            route_col.append(routes.code(f"{origin}-{destination}"))
+            departure_col.append(departure)
+            price_col.append(nan if price in (None, "") else float(price))
+            class_col.append(classes.code(fare_class or None))
+        return cls(
+            np.array(route_col, dtype=np.int32),
+            np.array(departure_col, dtype=np.int64),
+            np.array(price_col, dtype=np.float64),
+            np.array(class_col, dtype=np.int32),
+            routes.names,
+            classes.names,
+        )
+
+    @classmethod
+    def from_columnar(cls, path: Path) -> "FareFrame":
+        """
+        Load a file written by the `columnar` exporter straight into arrays.
+
+        Numeric columns are wrapped with `np.frombuffer` and dictionary-encoded
+        strings are remapped to frame-wide codes with one fancy-indexing
+        operation per block, so no per-row Python objects are created.
+        """
+        _require_numpy()
+        routes, classes = _Codes(), _Codes()
+        parts: Dict[str, List["np.ndarray"]] = {"route": [], "departure": [], "price": [], "fare_class": []}
+        with _open_read_binary(Path(path)) as f:
+            while True:
+                prefix = f.read(_BLOCK_HEADER.size)
+                if not prefix:
+                    break
+                magic, header_len = _BLOCK_HEADER.unpack(prefix)
+                if magic != COLUMNAR_MAGIC:
+                    raise ValueError(f"{path} is not a columnar flights file (bad block magic).")
+                header = json.loads(f.read(header_len))
+                block: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+                for meta in header["columns"]:
+                    block[meta["name"]] = (meta, f.read(meta["size"]))
+                parts["departure"].append(np.frombuffer(block["Time departure"][1], dtype="<i8").astype(np.int64))
+                parts["price"].append(np.frombuffer(block["Price"][1], dtype="<f8").astype(np.float64))
+                origin = _dictionary_column(block["Origin"])
+                destination = _dictionary_column(block["Destination"])
+                # route codes: map each distinct (origin, destination) pair of the block once
+                pairs, inverse = np.unique(
+                    np.stack([origin[0], destination[0]], axis=1), axis=0, return_inverse=True
+                )
+                lookup = np.array(
+                    [
+                        routes.code(f"{origin[1][a]}-{destination[1][b]}") if origin[1][a] and destination[1][b] else -1
+                        for a, b in pairs
+                    ],
+                    dtype=np.int32,
+                )
+                parts["route"].append(lookup[inverse.reshape(-1)] if lookup.size else np.empty(0, np.int32))
+                fare_codes, fare_names = _dictionary_column(block["fareClass"])
+                class_lookup = np.array([classes.code(name) for name in fare_names], dtype=np.int32)
+                parts["fare_class"].append(class_lookup[fare_codes] if class_lookup.size else fare_codes)
+
+        if not parts["route"]:
+            return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0), [], [])
+        route = np.concatenate(parts["route"])
+        departure = np.concatenate(parts["departure"])
+        keep = (route >= 0) & (departure != _INT64_NULL)
+        return cls(
+            route[keep],
+            departure[keep],
+            np.concatenate(parts["price"])[keep],
+            np.concatenate(parts["fare_class"])[keep],
+            routes.names,
+            classes.names,
+        )
+
+    def select_route(self, route: str) -> "FareFrame":
+        """Only the flights of one route ("VIE-BCN")."""
+        code = self.route_names.index(route) if route in self.route_names else -1
+        mask = self.route == code
+        return FareFrame(
+            self.route[mask],
+            self.departure[mask],
+            self.price[mask],
+            self.fare_class[mask],
+            self.route_names,
+            self.fare_class_names,
+        )
+
+    def _priced(self) -> "np.ndarray":
+        return ~np.isnan(self.price)
+
+    def daily_min(self) -> Dict[str, "np.ndarray"]:
+        """
+        Cheapest fare per (route, departure day).
+
+        Returns parallel arrays `route`, `day`, `price` (the minimum), `flights`
+        (priced flights that day) and `index` (row of the cheapest flight),
+        sorted by route and day.
+        """
+        rows = np.flatnonzero(self._priced())
+        if not rows.size:
+            empty = np.empty(0, dtype=np.int64)
+            return {"route": empty, "day": empty, "price": np.empty(0), "flights": empty, "index": empty}
+        route, day, price = self.route[rows], self.day[rows], self.price[rows]
+        first_day = int(day.min())
+        n_days = int(day.max()) - first_day + 1
+        # one integer group id per (route, day) cell, ordered by route then day
+        key = route.astype(np.int64) * n_days + (day - first_day)
+        cells: Optional["np.ndarray"] = None
+        n_groups = len(self.route_names) * n_days
+        if n_groups > max(4 * rows.size, 1 << 22):
+            # sparse grid: compact the ids instead of allocating every cell
+            cells, key = np.unique(key, return_inverse=True)
+            key = key.reshape(-1)
+            n_groups = cells.size
+
+        best = np.full(n_groups, np.inf)
+        np.minimum.at(best, key, price)
+        counts = np.bincount(key, minlength=n_groups)
+        # row of the cheapest flight: the first row matching its group's minimum
+        is_min = np.flatnonzero(price == best[key])
+        first = np.full(n_groups, rows.size, dtype=np.int64)
+        np.minimum.at(first, key[is_min], is_min)
+
+        present = np.flatnonzero(counts)
+        cell = cells[present] if cells is not None else present
+        return {
+            "route": cell // n_days,
+            "day": cell % n_days + first_day,
+            "price": best[present],
+            "flights": counts[present],
+            "index": rows[first[present]],
+        }
+
+    def _daily_grid(self) -> Tuple["np.ndarray", int, Dict[str, "np.ndarray"]]:
+        """Daily minima as a dense (routes x days) grid, NaN where a route has no fare that day."""
+        daily = self.daily_min()
+        first_day = int(daily["day"].min()) if daily["day"].size else 0
+        n_days = int(daily["day"].max()) - first_day + 1 if daily["day"].size else 0
+        grid = np.full((len(self.route_names), n_days), np.nan)
+        grid[daily["route"], daily["day"] - first_day] = daily["price"]
+        return grid, first_day, daily
+
+    def rolling_stats(self, window: int = 7) -> Dict[str, "np.ndarray"]:
+        """
+        Trailing `window`-day min and mean of each route's daily cheapest fare.
+
+        Means come from cumulative sums over the day grid and minima from a
+        sliding-window view, so the cost is independent of the window length
+        in Python terms. Returned arrays are aligned with `daily_min()`.
+        """
+        if window <= 0:
+            raise ValueError("window must be a positive integer.")
+        grid, first_day, daily = self._daily_grid()
+        present = ~np.isnan(grid)
+        padded = np.pad(np.where(present, grid, 0.0), ((0, 0), (window, 0)))
+        padded_count = np.pad(present.astype(np.int64), ((0, 0), (window, 0)))
+        sums = np.cumsum(padded, axis=1)
+        counts = np.cumsum(padded_count, axis=1)
+        window_sum = sums[:, window:] - sums[:, :-window]
+        window_count = counts[:, window:] - counts[:, :-window]
+
+        filled = np.pad(np.where(present, grid, np.inf), ((0, 0), (window - 1, 0)), constant_values=np.inf)
+        window_min = np.lib.stride_tricks.sliding_window_view(filled, window, axis=1).min(axis=2)
+
+        r, d = daily["route"], daily["day"] - first_day
+        return {
+            "route": r,
+            "day": daily["day"],
+            "price": daily["price"],
+            "rolling_min": window_min[r, d],
+            "rolling_mean": window_sum[r, d] / window_count[r, d],
+            "days": window_count[r, d],
+        }
+
+    def percentiles(self, qs: Sequence[float] = (10, 50, 90)) -> Dict[str, "np.ndarray"]:
+        """
+        Per-route fare percentiles (linear interpolation, like `np.percentile`).
+
+        Sorting by (route, price) puts every route's fares in a contiguous,
+        ordered run; percentile positions inside each run are computed for all
+        routes at once. Returns `route`, `flights` and one `p<q>` array per q.
+        """
+        rows = np.flatnonzero(self._priced())
+        route, price = self.route[rows], self.price[rows]
+        # sort by price, then stably by route: each route's fares end up contiguous and ordered
+        order = np.argsort(price)
+        order = order[np.argsort(route[order], kind="stable")]
+        route, price = route[order], price[order]
+        counts = np.bincount(route, minlength=len(self.route_names))
+        routes = np.flatnonzero(counts)
+        counts = counts[routes]
+        starts = np.r_[0, np.cumsum(counts)[:-1]] if routes.size else counts
+        result: Dict[str, "np.ndarray"] = {"route": routes, "flights": counts}
+        for q in qs:
+            if not 0 <= q <= 100:
+                raise ValueError(f"Percentile {q} must be between 0 and 100.")
+            position = starts + (counts - 1) * (q / 100.0)
+            low = np.floor(position).astype(np.int64)
+            high = np.minimum(low + 1, starts + counts - 1)
+            fraction = position - low
+            result[f"p{q:g}"] = price[low] + (price[high] - price[low]) * fraction
+        return result
+
+    def price_alerts(
+        self,
+        max_price: Optional[float] = None,
+        drop_pct: Optional[float] = None,
+        window: int = 7,
+    ) -> Dict[str, "np.ndarray"]:
+        """
+        Route days whose cheapest fare is at or below `max_price`, or at least
+        `drop_pct` percent below the mean of the previous `window` days' minima.
+        """
+        if max_price is None and drop_pct is None:
+            raise ValueError("Set max_price and/or drop_pct.")
+        grid, first_day, daily = self._daily_grid()
+        present = ~np.isnan(grid)
+        # trailing mean of the days *before* each day: shift the window by one
+        padded = np.pad(np.where(present, grid, 0.0), ((0, 0), (window + 1, 0)))
+        padded_count = np.pad(present.astype(np.int64), ((0, 0), (window + 1, 0)))
+        sums, counts = np.cumsum(padded, axis=1), np.cumsum(padded_count, axis=1)
+        prev_sum = sums[:, window:-1] - sums[:, :-window - 1]
+        prev_count = counts[:, window:-1] - counts[:, :-window - 1]
+
+        r, d, price = daily["route"], daily["day"] - first_day, daily["price"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            reference = prev_sum[r, d] / prev_count[r, d]
+            drop = (reference - price) / reference * 100.0
+        hit = np.zeros(price.shape, dtype=bool)
+        if max_price is not None:
+            hit |= price <= max_price
+        if drop_pct is not None:
+            hit |= (prev_count[r, d] > 0) & (drop >= drop_pct)
+        return {
+            "route": r[hit],
+            "day": daily["day"][hit],
+            "price": price[hit],
+            "reference": reference[hit],
+            "drop_pct": drop[hit],
+            "index": daily["index"][hit],
+        }
+
+    def to_records(self, columns: Dict[str, "np.ndarray"]) -> List[Dict[str, Any]]:
+        """Render the arrays returned by the queries as JSON-ready dicts."""
+        names = list(columns)
+        out: List[Dict[str, Any]] = []
+        for values in zip(*(columns[name].tolist() for name in names)):
+            record: Dict[str, Any] = {}
+            for name, value in zip(names, values):
+                if name == "route":
+                    value = self.route_names[value]
+                elif name == "day":
+                    name, value = "date", _day_iso(value)
+                elif isinstance(value, float):
+                    value = None if value != value else round(value, 2)
+                record[name] = value
+            out.append(record)
+        return out
+
+def _dictionary_column(column: Tuple[Dict[str, Any], bytes]) -> Tuple["np.ndarray", List[Optional[str]]]:
+    """Indices of a dictionary-encoded block column and its dictionary (index 0 is null)."""
+    meta, payload = column
+    return np.frombuffer(payload, dtype="<u4").astype(np.int64), [None] + list(meta.get("dictionary", []))
+
+def load_fare_frame(path: Path) -> FareFrame:
+    """
+    Load an exported file (json, jsonl, csv or columnar; optionally gzip/zstd
+    compressed) into a `FareFrame`. The format is detected from the content.
+    """
+    path = Path(path)
+    with _open_read_binary(path) as f:
+        head = f.read(4)
+        if head == COLUMNAR_MAGIC:
+            content = None
+        else:
+            content = head + f.read()
+    if content is None:
+        return FareFrame.from_columnar(path)
+    text = content.lstrip()
+    if not text:
+        return FareFrame.from_flights([])
+    if text[:1] == b"[":
+        return FareFrame.from_flights(get_json_decoder()(text))
+    if text[:1] == b"{":
+        decode = get_json_decoder()
+        return FareFrame.from_flights(decode(line) for line in text.splitlines() if line.strip())
+    return FareFrame.from_flights(csv.DictReader(io.StringIO(content.decode("utf-8"))))
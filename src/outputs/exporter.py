@@ -1,13 +1,584 @@
 from __future__ import annotations
 
+import abc
+import csv
+import gzip
+import io
 import json
+import math
+import struct
+import sys
+from array import array
 from pathlib import Path
-from typing import Any, Iterable, List
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
 
-def export_to_json(data: Iterable[Any], output_path: Path) -> None:
-    path = Path(output_path)
+try:  # optional dependency, only needed for zstd compression
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+try:  # optional dependency, only needed for the parquet writer
+    import pyarrow
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:  # pragma: no cover - depends on environment
+    pyarrow = None
+    pyarrow_parquet = None
+
+from flights.parser import parse_utc_epoch
+from utils.metrics import REGISTRY
+
+from .history import FareHistoryStore
+
+COMPRESSIONS = (None, "gzip", "zstd")
+
+EXPORT_SECONDS = REGISTRY.histogram("ryanair_export_seconds", "Time spent in export_flights, by format.", ("format",))
+ROWS_EXPORTED = REGISTRY.counter("ryanair_exported_rows_total", "Rows written by output writers.", ("format",))
+BYTES_WRITTEN = REGISTRY.counter("ryanair_exported_bytes_total", "Bytes added to output files.", ("format",))
+
+# Flat column layout shared by the tabular writers (CSV, columnar, parquet).
+# The nested regularFare block is flattened to its first fare entry.
+FLAT_COLUMNS: Tuple[str, ...] = (
+    "Origin",
+    "Destination",
+    "Flight duration",
+    "Flight number",
+    "Price",
+    "Time departure",
+    "Time arrival",
+    "key",
+    "scrapedAt",
+    "fareClass",
+    "fareType",
+    "fareCount",
+    "hasDiscount",
+    "operatedBy",
+)
+
+def flatten_flight(item: Any) -> Dict[str, Any]:
+    """Flatten a flight dict (or anything with `to_dict()`) into `FLAT_COLUMNS`."""
+    if hasattr(item, "to_dict"):
+        item = item.to_dict()
+    fare = item.get("regularFare") or {}
+    fares = fare.get("fares") or []
+    first = fares[0] if fares else {}
+    return {
+        "Origin": item.get("Origin"),
+        "Destination": item.get("Destination"),
+        "Flight duration": item.get("Flight duration"),
+        "Flight number": item.get("Flight number"),
+        "Price": item.get("Price"),
+        "Time departure": item.get("Time departure"),
+        "Time arrival": item.get("Time arrival"),
+        "key": item.get("key"),
+        "scrapedAt": item.get("scrapedAt"),
+        "fareClass": fare.get("fareClass"),
+        "fareType": first.get("type"),
+        "fareCount": first.get("count"),
+        "hasDiscount": first.get("hasDiscount"),
+        "operatedBy": item.get("operatedBy"),
+    }
+
+def _open_binary(path: Path, append: bool, compression: Optional[str]) -> IO[bytes]:
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}', expected one of: gzip, zstd.")
     path.parent.mkdir(parents=True, exist_ok=True)
-    # materialize iterable to list for JSON serialization
-    payload: List[Any] = list(data)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    mode = "ab" if append else "wb"
+    if compression == "gzip":
+        # appending adds a new gzip member; readers decode the concatenation
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package to be installed.")
+        return zstandard.ZstdCompressor(level=3).stream_writer(path.open(mode))
+    return path.open(mode)
+
+def _open_text(path: Path, append: bool, compression: Optional[str]) -> IO[str]:
+    return io.TextIOWrapper(_open_binary(path, append, compression), encoding="utf-8", newline="")
+
+def _open_read_binary(path: Path) -> IO[bytes]:
+    """Open a possibly compressed output file for reading, sniffing the codec."""
+    with path.open("rb") as f:
+        head = f.read(4)
+    if head[:2] == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    if head == b"\x28\xb5\x2f\xfd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd files requires the 'zstandard' package to be installed.")
+        return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), read_across_frames=True)
+    return path.open("rb")
+
+def _has_content(path: Path) -> bool:
+    return path.is_file() and path.stat().st_size > 0
+
+class FlightWriter(abc.ABC):
+    """
+    Base class for streaming output writers.
+
+    Writers are context managers: `write(item)` serializes one row at a time,
+    `write_all(items)` streams an iterable and returns the running row count.
+    Rows and bytes written inside a `with` block are recorded as metrics.
+    """
+
+    format_name = ""  # set by register_exporter
+
+    def __init__(self, output_path: Path, append: bool = False, compression: Optional[str] = None) -> None:
+        self.path = Path(output_path)
+        self.append = append
+        self.compression = compression
+        self.count = 0
+        self._initial_size = 0
+
+    def __enter__(self) -> "FlightWriter":
+        self._initial_size = self.path.stat().st_size if self.append and self.path.is_file() else 0
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+        fmt = self.format_name or type(self).__name__
+        ROWS_EXPORTED.inc(self.count, format=fmt)
+        if self.path.is_file():
+            BYTES_WRITTEN.inc(max(0, self.path.stat().st_size - self._initial_size), format=fmt)
+
+    @abc.abstractmethod
+    def open(self) -> None:
+        """Open the output; called on entering the `with` block."""
+
+    @abc.abstractmethod
+    def write(self, item: Any) -> None:
+        """Serialize one flight (a dict or a record with `to_dict()`)."""
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """Flush and close the output; called on leaving the `with` block."""
+
+    def write_all(self, items: Iterable[Any]) -> int:
+        for item in items:
+            self.write(item)
+        return self.count
+
+EXPORTERS: Dict[str, Type[FlightWriter]] = {}
+
+def register_exporter(name: str) -> Callable[[Type[FlightWriter]], Type[FlightWriter]]:
+    """Class decorator registering a `FlightWriter` under `name`."""
+
+    def _register(cls: Type[FlightWriter]) -> Type[FlightWriter]:
+        EXPORTERS[name] = cls
+        cls.format_name = name
+        return cls
+
+    return _register
+
+def get_exporter(name: str) -> Type[FlightWriter]:
+    try:
+        return EXPORTERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown output format '{name}', expected one of: {', '.join(sorted(EXPORTERS))}."
+        ) from None
+
+def _encode_array_items(items: Iterable[Any], indent: Optional[int]) -> str:
+    encoded = (
+        json.dumps(item.to_dict() if hasattr(item, "to_dict") else item, ensure_ascii=False, indent=indent)
+        for item in items
+    )
+    if indent is None:
+        return ", ".join(encoded)
+    pad = " " * indent
+    return ",\n".join(pad + text.replace("\n", "\n" + pad) for text in encoded)
+
+def _encode_lines(items: Iterable[Any]) -> str:
+    return "".join(
+        json.dumps(item.to_dict() if hasattr(item, "to_dict") else item, ensure_ascii=False, separators=(",", ":"))
+        + "\n"
+        for item in items
+    )
+
+@register_exporter("json")
+class JsonArrayWriter(FlightWriter):
+    """
+    Incrementally write items as a JSON array.
+
+    Output is byte-for-byte what `json.dump(list(items), f, indent=2)` would
+    produce, but only one item is serialized at a time. Append mode reopens an
+    existing array and extends it in place, so it cannot be combined with
+    compression.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        append: bool = False,
+        compression: Optional[str] = None,
+        indent: Optional[int] = 2,
+    ) -> None:
+        if append and compression:
+            raise ValueError("Appending to a compressed JSON array is not supported; use jsonl.")
+        super().__init__(output_path, append=append, compression=compression)
+        self.indent = indent
+        self._file: Optional[IO[str]] = None
+        self._has_items = False
+
+    def open(self) -> None:
+        if self.append and _has_content(self.path):
+            self._file = self._reopen_array()
+            return
+        self._file = _open_text(self.path, False, self.compression)
+        self._file.write("[")
+
+    def _reopen_array(self) -> IO[str]:
+        raw = self.path.open("r+b")
+        raw.seek(0, io.SEEK_END)
+        tail_start = max(0, raw.tell() - 64)
+        raw.seek(tail_start)
+        tail = raw.read().rstrip()
+        if not tail.endswith(b"]"):
+            raw.close()
+            raise ValueError(f"Cannot append to {self.path}: it does not end with a JSON array.")
+        body = tail[:-1].rstrip()
+        self._has_items = not body.endswith(b"[")
+        raw.seek(tail_start + len(body))
+        raw.truncate()
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+    def write(self, item: Any) -> None:
+        self.write_encoded(_encode_array_items([item], self.indent), 1)
+
+    def write_encoded(self, text: str, count: int) -> None:
+        """Write `count` items pre-serialized by `encode_items` (e.g. in a worker process)."""
+        assert self._file is not None, "writer is not open"
+        if not count:
+            return
+        if self.indent is None:
+            self._file.write(", " + text if self._has_items else text)
+        else:
+            self._file.write(",\n" if self._has_items else "\n")
+            self._file.write(text)
+        self._has_items = True
+        self.count += count
+
+    def close(self) -> None:
+        assert self._file is not None
+        if self._has_items and self.indent is not None:
+            self._file.write("\n")
+        self._file.write("]")
+        self._file.close()
+        self._file = None
+
+@register_exporter("jsonl")
+class JsonLinesWriter(FlightWriter):
+    """Incrementally write items as JSON Lines, one compact object per line."""
+
+    def __init__(self, output_path: Path, append: bool = False, compression: Optional[str] = None) -> None:
+        super().__init__(output_path, append=append, compression=compression)
+        self._file: Optional[IO[str]] = None
+
+    def open(self) -> None:
+        self._file = _open_text(self.path, self.append, self.compression)
+
+    def write(self, item: Any) -> None:
+        self.write_encoded(_encode_lines([item]), 1)
+
+    def write_encoded(self, text: str, count: int) -> None:
+        """Write `count` lines pre-serialized by `encode_items` (e.g. in a worker process)."""
+        assert self._file is not None, "writer is not open"
+        self._file.write(text)
+        self.count += count
+
+    def close(self) -> None:
+        assert self._file is not None
+        self._file.close()
+        self._file = None
+
+@register_exporter("csv")
+class CsvWriter(FlightWriter):
+    """Write flattened flights as CSV; the header is skipped when appending to a non-empty file."""
+
+    def __init__(self, output_path: Path, append: bool = False, compression: Optional[str] = None) -> None:
+        super().__init__(output_path, append=append, compression=compression)
+        self._file: Optional[IO[str]] = None
+        self._writer: Optional[csv.DictWriter] = None
+
+    def open(self) -> None:
+        write_header = not (self.append and _has_content(self.path))
+        self._file = _open_text(self.path, self.append, self.compression)
+        self._writer = csv.DictWriter(self._file, fieldnames=FLAT_COLUMNS)
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, item: Any) -> None:
+        assert self._writer is not None, "writer is not open"
+        self._writer.writerow(flatten_flight(item))
+        self.count += 1
+
+    def close(self) -> None:
+        assert self._file is not None
+        self._file.close()
+        self._file = None
+        self._writer = None
+
+# Column types of the built-in columnar format. Timestamps are stored as
+# UTC epoch seconds.
+COLUMNAR_TYPES: Dict[str, str] = {
+    "Origin": "str",
+    "Destination": "str",
+    "Flight duration": "str",
+    "Flight number": "str",
+    "Price": "f64",
+    "Time departure": "i64",
+    "Time arrival": "i64",
+    "key": "str",
+    "scrapedAt": "str",
+    "fareClass": "str",
+    "fareType": "str",
+    "fareCount": "i64",
+    "hasDiscount": "bool",
+    "operatedBy": "str",
+}
+
+COLUMNAR_MAGIC = b"RFC1"
+_INT64_NULL = -(2**63)
+_BLOCK_HEADER = struct.Struct("<4sI")
+
+def _native_to_le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _encode_column(kind: str, values: Sequence[Any]) -> Tuple[Dict[str, Any], bytes]:
+    if kind == "f64":
+        return {}, _native_to_le(array("d", (math.nan if v is None else float(v) for v in values)))
+    if kind == "i64":
+        return {}, _native_to_le(array("q", (_INT64_NULL if v is None else int(v) for v in values)))
+    if kind == "bool":
+        return {}, _native_to_le(array("b", (-1 if v is None else int(bool(v)) for v in values)))
+    # dictionary-encoded strings: index 0 is reserved for null
+    dictionary: Dict[str, int] = {}
+    indices = array("I")
+    for value in values:
+        if value is None:
+            indices.append(0)
+            continue
+        index = dictionary.get(value)
+        if index is None:
+            index = dictionary[value] = len(dictionary) + 1
+        indices.append(index)
+    return {"dictionary": list(dictionary)}, _native_to_le(indices)
+
+def _decode_column(kind: str, meta: Dict[str, Any], payload: bytes) -> List[Any]:
+    typecode = {"f64": "d", "i64": "q", "bool": "b", "str": "I"}[kind]
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder == "big":
+        values.byteswap()
+    if kind == "f64":
+        return [None if math.isnan(v) else v for v in values]
+    if kind == "i64":
+        return [None if v == _INT64_NULL else v for v in values]
+    if kind == "bool":
+        return [None if v < 0 else bool(v) for v in values]
+    dictionary = [None] + meta["dictionary"]
+    return [dictionary[i] for i in values]
+
+@register_exporter("columnar")
+class ColumnarWriter(FlightWriter):
+    """
+    Compact column-oriented binary format with no third-party dependencies.
+
+    Rows are buffered into row groups of `row_group_size`; each group is a
+    block of `MAGIC | header length | JSON header | column payloads` with
+    little-endian float64/int64 columns and dictionary-encoded strings.
+    Appending simply adds more blocks. Use `read_columnar()` to load a file.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        append: bool = False,
+        compression: Optional[str] = None,
+        row_group_size: int = 50_000,
+    ) -> None:
+        super().__init__(output_path, append=append, compression=compression)
+        self.row_group_size = row_group_size
+        self._file: Optional[IO[bytes]] = None
+        self._columns: Dict[str, List[Any]] = {}
+
+    def open(self) -> None:
+        self._file = _open_binary(self.path, self.append, self.compression)
+        self._reset_buffer()
+
+    def _reset_buffer(self) -> None:
+        self._columns = {name: [] for name in COLUMNAR_TYPES}
+
+    def write(self, item: Any) -> None:
+        assert self._file is not None, "writer is not open"
+        row = flatten_flight(item)
+        row["Time departure"] = parse_utc_epoch(row["Time departure"])
+        row["Time arrival"] = parse_utc_epoch(row["Time arrival"])
+        for name, column in self._columns.items():
+            column.append(row[name])
+        self.count += 1
+        if len(self._columns["key"]) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        assert self._file is not None
+        rows = len(self._columns["key"])
+        if not rows:
+            return
+        header: Dict[str, Any] = {"rows": rows, "columns": []}
+        payloads: List[bytes] = []
+        for name, kind in COLUMNAR_TYPES.items():
+            meta, payload = _encode_column(kind, self._columns[name])
+            header["columns"].append(dict(meta, name=name, type=kind, size=len(payload)))
+            payloads.append(payload)
+        encoded_header = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._file.write(_BLOCK_HEADER.pack(COLUMNAR_MAGIC, len(encoded_header)))
+        self._file.write(encoded_header)
+        for payload in payloads:
+            self._file.write(payload)
+        self._reset_buffer()
+
+    def close(self) -> None:
+        assert self._file is not None
+        self._flush()
+        self._file.close()
+        self._file = None
+
+def read_columnar(path: Path) -> Dict[str, List[Any]]:
+    """Load a (possibly compressed) columnar file into a dict of column lists."""
+    columns: Dict[str, List[Any]] = {name: [] for name in COLUMNAR_TYPES}
+    with _open_read_binary(Path(path)) as f:
+        while True:
+            prefix = f.read(_BLOCK_HEADER.size)
+            if not prefix:
+                break
+            magic, header_len = _BLOCK_HEADER.unpack(prefix)
+            if magic != COLUMNAR_MAGIC:
+                raise ValueError(f"{path} is not a columnar flights file (bad block magic).")
+            header = json.loads(f.read(header_len))
+            for meta in header["columns"]:
+                values = _decode_column(meta["type"], meta, f.read(meta["size"]))
+                columns.setdefault(meta["name"], []).extend(values)
+    return columns
+
+@register_exporter("parquet")
+class ParquetWriter(FlightWriter):
+    """Parquet output via `pyarrow` (optional dependency); one row group per buffer."""
+
+    def __init__(
+        self,
+        output_path: Path,
+        append: bool = False,
+        compression: Optional[str] = None,
+        row_group_size: int = 50_000,
+    ) -> None:
+        if pyarrow is None:
+            raise RuntimeError("The parquet format requires the 'pyarrow' package to be installed.")
+        if append:
+            raise ValueError("The parquet format does not support append mode.")
+        super().__init__(output_path, append=append, compression=compression)
+        self.row_group_size = row_group_size
+        self._rows: List[Dict[str, Any]] = []
+        self._writer = None
+
+    def open(self) -> None:
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression '{self.compression}', expected one of: gzip, zstd.")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, item: Any) -> None:
+        self._rows.append(flatten_flight(item))
+        self.count += 1
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        table = pyarrow.Table.from_pylist(self._rows)
+        if self._writer is None:
+            self._writer = pyarrow_parquet.ParquetWriter(
+                str(self.path), table.schema, compression=self.compression or "snappy"
+            )
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+@register_exporter("sqlite")
+class SqliteHistoryWriter(FlightWriter):
+    """
+    Append rows to a `FareHistoryStore` database instead of a flat file.
+
+    The database only ever grows, so `append` is implied; rows without a route
+    or departure time (snapshot removal records) are skipped.
+    """
+
+    def __init__(self, output_path: Path, append: bool = False, compression: Optional[str] = None) -> None:
+        if compression is not None:
+            raise ValueError("The sqlite format does not support compression.")
+        super().__init__(output_path, append=True, compression=None)
+        self._store: Optional[FareHistoryStore] = None
+
+    def open(self) -> None:
+        self._store = FareHistoryStore(self.path)
+
+    def write(self, item: Any) -> None:
+        self._store.add(item)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+# Formats whose writers accept text serialized elsewhere through `write_encoded`.
+PREENCODED_FORMATS = ("json", "jsonl")
+
+def encode_items(fmt: str, items: Iterable[Any]) -> str:
+    """
+    Serialize `items` exactly as the `fmt` writer would, for `write_encoded`.
+
+    This is the CPU-heavy half of writing json/jsonl output; it needs no open
+    file, so it can run in another process.
+    """
+    if fmt == "json":
+        return _encode_array_items(items, indent=2)
+    if fmt == "jsonl":
+        return _encode_lines(items)
+    raise ValueError(f"Output format '{fmt}' cannot be pre-encoded, expected one of: {', '.join(PREENCODED_FORMATS)}.")
+
+def open_exporter(
+    output_path: Path,
+    fmt: str = "json",
+    append: bool = False,
+    compression: Optional[str] = None,
+) -> FlightWriter:
+    """Instantiate the registered writer for `fmt` (use it as a context manager)."""
+    return get_exporter(fmt)(Path(output_path), append=append, compression=compression)
+
+def export_flights(
+    data: Iterable[Any],
+    output_path: Path,
+    fmt: str = "json",
+    append: bool = False,
+    compression: Optional[str] = None,
+) -> int:
+    """Stream `data` through the writer registered for `fmt` and return the row count."""
+    with EXPORT_SECONDS.time(format=fmt):
+        with open_exporter(output_path, fmt, append=append, compression=compression) as writer:
+            return writer.write_all(data)
+
+def export_to_json(data: Iterable[Any], output_path: Path) -> int:
+    """Stream `data` to a pretty-printed JSON array and return the item count."""
+    return export_flights(data, output_path, "json")
+
+def export_to_jsonl(data: Iterable[Any], output_path: Path) -> int:
+    """Stream `data` to a JSON Lines file and return the item count."""
+    return export_flights(data, output_path, "jsonl")
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS fares (
+        id INTEGER PRIMARY KEY,
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        departure_date TEXT NOT NULL,
+        departure TEXT,
+        arrival TEXT,
+        flight_number TEXT,
+        flight_key TEXT,
+        price REAL,
+        fare_class TEXT,
+        scraped_at TEXT NOT NULL
+    )
+    """,
+    # cheapest fare for a route (optionally within a departure window)
+    "CREATE INDEX IF NOT EXISTS idx_fares_route_date_price ON fares(origin, destination, departure_date, price)",
+    # route activity over time ("last week")
+    "CREATE INDEX IF NOT EXISTS idx_fares_route_scraped ON fares(origin, destination, scraped_at)",
+    # price history of one flight
+    "CREATE INDEX IF NOT EXISTS idx_fares_key_scraped ON fares(flight_key, scraped_at)",
+    "CREATE INDEX IF NOT EXISTS idx_fares_scraped ON fares(scraped_at)",
+    # running per-route aggregates, so summaries never scan the fares table
+    """
+    CREATE TABLE IF NOT EXISTS route_stats (
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        observations INTEGER NOT NULL,
+        priced INTEGER NOT NULL,
+        price_sum REAL NOT NULL,
+        min_price REAL,
+        max_price REAL,
+        first_scraped TEXT NOT NULL,
+        last_scraped TEXT NOT NULL,
+        PRIMARY KEY (origin, destination)
+    )
+    """,
+)
+
+_INSERT = (
+    "INSERT INTO fares (origin, destination, departure_date, departure, arrival, flight_number, "
+    "flight_key, price, fare_class, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_UPSERT_STATS = """
+    INSERT INTO route_stats AS s
+        (origin, destination, observations, priced, price_sum, min_price, max_price, first_scraped, last_scraped)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (origin, destination) DO UPDATE SET
+        observations = s.observations + excluded.observations,
+        priced = s.priced + excluded.priced,
+        price_sum = s.price_sum + excluded.price_sum,
+        min_price = CASE WHEN s.min_price IS NULL OR excluded.min_price < s.min_price
+                         THEN excluded.min_price ELSE s.min_price END,
+        max_price = CASE WHEN s.max_price IS NULL OR excluded.max_price > s.max_price
+                         THEN excluded.max_price ELSE s.max_price END,
+        first_scraped = MIN(s.first_scraped, excluded.first_scraped),
+        last_scraped = MAX(s.last_scraped, excluded.last_scraped)
+"""
+
+Row = Tuple[str, str, str, Optional[str], Optional[str], Optional[str], Optional[str], Optional[float], Optional[str], str]
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def since_days(days: float) -> str:
+    """ISO timestamp `days` ago, for the `since` arguments of the query API."""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+def _fare_class(flight: Dict[str, Any]) -> Optional[str]:
+    fare = flight.get("regularFare")
+    return fare.get("fareClass") if isinstance(fare, dict) else None
+
+def _to_row(flight: Any) -> Optional[Row]:
+    if hasattr(flight, "to_dict"):
+        flight = flight.to_dict()
+    origin = flight.get("Origin")
+    destination = flight.get("Destination")
+    departure = flight.get("Time departure")
+    if not origin or not destination or not departure:
+        return None  # e.g. snapshot removal records
+    price = flight.get("Price")
+    return (
+        origin,
+        destination,
+        str(departure)[:10],
+        departure,
+        flight.get("Time arrival"),
+        flight.get("Flight number"),
+        flight.get("key"),
+        float(price) if price is not None else None,
+        _fare_class(flight),
+        flight.get("scrapedAt") or _utc_now_iso(),
+    )
+
+class FareHistoryStore:
+    """
+    Append-only fare history in an embedded sqlite database.
+
+    Flights are buffered and inserted `batch_size` at a time, each batch in one
+    transaction together with the per-route aggregates in `route_stats`. The
+    query methods return plain dicts and are served from indexes on route +
+    departure date + price, route + scrapedAt and flight key + scrapedAt.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 5000) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.skipped = 0
+        self._pending: List[Row] = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # keep index pages of large histories in memory while bulk-inserting
+        self._conn.execute("PRAGMA cache_size=-65536")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def __enter__(self) -> "FareHistoryStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def add(self, flight: Any) -> None:
+        row = _to_row(flight)
+        with self._lock:
+            if row is None:
+                self.skipped += 1
+                return
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def add_all(self, flights: Iterable[Any]) -> int:
+        """Buffer every flight; returns the number of rows accepted."""
+        before = self.inserted + len(self._pending)
+        for flight in flights:
+            self.add(flight)
+        return self.inserted + len(self._pending) - before
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        stats: Dict[Tuple[str, str], List[Any]] = {}
+        for row in rows:
+            price, scraped_at = row[7], row[9]
+            entry = stats.get((row[0], row[1]))
+            if entry is None:
+                entry = stats[(row[0], row[1])] = [0, 0, 0.0, None, None, scraped_at, scraped_at]
+            entry[0] += 1
+            if price is not None:
+                entry[1] += 1
+                entry[2] += price
+                entry[3] = price if entry[3] is None else min(entry[3], price)
+                entry[4] = price if entry[4] is None else max(entry[4], price)
+            entry[5] = min(entry[5], scraped_at)
+            entry[6] = max(entry[6], scraped_at)
+        with self._conn:
+            self._conn.executemany(_INSERT, rows)
+            self._conn.executemany(_UPSERT_STATS, [key + tuple(entry) for key, entry in stats.items()])
+        self.inserted += len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+
+    def _query(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        self.flush()
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, tuple(params))]
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) AS n FROM fares", ())[0]["n"]
+
+    def cheapest(
+        self,
+        origin: str,
+        destination: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cheapest recorded fares for a route, optionally limited to departures in
+        `[date_from, date_to]` and to observations scraped at or after `since`.
+        """
+        clauses = ["origin = ?", "destination = ?", "price IS NOT NULL"]
+        params: List[Any] = [origin, destination]
+        if date_from:
+            clauses.append("departure_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("departure_date <= ?")
+            params.append(date_to)
+        if since:
+            clauses.append("scraped_at >= ?")
+            params.append(since)
+        params.append(limit)
+        return self._query(
+            "SELECT origin, destination, departure_date AS departureDate, departure, flight_number AS flightNumber, "
+            "flight_key AS key, price, fare_class AS fareClass, scraped_at AS scrapedAt "
+            f"FROM fares WHERE {' AND '.join(clauses)} ORDER BY price, departure LIMIT ?",
+            params,
+        )
+
+    def price_history(
+        self,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None,
+        departure_date: Optional[str] = None,
+        flight_key: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        How the price moved over time, oldest first.
+
+        With `flight_key`, one point per observation of that flight; otherwise
+        the cheapest fare on the route (and `departure_date`, if given) per
+        scrape timestamp.
+        """
+        if flight_key:
+            clauses, params = ["flight_key = ?"], [flight_key]
+            if since:
+                clauses.append("scraped_at >= ?")
+                params.append(since)
+            return self._query(
+                "SELECT scraped_at AS scrapedAt, price, departure, flight_number AS flightNumber "
+                f"FROM fares WHERE {' AND '.join(clauses)} ORDER BY scraped_at",
+                params,
+            )
+        if not origin or not destination:
+            raise ValueError("price_history needs either flight_key or origin and destination.")
+        clauses, params = ["origin = ?", "destination = ?", "price IS NOT NULL"], [origin, destination]
+        if departure_date:
+            clauses.append("departure_date = ?")
+            params.append(departure_date)
+        if since:
+            clauses.append("scraped_at >= ?")
+            params.append(since)
+        return self._query(
+            "SELECT scraped_at AS scrapedAt, MIN(price) AS minPrice, MAX(price) AS maxPrice, COUNT(*) AS flights "
+            f"FROM fares WHERE {' AND '.join(clauses)} GROUP BY scraped_at ORDER BY scraped_at",
+            params,
+        )
+
+    def route_summary(
+        self,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-route observation count, min/avg/max price and scrape time span.
+
+        Without `since` the answer comes from the running `route_stats`
+        aggregates; with it, from an index range scan of the matching rows.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if origin:
+            clauses.append("origin = ?")
+            params.append(origin)
+        if destination:
+            clauses.append("destination = ?")
+            params.append(destination)
+        if since is None:
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            return self._query(
+                "SELECT origin, destination, observations, min_price AS minPrice, "
+                "CASE WHEN priced > 0 THEN price_sum / priced END AS avgPrice, max_price AS maxPrice, "
+                "first_scraped AS firstScraped, last_scraped AS lastScraped "
+                f"FROM route_stats {where} ORDER BY origin, destination",
+                params,
+            )
+        clauses.append("scraped_at >= ?")
+        params.append(since)
+        return self._query(
+            "SELECT origin, destination, COUNT(*) AS observations, MIN(price) AS minPrice, AVG(price) AS avgPrice, "
+            "MAX(price) AS maxPrice, MIN(scraped_at) AS firstScraped, MAX(scraped_at) AS lastScraped "
+            f"FROM fares WHERE {' AND '.join(clauses)} GROUP BY origin, destination ORDER BY origin, destination",
+            params,
+        )
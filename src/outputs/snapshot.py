@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# File layout (little-endian):
+#   header   : magic "RFS1" | u32 version | u64 count
+#   hashes   : u64 * count, sorted ascending
+#   prices   : f64 * count (NaN for unknown price)
+#   offsets  : u64 * (count + 1), byte offsets of each key in the key blob
+#   key blob : utf-8 keys concatenated in hash order
+SNAPSHOT_MAGIC = b"RFS1"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sIQ")
+
+def key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _price_equal(old: float, new: float) -> bool:
+    if math.isnan(old) or math.isnan(new):
+        return math.isnan(old) and math.isnan(new)
+    return abs(old - new) < 1e-9
+
+def _as_price(value: Any) -> float:
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+def _optional_price(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+class FareSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Lookups bisect the sorted hash column directly in the mapping, so opening
+    a snapshot with millions of keys costs no parsing and little memory.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        self._mmap: Optional[mmap.mmap] = None
+        self.count = 0
+        if self.path.stat().st_size == 0:
+            return
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path} is not a fare snapshot file.")
+        if sys.byteorder != "little":  # pragma: no cover - the mapped columns are little-endian
+            raise RuntimeError("Fare snapshots can only be memory-mapped on little-endian hosts.")
+        self.count = count
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._hashes = view[offset : offset + 8 * count].cast("Q")
+        offset += 8 * count
+        self._prices = view[offset : offset + 8 * count].cast("d")
+        offset += 8 * count
+        self._offsets = view[offset : offset + 8 * (count + 1)].cast("Q")
+        self._blob_start = offset + 8 * (count + 1)
+
+    @classmethod
+    def empty(cls) -> "FareSnapshot":
+        snapshot = cls.__new__(cls)
+        snapshot.path = Path()
+        snapshot._file = None
+        snapshot._mmap = None
+        snapshot.count = 0
+        return snapshot
+
+    def __len__(self) -> int:
+        return self.count
+
+    def index_of(self, key: str, hashed: Optional[int] = None) -> int:
+        """Position of `key` in the snapshot, or -1 when absent."""
+        if not self.count:
+            return -1
+        hashed = key_hash(key) if hashed is None else hashed
+        index = bisect_left(self._hashes, hashed)
+        while index < self.count and self._hashes[index] == hashed:
+            if self.key_at(index) == key:
+                return index
+            index += 1
+        return -1
+
+    def key_at(self, index: int) -> str:
+        start = self._blob_start + self._offsets[index]
+        end = self._blob_start + self._offsets[index + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def price_at(self, index: int) -> float:
+        return self._prices[index]
+
+    def get_price(self, key: str) -> Optional[float]:
+        index = self.index_of(key)
+        return None if index < 0 else _optional_price(self._prices[index])
+
+    def __contains__(self, key: str) -> bool:
+        return self.index_of(key) >= 0
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        for index in range(self.count):
+            yield self.key_at(index), self._prices[index]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            for column in ("_hashes", "_prices", "_offsets"):
+                getattr(self, column).release()
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FareSnapshot":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+def write_snapshot(path: Path, entries: Iterable[Tuple[str, Any]]) -> int:
+    """
+    Atomically write `(key, price)` pairs as a snapshot file.
+
+    Duplicate keys keep the last price. Returns the number of keys written.
+    """
+    latest: Dict[str, Tuple[int, float]] = {}
+    for key, price in entries:
+        if key is not None:
+            latest[key] = (key_hash(key), _as_price(price))
+    return _write_hashed(Path(path), latest)
+
+def _write_hashed(path: Path, entries: Dict[str, Tuple[int, float]]) -> int:
+    ordered = sorted(entries.items(), key=lambda item: item[1][0])
+
+    hashes = array("Q", [hashed for _, (hashed, _) in ordered])
+    prices = array("d", [price for _, (_, price) in ordered])
+    encoded = [key.encode("utf-8") for key, _ in ordered]
+    offsets = array("Q", [0])
+    total = 0
+    for raw in encoded:
+        total += len(raw)
+        offsets.append(total)
+    blob = b"".join(encoded)
+    if sys.byteorder != "little":  # pragma: no cover
+        for column in (hashes, prices, offsets):
+            column.byteswap()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(ordered)))
+        f.write(hashes.tobytes())
+        f.write(prices.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(ordered)
+
+class SnapshotDiffer:
+    """
+    Stream a new run against the previous snapshot.
+
+    `feed(flight)` returns a delta for new flights and price changes (None when
+    unchanged); `removed()` yields flights missing from the new run once every
+    flight has been fed; `commit()` replaces the snapshot with the new run.
+
+    Delta records are the flight dict plus `change` ("new" / "price") and
+    `oldPrice`; removals are `{"change": "removed", "key": ..., "oldPrice": ...}`.
+
+    A result cut off at its `max_items` says nothing about the flights past
+    the cutoff, so once one is fed the run is `truncated`: `removed()` yields
+    nothing and `commit()` keeps the unseen keys.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.previous = FareSnapshot(self.path) if self.path.is_file() else FareSnapshot.empty()
+        self._seen = bytearray(self.previous.count)
+        self._current: Dict[str, Tuple[int, float]] = {}
+        self.truncated = False
+        self.stats = {"new": 0, "price": 0, "removed": 0, "unchanged": 0}
+
+    def feed(self, flight: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = flight.get("key")
+        if key is None:
+            return None
+        price = _as_price(flight.get("Price"))
+        hashed = key_hash(key)
+        self._current[key] = (hashed, price)
+
+        index = self.previous.index_of(key, hashed)
+        if index < 0:
+            self.stats["new"] += 1
+            return dict(flight, change="new", oldPrice=None)
+        self._seen[index] = 1
+        old_price = self.previous.price_at(index)
+        if _price_equal(old_price, price):
+            self.stats["unchanged"] += 1
+            return None
+        self.stats["price"] += 1
+        return dict(flight, change="price", oldPrice=_optional_price(old_price))
+
+    def feed_all(self, flights: Iterable[Dict[str, Any]], max_items: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Feed one query's flights; `max_items` is the limit they were parsed with."""
+        fed = 0
+        for flight in flights:
+            fed += 1
+            delta = self.feed(flight)
+            if delta is not None:
+                yield delta
+        if max_items is not None and fed >= max_items:
+            self.truncated = True
+
+    def removed(self) -> Iterator[Dict[str, Any]]:
+        if self.truncated:
+            return
+        for index in range(self.previous.count):
+            if not self._seen[index]:
+                self.stats["removed"] += 1
+                yield {
+                    "change": "removed",
+                    "key": self.previous.key_at(index),
+                    "oldPrice": _optional_price(self.previous.price_at(index)),
+                }
+
+    def commit(self, carry_over_unseen: bool = False) -> int:
+        """
+        Write the new snapshot. With `carry_over_unseen`, keys that were not
+        seen in this run (e.g. routes whose query failed) are kept as they were;
+        a truncated run always keeps them.
+        """
+        entries: Dict[str, Tuple[int, float]] = {}
+        if carry_over_unseen or self.truncated:
+            for index in range(self.previous.count):
+                if not self._seen[index]:
+                    entries[self.previous.key_at(index)] = (
+                        self.previous._hashes[index],
+                        self.previous.price_at(index),
+                    )
+        entries.update(self._current)
+        self.previous.close()
+        return _write_hashed(self.path, entries)
+
+def diff_and_update(
+    path: Path, flights: Iterable[Dict[str, Any]], max_items: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Diff a complete run against the snapshot at `path`, store it, and return the deltas."""
+    differ = SnapshotDiffer(path)
+    deltas = list(differ.feed_all(flights, max_items))
+    deltas.extend(differ.removed())
+    differ.commit()
+    return deltas
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+try:  # optional dependency, fastest generic decoder
+    import msgspec
+except ImportError:  # pragma: no cover - depends on environment
+    msgspec = None
+
+try:  # optional dependency, fast generic decoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+JsonDecoder = Callable[[Union[bytes, str]], Any]
+
+def available_backends() -> Dict[str, bool]:
+    return {"msgspec": msgspec is not None, "orjson": orjson is not None, "json": True}
+
+def get_json_decoder(backend: Optional[str] = None) -> JsonDecoder:
+    """
+    Return a `bytes -> object` JSON decoder.
+
+    `backend` is "msgspec", "orjson" or "json"; None picks the fastest one
+    installed. Every decoder raises ValueError on malformed input, like
+    `json.loads`.
+    """
+    if backend is None:
+        backend = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+    if backend == "msgspec":
+        if msgspec is None:
+            raise RuntimeError("The msgspec JSON backend requires the 'msgspec' package to be installed.")
+        return msgspec.json.Decoder().decode  # msgspec.DecodeError subclasses ValueError
+    if backend == "orjson":
+        if orjson is None:
+            raise RuntimeError("The orjson JSON backend requires the 'orjson' package to be installed.")
+        return orjson.loads  # orjson.JSONDecodeError subclasses ValueError
+    if backend == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON backend '{backend}', expected msgspec, orjson or json.")
@@ -1,21 +1,266 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Optional
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .rate_limiter import TokenBucket
+
+DEFAULT_LOGGER_NAME = "ryanair_scraper"
+
+# Id of the query being processed in the current thread / task, added to every record.
+correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is
+# emitted as a field by JsonFormatter.
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "correlation_id", "suppressed"}
+
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_listeners_lock = threading.Lock()
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+@contextmanager
+def correlation_scope(value: Optional[str] = None) -> Iterator[str]:
+    """Tag log records emitted inside the block with `value` (a fresh id by default)."""
+    value = value or new_correlation_id()
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+class CorrelationIdFilter(logging.Filter):
+    """Copy the current correlation id onto the record (runs in the emitting thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Throttle repetitive warnings.
+
+    Records at `level` (WARNING by default) are grouped by logger and
+    unformatted message template, so "retrying in %.2fs" warnings from every
+    worker share one budget of `rate_per_second` with bursts of `burst`.
+    Records at any other level, such as INFO progress lines, are never
+    dropped. Dropped records are counted and the count is set as `suppressed`
+    on the next record of the same group that gets through, for the
+    formatters to report; the message itself is left alone. At most
+    `max_groups` groups are tracked, least recently used first out.
+    """
+
+    def __init__(
+        self, rate_per_second: float = 1.0, burst: float = 5.0, level: int = logging.WARNING, max_groups: int = 1024
+    ) -> None:
+        super().__init__()
+        if max_groups <= 0:
+            raise ValueError("max_groups must be a positive integer.")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.level = level
+        self.max_groups = max_groups
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._suppressed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != self.level:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate_per_second, self.burst)
+                while len(self._buckets) > self.max_groups:
+                    evicted, _ = self._buckets.popitem(last=False)
+                    self._suppressed.pop(evicted, None)
+            else:
+                self._buckets.move_to_end(key)
+        if bucket.try_acquire() > 0:
+            with self._lock:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        with self._lock:
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, correlation id and `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        cid = getattr(record, "correlation_id", None)
+        if cid:
+            payload["correlationId"] = cid
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            text = f"{text} (+{suppressed} similar suppressed)"
+        cid = getattr(record, "correlation_id", None)
+        return f"{text} [cid={cid}]" if cid else text
+
+# Renders tracebacks for `_RecordQueueHandler` (Formatter.formatException needs no state).
+_exception_text = logging.Formatter()
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    `QueueHandler` that queues records unformatted.
+
+    The stdlib `prepare` formats the record in the emitting thread and folds
+    the traceback into `msg`; here only the message arguments are merged and
+    the traceback is rendered to `exc_text`, so the listener's formatter (and
+    `JsonFormatter`'s `exception` field) still sees them separately.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_text.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _stream_handler(structured: bool) -> logging.Handler:
+    handler = logging.StreamHandler(stream=sys.stdout)
+    if structured:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            _TextFormatter(
+                fmt="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+    return handler
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
-    logger_name = name or "ryanair_scraper"
+    logger_name = name or DEFAULT_LOGGER_NAME
     logger = logging.getLogger(logger_name)
 
     if logger.handlers:
         return logger
 
     logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler(stream=sys.stdout)
-    formatter = logging.Formatter(
-        fmt="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formatter)
+    handler = _stream_handler(structured=False)
+    handler.addFilter(CorrelationIdFilter())
     logger.addHandler(handler)
     logger.propagate = False
-    return logger
\ No newline at end of file
+    return logger
+
+def configure_logging(
+    name: Optional[str] = None,
+    level: str = "INFO",
+    structured: bool = False,
+    use_queue: bool = False,
+    rate_limit_per_second: Optional[float] = None,
+    rate_limit_burst: float = 5.0,
+) -> logging.Logger:
+    """
+    (Re)configure the scraper logger.
+
+    - `structured` writes JSON lines instead of text
+    - `use_queue` puts a `QueueHandler` on the logger and moves formatting and
+      I/O to a `QueueListener` thread, so request threads never block on stdout;
+      the emitting thread only merges message arguments and renders tracebacks
+      to text before queueing (see `_RecordQueueHandler`)
+    - `rate_limit_per_second` throttles repetitive warnings (see `RateLimitFilter`)
+
+    Correlation ids and rate limiting are applied in the emitting thread,
+    before records are queued.
+    """
+    logger_name = name or DEFAULT_LOGGER_NAME
+    logger = logging.getLogger(logger_name)
+    shutdown_logging(logger_name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    logger.propagate = False
+    output = _stream_handler(structured)
+    if use_queue:
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        front: logging.Handler = _RecordQueueHandler(records)
+        listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        listener.start()
+        with _listeners_lock:
+            _listeners[logger_name] = listener
+    else:
+        front = output
+
+    front.addFilter(CorrelationIdFilter())
+    if rate_limit_per_second:
+        front.addFilter(RateLimitFilter(rate_limit_per_second, rate_limit_burst))
+    logger.addHandler(front)
+    return logger
+
+def configure_logging_from_settings(options: Optional[Dict[str, Any]]) -> logging.Logger:
+    """
+    Configure the scraper logger from the `logging` settings block:
+
+    {
+      "level": "INFO",
+      "format": "json",
+      "queue": true,
+      "rateLimitPerSecond": 1,
+      "rateLimitBurst": 5
+    }
+    """
+    options = options or {}
+    fmt = options.get("format", "text")
+    if fmt not in {"text", "json"}:
+        raise ValueError(f"Invalid log format '{fmt}', expected text or json.")
+    rate = options.get("rateLimitPerSecond")
+    return configure_logging(
+        level=options.get("level", "INFO"),
+        structured=fmt == "json",
+        use_queue=bool(options.get("queue", False)),
+        rate_limit_per_second=float(rate) if rate else None,
+        rate_limit_burst=float(options.get("rateLimitBurst", 5)),
+    )
+
+def shutdown_logging(name: Optional[str] = None) -> None:
+    """Stop queue listeners (all, or the one for `name`), flushing queued records."""
+    with _listeners_lock:
+        names = [name or DEFAULT_LOGGER_NAME] if name is not None else list(_listeners)
+        listeners = [_listeners.pop(key) for key in names if key in _listeners]
+    for listener in listeners:
+        listener.stop()
+
+atexit.register(shutdown_logging)
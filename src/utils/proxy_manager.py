@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
+from .rate_limiter import TokenBucket
+
 def build_proxies(proxy_url: Optional[str]) -> Optional[Dict[str, str]]:
     """
     Convert a single proxy URL into the `requests` proxies dict.
@@ -19,4 +25,213 @@ def build_proxies(proxy_url: Optional[str]) -> Optional[Dict[str, str]]:
     return {
         "http": proxy_url,
         "https": proxy_url,
-    }
\ No newline at end of file
+    }
+
+# Status codes that indicate the exit IP is blocked or throttled.
+COOLDOWN_STATUSES = frozenset({403, 429})
+
+class ProxyUnavailableError(RuntimeError):
+    """Raised when no proxy becomes available before the `acquire` timeout."""
+
+class ProxyState:
+    """Health and rate-limit state for one proxy in a `ProxyPool`."""
+
+    def __init__(self, url: str, weight: float, bucket: Optional[TokenBucket]) -> None:
+        self.url = url
+        self.weight = weight
+        self.bucket = bucket
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.cooldown_until = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def score(self) -> float:
+        """Selection weight for the weighted strategy: fast, healthy proxies score higher."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        return self.weight * max(0.05, 1.0 - self.error_rate) / (0.1 + latency)
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "errorRate": round(self.error_rate, 4),
+            "latencyEwma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "coolingDownFor": round(max(0.0, self.cooldown_until - now), 3),
+        }
+
+class ProxyPool:
+    """
+    Rotating pool of proxies with health scoring and per-proxy rate limits.
+
+    - `strategy="round_robin"` cycles through healthy proxies in order;
+      `strategy="weighted"` picks randomly, favouring low latency and error rate
+    - a proxy that times out or returns 403/429 (or any 5xx, unless
+      `count_server_errors` is off) is put on cooldown, doubling on each
+      consecutive failure up to `max_cooldown_seconds`
+    - with `rate_per_second` set, each proxy gets its own token bucket
+
+    Call `acquire()` before a request and `report()` with the outcome afterwards.
+    """
+
+    def __init__(
+        self,
+        proxies: Iterable[Union[str, Dict[str, Any]]],
+        strategy: str = "round_robin",
+        cooldown_seconds: float = 30.0,
+        max_cooldown_seconds: float = 600.0,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+        count_server_errors: bool = True,
+    ) -> None:
+        if strategy not in {"round_robin", "weighted"}:
+            raise ValueError(f"Invalid proxy strategy '{strategy}', expected round_robin or weighted.")
+        self.strategy = strategy
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.count_server_errors = count_server_errors
+        self.logger = logger or logging.getLogger(__name__)
+        self._states: List[ProxyState] = []
+        self._by_url: Dict[str, ProxyState] = {}
+        for entry in proxies:
+            url, weight = (entry, 1.0) if isinstance(entry, str) else (entry["url"], float(entry.get("weight", 1.0)))
+            build_proxies(url)  # validates the URL
+            bucket = TokenBucket(rate_per_second, burst) if rate_per_second else None
+            state = ProxyState(url, weight, bucket)
+            self._states.append(state)
+            self._by_url[url] = state
+        if not self._states:
+            raise ValueError("ProxyPool requires at least one proxy URL.")
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def try_acquire(self) -> Tuple[Optional[str], float]:
+        """
+        Non-blocking pick. Returns `(proxy_url, 0.0)` on success, otherwise
+        `(None, seconds_to_wait)` when every proxy is cooling down or out of tokens.
+        """
+        with self._lock:
+            now = time.monotonic()
+            healthy = [s for s in self._states if s.cooldown_until <= now]
+            if not healthy:
+                return None, min(s.cooldown_until for s in self._states) - now
+
+            if self.strategy == "round_robin":
+                start = self._cursor
+                ordered = [self._states[(start + i) % len(self._states)] for i in range(len(self._states))]
+                candidates = [s for s in ordered if s.cooldown_until <= now]
+            else:
+                candidates = list(healthy)
+                self._random.shuffle(candidates)
+                candidates.sort(key=lambda s: self._random.random() * s.score(), reverse=True)
+
+            shortest_wait = float("inf")
+            for state in candidates:
+                wait = state.bucket.try_acquire() if state.bucket else 0.0
+                if wait == 0.0:
+                    if self.strategy == "round_robin":
+                        self._cursor = (self._states.index(state) + 1) % len(self._states)
+                    state.requests += 1
+                    return state.url, 0.0
+                shortest_wait = min(shortest_wait, wait)
+            return None, shortest_wait
+
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """Block until a proxy is available; raises ProxyUnavailableError if `timeout` elapses first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            url, wait = self.try_acquire()
+            if url is not None:
+                return url
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ProxyUnavailableError("No proxy became available before the timeout.")
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.001))
+
+    def report(
+        self,
+        proxy_url: str,
+        latency: Optional[float] = None,
+        status: Optional[int] = None,
+        error: bool = False,
+    ) -> None:
+        """Record the outcome of a request made through `proxy_url`."""
+        state = self._by_url.get(proxy_url)
+        if state is None:
+            return
+        with self._lock:
+            if latency is not None:
+                state.latency_ewma = latency if state.latency_ewma is None else 0.8 * state.latency_ewma + 0.2 * latency
+            failed = error or (status is not None and self._is_failure(status))
+            if not failed:
+                state.consecutive_failures = 0
+                return
+            state.errors += 1
+            state.consecutive_failures += 1
+            cooldown = min(
+                self.max_cooldown_seconds,
+                self.cooldown_seconds * (2 ** (state.consecutive_failures - 1)),
+            )
+            state.cooldown_until = time.monotonic() + cooldown
+        self.logger.warning(
+            "Proxy %s on cooldown for %.0fs (status=%s, error=%s)",
+            redact_proxy_url(proxy_url),
+            cooldown,
+            status,
+            error,
+        )
+
+    def _is_failure(self, status: int) -> bool:
+        return status in COOLDOWN_STATUSES or (self.count_server_errors and status >= 500)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [dict(state.as_dict(now), url=redact_proxy_url(state.url)) for state in self._states]
+
+def redact_proxy_url(proxy_url: str) -> str:
+    parsed = urlparse(proxy_url)
+    if parsed.password:
+        return proxy_url.replace(f":{parsed.password}@", ":***@")
+    return proxy_url
+
+def build_proxy_pool(settings: Dict[str, Any], logger: Optional[logging.Logger] = None) -> Optional[ProxyPool]:
+    """
+    Build a pool from settings, or return None when `proxyUrls` is not configured:
+
+    {
+      "proxyUrls": ["http://a:3128", {"url": "http://b:3128", "weight": 2}],
+      "proxyStrategy": "weighted",
+      "proxyCooldownSeconds": 30,
+      "proxyRatePerSecond": 2,
+      "proxyBurst": 4,
+      "proxyCountServerErrors": true
+    }
+    """
+    proxy_urls = settings.get("proxyUrls")
+    if not proxy_urls:
+        return None
+    rate = settings.get("proxyRatePerSecond")
+    burst = settings.get("proxyBurst")
+    return ProxyPool(
+        proxy_urls,
+        strategy=settings.get("proxyStrategy", "round_robin"),
+        cooldown_seconds=float(settings.get("proxyCooldownSeconds", 30)),
+        rate_per_second=float(rate) if rate else None,
+        burst=float(burst) if burst else None,
+        logger=logger,
+        count_server_errors=bool(settings.get("proxyCountServerErrors", True)),
+    )
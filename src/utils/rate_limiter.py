@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:  # POSIX only; required by FileStateBackend
+    import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+    fcntl = None
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; each
+    request consumes one token.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        if self.capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take `tokens` if available.
+
+        Returns 0.0 on success, otherwise the number of seconds until enough
+        tokens will have accumulated (nothing is consumed in that case).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are available; returns False if `timeout` elapses first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+class _LimiterState:
+    """Mutable limiter state: available tokens, last refill (wall clock), current rate, last decrease."""
+
+    __slots__ = ("tokens", "updated", "rate", "last_decrease")
+
+    def __init__(self, tokens: float, updated: float, rate: float, last_decrease: float = 0.0) -> None:
+        self.tokens = tokens
+        self.updated = updated
+        self.rate = rate
+        self.last_decrease = last_decrease
+
+class LocalStateBackend:
+    """In-process limiter state shared between threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state: Optional[_LimiterState] = None
+
+    @contextmanager
+    def transaction(self, initial: Callable[[], _LimiterState]) -> Iterator[_LimiterState]:
+        with self._lock:
+            if self._state is None:
+                self._state = initial()
+            yield self._state
+
+    def close(self) -> None:
+        pass
+
+class FileStateBackend:
+    """
+    Limiter state stored in a small file and guarded by `flock`, so every
+    process on the host that points at the same path shares one budget.
+    """
+
+    _STRUCT = struct.Struct("<dddd")
+
+    def __init__(self, path: Path) -> None:
+        if fcntl is None:
+            raise RuntimeError("FileStateBackend requires fcntl (POSIX only).")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        # flock is per open file description, so threads also need a local lock
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, initial: Callable[[], _LimiterState]) -> Iterator[_LimiterState]:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(self._fd, self._STRUCT.size, 0)
+                state = _LimiterState(*self._STRUCT.unpack(raw)) if len(raw) == self._STRUCT.size else initial()
+                yield state
+                os.pwrite(
+                    self._fd,
+                    self._STRUCT.pack(state.tokens, state.updated, state.rate, state.last_decrease),
+                    0,
+                )
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class RateLimiter:
+    """
+    Request rate limiter consulted by the API clients before every call.
+
+    Modes:
+    - `token_bucket`: fixed `rate` requests/second with bursts up to `burst`
+    - `aimd`: the rate starts at `rate`, grows additively by `increase_step`
+      requests/second per second of successful traffic up to `max_rate`, and
+      is multiplied by `decrease_factor` (at most once per `decrease_interval`)
+      when the API answers 429/503, down to `min_rate`
+
+    State lives in a backend: `LocalStateBackend` shares it between threads,
+    `FileStateBackend` between processes on the same host.
+    """
+
+    THROTTLE_STATUSES = frozenset({429, 503})
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        mode: str = "token_bucket",
+        min_rate: float = 0.1,
+        max_rate: Optional[float] = None,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        decrease_interval: float = 1.0,
+        backend: Optional[Any] = None,
+    ) -> None:
+        if mode not in {"token_bucket", "aimd"}:
+            raise ValueError(f"Invalid rate limiter mode '{mode}', expected token_bucket or aimd.")
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1.")
+        self.mode = mode
+        self.initial_rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 10
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.backend = backend or LocalStateBackend()
+
+    def _initial(self) -> _LimiterState:
+        return _LimiterState(self.burst, time.time(), self.initial_rate)
+
+    def _refill(self, state: _LimiterState, now: float) -> None:
+        elapsed = now - state.updated
+        if elapsed > 0:
+            state.tokens = min(self.burst, state.tokens + elapsed * state.rate)
+            state.updated = now
+
+    @property
+    def current_rate(self) -> float:
+        with self.backend.transaction(self._initial) as state:
+            return state.rate
+
+    def try_acquire(self) -> float:
+        """Take one token; returns 0.0 on success, else seconds to wait."""
+        with self.backend.transaction(self._initial) as state:
+            now = time.time()
+            self._refill(state, now)
+            if state.tokens >= 1.0:
+                state.tokens -= 1.0
+                return 0.0
+            return (1.0 - state.tokens) / state.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a request may be sent; returns False if `timeout` elapses first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def on_response(self, status: Optional[int]) -> None:
+        """Feed back the outcome of a request (None for network errors)."""
+        if self.mode != "aimd" or status is None:
+            return
+        with self.backend.transaction(self._initial) as state:
+            now = time.time()
+            self._refill(state, now)
+            if status in self.THROTTLE_STATUSES:
+                if now - state.last_decrease >= self.decrease_interval:
+                    state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+                    state.tokens = min(state.tokens, 0.0)
+                    state.last_decrease = now
+            elif status < 400:
+                state.rate = min(self.max_rate, state.rate + self.increase_step / state.rate)
+
+    def close(self) -> None:
+        self.backend.close()
+
+def build_rate_limiter(options: Optional[Dict[str, Any]]) -> Optional[RateLimiter]:
+    """
+    Build a limiter from the `rateLimit` settings block, or None when absent:
+
+    {
+      "mode": "aimd",
+      "ratePerSecond": 5,
+      "burst": 5,
+      "minRate": 0.5,
+      "maxRate": 20,
+      "stateFile": "/tmp/ryanair-scraper.rate"
+    }
+    """
+    if not options:
+        return None
+    state_file = options.get("stateFile")
+    return RateLimiter(
+        rate=float(options.get("ratePerSecond", 1.0)),
+        burst=float(options["burst"]) if options.get("burst") else None,
+        mode=options.get("mode", "token_bucket"),
+        min_rate=float(options.get("minRate", 0.1)),
+        max_rate=float(options["maxRate"]) if options.get("maxRate") else None,
+        increase_step=float(options.get("increaseStep", 0.1)),
+        decrease_factor=float(options.get("decreaseFactor", 0.5)),
+        backend=FileStateBackend(Path(state_file)) if state_file else None,
+    )
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, FrozenSet, Iterable, Optional, Tuple
+
+DEFAULT_RETRY_STATUSES: FrozenSet[int] = frozenset({429, 502, 503, 504})
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker rejects a call."""
+
+class RetryBudget:
+    """
+    Global cap on retries, shared by every worker using the same policy.
+
+    Each first attempt deposits `ratio` tokens and each retry withdraws one, so
+    retries stay below roughly `ratio` of the request volume. A small reserve
+    that refills at `min_per_second` keeps retries possible at low traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 100.0) -> None:
+        if ratio < 0 or min_per_second < 0:
+            raise ValueError("Retry budget ratio and min_per_second must be non-negative.")
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = min(max_tokens, max(1.0, min_per_second))
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, `Retry-After` support and an
+    optional shared `RetryBudget`.
+
+    The delay before retry `n` (1-based) is a random value in
+    `[0, min(max_delay, base_delay * multiplier ** (n - 1))]`; a `Retry-After`
+    header, when present, is used instead (capped at `max_retry_after`).
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        max_retry_after: float = 120.0,
+        budget: Optional[RetryBudget] = None,
+    ) -> None:
+        if max_retries < 0:
+            raise ValueError("max_retries cannot be negative.")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self._random = random.Random()
+
+    def on_request(self) -> None:
+        """Called once per logical request (not per retry)."""
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def can_retry(self, attempt: int) -> bool:
+        """Whether another attempt may follow attempt number `attempt` (1-based)."""
+        if attempt > self.max_retries:
+            return False
+        return self.budget is None or self.budget.try_spend()
+
+    def compute_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        parsed = parse_retry_after(retry_after)
+        if parsed is not None:
+            return min(parsed, self.max_retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        return self._random.uniform(0, ceiling) if self.jitter else ceiling
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `Retry-After` header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        target = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if target is None:
+        return None
+    return max(0.0, target.timestamp() - time.time())
+
+class CircuitBreaker:
+    """
+    Stop calling the endpoint once the recent error rate crosses a threshold.
+
+    Outcomes are tracked over a sliding `window_seconds`. When at least
+    `min_requests` were seen and the failure ratio reaches
+    `error_rate_threshold`, the circuit opens for `reset_timeout` seconds;
+    afterwards a single probe is let through (half-open) and its outcome
+    closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        error_rate_threshold: float = 0.5,
+        min_requests: int = 20,
+        window_seconds: float = 30.0,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe that ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker will let a probe through (0 when closed)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        self._record(True)
+
+    def record_failure(self) -> None:
+        self._record(False)
+
+    def _record(self, ok: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    self._failures = 0
+                else:
+                    self.state = self.OPEN
+                    self._opened_at = now
+                return
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._trim(now)
+            total = len(self._outcomes)
+            if (
+                self.state == self.CLOSED
+                and total >= self.min_requests
+                and self._failures / total >= self.error_rate_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = now
+
+def build_retry_policy(options: Optional[Dict[str, Any]], max_retries: int = 2) -> RetryPolicy:
+    """
+    Build a policy from the `retry` settings block:
+
+    {
+      "maxRetries": 3,
+      "baseDelaySeconds": 0.5,
+      "maxDelaySeconds": 30,
+      "retryStatuses": [429, 502, 503, 504],
+      "budgetRatio": 0.2
+    }
+    """
+    options = options or {}
+    budget_ratio = options.get("budgetRatio")
+    return RetryPolicy(
+        max_retries=int(options.get("maxRetries", max_retries)),
+        base_delay=float(options.get("baseDelaySeconds", 0.5)),
+        max_delay=float(options.get("maxDelaySeconds", 30.0)),
+        retry_statuses=options.get("retryStatuses", DEFAULT_RETRY_STATUSES),
+        budget=RetryBudget(ratio=float(budget_ratio)) if budget_ratio is not None else None,
+    )
+
+def build_circuit_breaker(options: Optional[Dict[str, Any]]) -> Optional[CircuitBreaker]:
+    """Build a breaker from the `circuitBreaker` settings block, or None when absent."""
+    if not options:
+        return None
+    return CircuitBreaker(
+        error_rate_threshold=float(options.get("errorRateThreshold", 0.5)),
+        min_requests=int(options.get("minRequests", 20)),
+        window_seconds=float(options.get("windowSeconds", 30)),
+        reset_timeout=float(options.get("resetTimeoutSeconds", 30)),
+    )
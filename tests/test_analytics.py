@@ -0,0 +1,105 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+np = pytest.importorskip("numpy")
+
+import main  # noqa: E402
+from outputs.analytics import FareFrame, load_fare_frame  # noqa: E402
+from outputs.exporter import export_flights  # noqa: E402
+
+def _flights(count=400, seed=7):
+    rng = random.Random(seed)
+    flights = []
+    for i in range(count):
+        origin, destination = rng.choice([("VIE", "BCN"), ("VIE", "STN"), ("DUB", "BGY")])
+        day = rng.randint(1, 20)
+        flights.append(
+            {
+                "Origin": origin,
+                "Destination": destination,
+                "Flight number": f"FR {i}",
+                "Price": None if i % 37 == 0 else round(rng.uniform(10, 200), 2),
+                "Time departure": f"2024-06-{day:02d}T{rng.randint(0, 23):02d}:00:00.000",
+                "Time arrival": f"2024-06-{day:02d}T23:30:00.000",
+                "key": f"K{i}",
+                "scrapedAt": "2024-05-01T00:00:00+00:00",
+                "regularFare": {"fareClass": rng.choice("ABC"), "fares": []},
+            }
+        )
+    flights.append({"Origin": "VIE", "key": "removed", "change": "removed"})
+    return flights
+
+def _expected_daily(flights):
+    best = {}
+    for f in flights:
+        if f.get("Price") is None or not f.get("Destination"):
+            continue
+        key = (f"{f['Origin']}-{f['Destination']}", f["Time departure"][:10])
+        best[key] = min(best.get(key, float("inf")), f["Price"])
+    return best
+
+def test_daily_min_matches_python_loop():
+    flights = _flights()
+    frame = FareFrame.from_flights(flights)
+    assert len(frame) == 400
+    records = frame.to_records(frame.daily_min())
+    assert {(r["route"], r["date"]): r["price"] for r in records} == _expected_daily(flights)
+    assert records == sorted(records, key=lambda r: (frame.route_names.index(r["route"]), r["date"]))
+
+def test_rolling_percentiles_and_alerts():
+    flights = _flights()
+    frame = FareFrame.from_flights(flights)
+    daily = _expected_daily(flights)
+
+    rolling = frame.to_records(frame.rolling_stats(window=3))
+    for record in rolling:
+        day = int(record["date"][-2:])
+        window = [
+            daily[(record["route"], f"2024-06-{d:02d}")]
+            for d in range(day - 2, day + 1)
+            if (record["route"], f"2024-06-{d:02d}") in daily
+        ]
+        assert record["rolling_min"] == min(window)
+        assert record["rolling_mean"] == pytest.approx(sum(window) / len(window), abs=0.01)
+        assert record["days"] == len(window)
+
+    stats = frame.percentiles((0, 50, 90, 100))
+    for code, p50, p90 in zip(stats["route"], stats["p50"], stats["p90"]):
+        prices = [f["Price"] for f in flights if f.get("Price") is not None and f"{f['Origin']}-{f.get('Destination')}" == frame.route_names[code]]
+        assert p50 == pytest.approx(np.percentile(prices, 50))
+        assert p90 == pytest.approx(np.percentile(prices, 90))
+
+    cheap = frame.to_records(frame.price_alerts(max_price=20))
+    assert cheap and all(r["price"] <= 20 for r in cheap)
+    drops = frame.to_records(frame.price_alerts(drop_pct=30, window=3))
+    assert drops and all(r["drop_pct"] >= 30 for r in drops)
+    with pytest.raises(ValueError):
+        frame.price_alerts()
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "csv", "columnar"])
+def test_load_fare_frame_from_exports(tmp_path, fmt):
+    flights = _flights(120)
+    path = tmp_path / f"out.{fmt}"
+    export_flights(flights, path, fmt, compression="gzip" if fmt == "columnar" else None)
+    frame = load_fare_frame(path)
+    expected = FareFrame.from_flights(flights)
+    assert frame.to_records(frame.daily_min()) == expected.to_records(expected.daily_min())
+    assert set(frame.to_records(frame.select_route("VIE-BCN").daily_min())[0]["route"].split("-")) == {"VIE", "BCN"}
+
+def test_analyze_cli(tmp_path, capsys):
+    path = tmp_path / "out.json"
+    export_flights(_flights(), path, "json")
+    main.main(["analyze", "--file", str(path), "--report", "percentiles", "--route", "vie-bcn"])
+    rows = json.loads(capsys.readouterr().out)
+    assert [row["route"] for row in rows] == ["VIE-BCN"]
+    assert set(rows[0]) == {"route", "flights", "p10", "p50", "p90"}
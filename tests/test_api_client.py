@@ -0,0 +1,322 @@
+import gzip
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.api_client import (  # noqa: E402
+    REQUEST_SECONDS,
+    RETRIES,
+    RyanairApiClient,
+    build_search_params,
+    plan_flex_windows,
+)
+from flights import revalidation  # noqa: E402
+from flights.revalidation import BYTES_SAVED, NOT_MODIFIED, ValidatorStore, parse_response  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from utils.proxy_manager import ProxyPool  # noqa: E402
+from utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, parse_retry_after  # noqa: E402
+
+def _query(**overrides):
+    data = {
+        "origin": "VIE",
+        "destination": "BCN",
+        "dateFrom": "2021-05-01",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+    }
+    data.update(overrides)
+    return FlightSearchQuery.from_dict(data)
+
+def test_plan_flex_windows_covers_range_with_fewest_calls():
+    windows = plan_flex_windows(_query(dateFromEnd="2021-05-30"))
+
+    assert len(windows) == 5
+    assert [(w.date_from, w.flex_days_out) for w in windows] == [
+        ("2021-05-01", 6),
+        ("2021-05-08", 6),
+        ("2021-05-15", 6),
+        ("2021-05-22", 6),
+        ("2021-05-29", 1),
+    ]
+    params = build_search_params(windows[0])
+    assert params["DateOut"] == "2021-05-01"
+    assert params["FlexDaysOut"] == 6
+
+def test_plan_flex_windows_single_date_unchanged():
+    query = _query()
+    assert plan_flex_windows(query) == [query]
+    assert build_search_params(query)["FlexDaysOut"] == 0
+
+@pytest.fixture
+def scripted_server():
+    """Local HTTP server answering with a scripted list of (status, headers) replies."""
+    script = []
+    seen = []
+    peers = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # noqa: N802
+            seen.append(self.path)
+            peers.add(self.client_address)
+            status, headers = script.pop(0) if script else (200, {})
+            body = json.dumps({"trips": []}).encode("utf-8") if status == 200 else b"{}"
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/availability", script, seen, peers
+    server.shutdown()
+    server.server_close()
+
+def test_client_retries_retryable_statuses(scripted_server):
+    url, script, seen, _ = scripted_server
+    script.extend([(503, {}), (429, {"Retry-After": "0"})])
+    policy = RetryPolicy(max_retries=2, base_delay=0.01)
+    retried_503 = RETRIES.value(reason=503)
+
+    with RyanairApiClient(url, retry_policy=policy) as client:
+        assert client.search_flights(_query()) == {"trips": []}
+    assert len(seen) == 3
+    assert RETRIES.value(reason=503) == retried_503 + 1
+    assert REQUEST_SECONDS.count(proxy="direct", status=429) >= 1
+
+def test_client_does_not_retry_client_errors(scripted_server):
+    url, script, seen, _ = scripted_server
+    script.append((400, {}))
+
+    with RyanairApiClient(url, retry_policy=RetryPolicy(max_retries=3, base_delay=0.01)) as client:
+        with pytest.raises(RuntimeError, match="responded with an error"):
+            client.search_flights(_query())
+    assert len(seen) == 1
+
+def test_circuit_breaker_opens_and_fails_fast(scripted_server):
+    url, script, seen, _ = scripted_server
+    script.extend([(503, {})] * 4)
+    breaker = CircuitBreaker(error_rate_threshold=0.5, min_requests=2, reset_timeout=60)
+
+    with RyanairApiClient(url, retry_policy=RetryPolicy(max_retries=0), circuit_breaker=breaker) as client:
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                client.search_flights(_query())
+        with pytest.raises(CircuitOpenError):
+            client.search_flights(_query())
+    assert len(seen) == 2
+
+def test_half_open_probe_failing_with_other_errors_is_recorded():
+    class BrokenSession:
+        def get(self, *args, **kwargs):
+            raise requests.exceptions.ChunkedEncodingError("connection broken mid-body")
+
+    breaker = CircuitBreaker(error_rate_threshold=0.5, min_requests=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    client = RyanairApiClient("http://test", session=BrokenSession(), circuit_breaker=breaker)
+    for _ in range(2):
+        # each call is a fresh half-open probe, never a stuck CircuitOpenError
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            client.search_flights(_query())
+        assert breaker.state == CircuitBreaker.OPEN
+
+def test_backoff_delay_bounds():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False)
+    assert [policy.compute_delay(n) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+    assert policy.compute_delay(1, retry_after="7") == 7.0
+    assert 0 <= RetryPolicy(base_delay=1.0).compute_delay(3) <= 4.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+@pytest.fixture
+def etag_server():
+    """Server with gzip bodies and ETags; `state["version"]` changes the payload."""
+    state = {"version": 1, "statuses": [], "headers": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # noqa: N802
+            state["headers"].append(dict(self.headers))
+            etag = f'"v{state["version"]}"'
+            if self.headers.get("If-None-Match") == etag:
+                state["statuses"].append(304)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body = json.dumps({"trips": [], "version": state["version"], "pad": "x" * 2000}).encode("utf-8")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body)
+                self.send_response(200)
+                self.send_header("Content-Encoding", "gzip")
+            else:
+                self.send_response(200)
+            state["statuses"].append(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/availability", state
+    server.shutdown()
+    server.server_close()
+
+def test_conditional_requests_reuse_decoded_payload(etag_server):
+    url, state = etag_server
+    store = ValidatorStore()
+    saved_304 = BYTES_SAVED.value(route="VIE-BCN", reason="not_modified")
+    saved_gzip = BYTES_SAVED.value(route="VIE-BCN", reason="compression")
+    not_modified = NOT_MODIFIED.value(route="VIE-BCN")
+
+    with RyanairApiClient(url, validator_store=store, json_decoder=json.loads) as client:
+        first = client.search_flights(_query())
+        second = client.search_flights(_query())
+        assert second is first  # 304: the previously decoded payload, not re-decoded
+        state["version"] = 2
+        third = client.search_flights(_query())
+        assert third["version"] == 2
+        client.search_flights(_query(dateFrom="2021-05-02"))  # different request, no validators yet
+
+    assert state["statuses"] == [200, 304, 200, 200]
+    assert "If-None-Match" not in state["headers"][0] and state["headers"][1]["If-None-Match"] == '"v1"'
+    assert "If-None-Match" not in state["headers"][3]
+    assert "gzip" in state["headers"][0]["Accept-Encoding"]
+
+    summary = store.summary()
+    assert summary["notModified"] == 1
+    received = summary["routes"]["VIE-BCN"]["bytesReceived"]
+    assert 0 < received < 3 * 2000  # three gzipped bodies
+    assert summary["routes"]["VIE-BCN"]["bytesSaved"] > 0
+    assert NOT_MODIFIED.value(route="VIE-BCN") == not_modified + 1
+    assert BYTES_SAVED.value(route="VIE-BCN", reason="not_modified") > saved_304
+    assert BYTES_SAVED.value(route="VIE-BCN", reason="compression") > saved_gzip
+
+def test_compression_can_be_disabled_and_evicted_validators_refetch(etag_server):
+    url, state = etag_server
+    store = ValidatorStore(max_entries=1)
+    with RyanairApiClient(url, compression=False, validator_store=store, json_decoder=json.loads) as client:
+        client.search_flights(_query())
+        client.search_flights(_query(dateFrom="2021-05-02"))  # evicts the first entry
+        assert client.search_flights(_query())["version"] == 1
+    assert state["statuses"] == [200, 200, 200]
+    assert state["headers"][0]["Accept-Encoding"] == "identity"
+    assert len(store) == 1
+
+def test_304_reuses_parsed_flights(etag_server, monkeypatch):
+    url, state = etag_server
+    parsed = []
+    parse = revalidation.parse_availability_response
+    monkeypatch.setattr(revalidation, "parse_availability_response", lambda *a, **kw: parsed.append(1) or parse(*a, **kw))
+    with RyanairApiClient(url, validator_store=ValidatorStore(), json_decoder=json.loads) as client:
+        first = parse_response(client, client.search_flights(_query()))
+        second = parse_response(client, client.search_flights(_query()))
+        assert parse_response(client, client.search_flights(_query()), max_items=1) == []
+    assert state["statuses"] == [200, 304, 304]
+    assert first == second == []
+    assert len(parsed) == 2  # once per (max_items, date_range), not once per 304
+
+    store = ValidatorStore()
+    flight = {"flightNumber": "FR 1", "timeUTC": ["2021-05-01T06:00:00.000Z", "2021-05-01T08:00:00.000Z"]}
+    payload = {"trips": [{"origin": "VIE", "destination": "BCN", "dates": [{"dateOut": "2021-05-01", "flights": [flight]}]}]}
+    store.store("k", "VIE-BCN", {"ETag": '"v1"'}, payload, 100)
+    once, again = store.parse(payload), store.parse(payload)
+    assert len(parsed) == 3
+    assert [dict(f, scrapedAt=None) for f in again] == [dict(f, scrapedAt=None) for f in once]
+    assert again[0] is not once[0]
+    assert store.parse(dict(payload)) and len(parsed) == 4  # not the stored object
+
+def test_evicted_validators_are_refetched_without_a_retry(etag_server):
+    url, state = etag_server
+
+    class EvictingStore(ValidatorStore):
+        def revalidated(self, key, route):
+            return None  # the entry was evicted between the request and its 304
+
+    class CountingLimiter:
+        acquired = 0
+
+        def acquire(self):
+            CountingLimiter.acquired += 1
+
+        def on_response(self, status):
+            pass
+
+    with RyanairApiClient(
+        url, max_retries=0, validator_store=EvictingStore(), rate_limiter=CountingLimiter(), json_decoder=json.loads
+    ) as client:
+        client.search_flights(_query())
+        assert client.search_flights(_query())["version"] == 1
+    assert state["statuses"] == [200, 304, 200]
+    assert "If-None-Match" not in state["headers"][2]
+    assert CountingLimiter.acquired == 2
+
+def test_attempt_fails_when_no_proxy_frees_up_in_time(scripted_server):
+    url, script, seen, _ = scripted_server
+    pool = ProxyPool(["http://127.0.0.1:9"], cooldown_seconds=600)
+    pool.report("http://127.0.0.1:9", status=403)
+    policy = RetryPolicy(max_retries=1, base_delay=0.01)
+
+    with RyanairApiClient(url, timeout=0.05, proxy_pool=pool, retry_policy=policy) as client:
+        with pytest.raises(RuntimeError, match="after 2 attempts: No proxy"):
+            client.search_flights(_query())
+    assert seen == []
+
+def test_one_pooled_session_serves_every_query_and_retry(scripted_server):
+    url, script, seen, peers = scripted_server
+    script.append((503, {}))
+    policy = RetryPolicy(max_retries=1, base_delay=0.01)
+
+    with RyanairApiClient(url, retry_policy=policy, pool_connections=3, pool_maxsize=7, pool_block=True) as client:
+        session = client.session
+        adapter = session.get_adapter(url)
+        assert adapter is session.get_adapter("https://example.test/")
+        assert (adapter._pool_connections, adapter._pool_maxsize, adapter._pool_block) == (3, 7, True)
+        for day in ("2021-05-01", "2021-05-02"):
+            client.search_flights(_query(dateFrom=day))
+        assert client.session is session
+
+    assert len(seen) == 3  # two queries, one retry
+    assert len(peers) == 1  # all over the same keep-alive connection
+    assert not adapter.poolmanager.pools  # closed with the client that built it
+
+def test_close_only_closes_a_session_the_client_built(monkeypatch):
+    class Session(requests.Session):
+        def close(self):
+            self.closed = True
+            super().close()
+
+    injected = Session()
+    with RyanairApiClient("http://test", session=injected) as client:
+        assert client.session is injected
+    assert not getattr(injected, "closed", False)
+
+    monkeypatch.setattr(requests, "Session", Session)
+    with RyanairApiClient("http://test") as client:
+        owned = client.session
+    assert owned is not injected and owned.closed
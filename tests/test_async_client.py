@@ -0,0 +1,199 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.api_client import AsyncRyanairApiClient  # noqa: E402
+from flights.batch import run_batch_async  # noqa: E402
+from flights.revalidation import ValidatorStore  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from utils.rate_limiter import FileStateBackend, RateLimiter  # noqa: E402
+from utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy  # noqa: E402
+
+def _payload(origin, destination, day):
+    return {
+        "trips": [
+            {
+                "origin": origin,
+                "destination": destination,
+                "dates": [
+                    {
+                        "dateOut": f"{day}T00:00:00.000",
+                        "flights": [
+                            {
+                                "flightNumber": "FR 1000",
+                                "timeUTC": [f"{day}T06:00:00.000Z", f"{day}T08:30:00.000Z"],
+                                "duration": "02:30",
+                                "regularFare": {"fareClass": "W", "fares": [{"type": "ADT", "amount": 19.5}]},
+                            }
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+@pytest.fixture
+def stub_server():
+    """Availability stub: scripted statuses first, then 200s; destination BAD always fails."""
+    state = {"script": [], "seen": [], "active": 0, "peak": 0, "delay": 0.0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # noqa: N802
+            params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            with lock:
+                state["seen"].append((params, dict(self.headers)))
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                status = state["script"].pop(0) if state["script"] else 200
+            time.sleep(state["delay"])
+            if params.get("Destination") == "BAD":
+                status = 503
+            etag = '"v1"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+            elif status == 200:
+                body = json.dumps(_payload(params["Origin"], params["Destination"], params["DateOut"])).encode("utf-8")
+            else:
+                body = b"{}"
+            with lock:
+                state["active"] -= 1
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/availability", state
+    server.shutdown()
+    server.server_close()
+
+def _input(destination="BCN", day="2030-06-01"):
+    return {"origin": "VIE", "destination": destination, "dateFrom": day, "tripType": "ONE_WAY", "adults": 1}
+
+def test_async_client_retries_and_revalidates(stub_server):
+    url, state = stub_server
+    state["script"].extend([503, 429])
+    store = ValidatorStore()
+
+    async def scenario():
+        async with AsyncRyanairApiClient(
+            url, retry_policy=RetryPolicy(max_retries=2, base_delay=0.01), validator_store=store
+        ) as client:
+            first = await client.search_flights(FlightSearchQuery.from_dict(_input()))
+            second = await client.search_flights(FlightSearchQuery.from_dict(_input()))
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["trips"][0]["destination"] == "BCN"
+    assert second is first  # 304 hands back the stored payload
+    assert len(state["seen"]) == 4
+    assert state["seen"][3][1]["If-None-Match"] == '"v1"'
+    assert store.summary()["notModified"] == 1
+
+def test_async_client_opens_the_circuit_after_failures(stub_server):
+    url, state = stub_server
+    breaker = CircuitBreaker(min_requests=2, reset_timeout=60)
+    policy = RetryPolicy(max_retries=1, base_delay=0.01)
+
+    async def scenario():
+        async with AsyncRyanairApiClient(url, retry_policy=policy, circuit_breaker=breaker) as client:
+            with pytest.raises(RuntimeError, match="503"):
+                await client.search_flights(FlightSearchQuery.from_dict(_input("BAD")))
+            with pytest.raises(CircuitOpenError):
+                await client.search_flights(FlightSearchQuery.from_dict(_input()))
+
+    asyncio.run(scenario())
+    assert len(state["seen"]) == 2
+
+def test_run_batch_async_isolates_failures_and_bounds_concurrency(stub_server):
+    url, state = stub_server
+    state["delay"] = 0.05
+    inputs = [_input("BAD" if n == 2 else "BCN", f"2030-06-{n + 1:02d}") for n in range(6)]
+
+    async def scenario():
+        async with AsyncRyanairApiClient(url, max_retries=0) as client:
+            return [result async for result in run_batch_async(client, inputs, max_concurrency=2)]
+
+    results = asyncio.run(scenario())
+    assert sorted(r.index for r in results) == list(range(6))
+    assert [r.index for r in results if not r.ok] == [2]
+    assert sum(r.flight_count for r in results) == 5
+    assert len({r.correlation_id for r in results}) == 6
+    assert state["peak"] == 2
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_batch_async(None, inputs, max_concurrency=0).__anext__())
+
+def test_run_batch_async_cancels_in_flight_searches_when_closed_early(stub_server):
+    url, state = stub_server
+    state["delay"] = 0.3
+    cancelled = []
+
+    class Client:
+        def __init__(self, inner):
+            self.inner = inner
+
+        async def search_flights(self, query):
+            try:
+                if query.destination == "BCN":
+                    return {"trips": []}
+                return await self.inner.search_flights(query)
+            except asyncio.CancelledError:
+                cancelled.append(query.destination)
+                raise
+
+    async def scenario():
+        async with AsyncRyanairApiClient(url, max_retries=0) as inner:
+            batch = run_batch_async(Client(inner), [_input("BCN"), _input("STN"), _input("BGY")], max_concurrency=3)
+            first = await batch.__anext__()
+            await batch.aclose()
+            others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            return first, others
+
+    first, others = asyncio.run(scenario())
+    assert first.index == 0 and first.ok
+    assert sorted(cancelled) == ["BGY", "STN"]
+    assert others == []
+
+def test_async_client_runs_file_backed_limiter_off_the_event_loop(stub_server, tmp_path):
+    url, state = stub_server
+    threads = []
+
+    class Backend(FileStateBackend):
+        def transaction(self, initial):
+            threads.append(threading.current_thread())
+            return super().transaction(initial)
+
+    limiter = RateLimiter(rate=100, mode="aimd", backend=Backend(tmp_path / "rate.state"))
+
+    async def scenario():
+        async with AsyncRyanairApiClient(url, rate_limiter=limiter, owns_rate_limiter=True) as client:
+            await client.search_flights(FlightSearchQuery.from_dict(_input()))
+
+    asyncio.run(scenario())
+    assert len(threads) == 2  # the token and the aimd feedback
+    assert threading.main_thread() not in threads
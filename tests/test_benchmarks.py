@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+# Ensure src/ and benchmarks/ are on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT / "src", ROOT / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import bench_exporters  # noqa: E402
+import run_benchmarks  # noqa: E402
+from mock_server import MockAvailabilityServer  # noqa: E402
+
+def test_one_iteration_of_every_suite_writes_a_report(tmp_path: Path, capsys):
+    output = tmp_path / "report.json"
+    args = "--requests 4 --workers 2 --searches 1 --rows 20 --formats json jsonl --parse-seconds 0.01"
+    args += " --latency-ms 0 --jitter-ms 0 --flex-days 0 --flights-per-day 2"
+    run_benchmarks.main(args.split() + ["--output", str(output)])
+    report = json.loads(output.read_text(encoding="utf-8"))
+    results = report["results"]
+
+    assert {"createdAt", "python", "platform", "config"} <= set(report)
+    assert set(results) == {"client", "parser", "exporter", "e2e"}
+    assert results["client"]["searches"] == results["client"]["upstreamRequests"] == 4
+    assert results["client"]["failedSearches"] == 0
+    assert results["parser"]["json"]["iterations"] >= 1
+    assert set(results["exporter"]) == {"json", "jsonl"}
+    assert results["exporter"]["json"]["rows"] == 20
+    assert results["e2e"]["completed"] == 1 and results["e2e"]["rows"] == 2
+    assert {"p50Ms", "p99Ms", "maxMs"} <= set(results["client"])
+    assert run_benchmarks.compare(report, report, tolerance=0.2) == []
+    assert "results written to" in capsys.readouterr().out
+
+def test_mock_server_answers_and_counts_requests():
+    with MockAvailabilityServer(flights_per_day=3, etags=True) as server:
+        status, headers, body = server.respond({"Origin": ["VIE"], "Destination": ["BCN"], "DateOut": ["2030-01-01"]})
+        assert status == 200
+        flights = json.loads(body)["trips"][0]["dates"][0]["flights"]
+        assert len(flights) == 3
+        status, _, body = server.respond(
+            {"Origin": ["VIE"], "Destination": ["BCN"], "DateOut": ["2030-01-01"]}, {"If-None-Match": headers["ETag"]}
+        )
+        assert (status, body) == (304, b"")
+        assert server.counts["requests"] == 2 and server.counts["not_modified"] == 1
+
+def test_exporter_benchmark_reports_each_format():
+    results = bench_exporters.bench(10, ["jsonl", "csv"], [None, "gzip"])
+    assert [(r["format"], r["compression"]) for r in results] == [
+        ("jsonl", None),
+        ("jsonl", "gzip"),
+        ("csv", None),
+        ("csv", "gzip"),
+    ]
+    assert all(r["rows"] == 10 and r["bytes"] > 0 for r in results)
@@ -0,0 +1,132 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.cache import (  # noqa: E402
+    CACHE_REQUESTS,
+    CachingClient,
+    MemoryResponseCache,
+    SqliteResponseCache,
+    _BaseResponseCache,
+    build_response_cache,
+)
+from flights.validator import FlightSearchQuery  # noqa: E402
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _query(destination="BCN", **overrides):
+    data = {"origin": "VIE", "destination": destination, "dateFrom": "2030-06-01", "tripType": "ONE_WAY"}
+    data.update(overrides)
+    return FlightSearchQuery.from_dict(data)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def _make(**kwargs):
+        if request.param == "memory":
+            return MemoryResponseCache(**kwargs)
+        return SqliteResponseCache(tmp_path / "cache.sqlite", **kwargs)
+
+    return _make
+
+def test_entries_expire_after_ttl_with_route_overrides(make_cache):
+    clock = FakeClock()
+    cache = make_cache(ttl_seconds=300, route_ttls={"vie-stn": 60}, clock=clock)
+    cache.set(_query(), {"trips": ["bcn"]})
+    cache.set(_query("STN"), {"trips": ["stn"]})
+
+    clock.now += 61
+    assert cache.get(_query()) == {"trips": ["bcn"]}
+    assert cache.get(_query("STN")) is None
+    clock.now += 240
+    assert cache.get(_query()) is None
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 2, "expired": 2, "evictions": 0}
+    cache.close()
+
+def test_least_recently_used_entry_is_evicted_at_max_entries(make_cache):
+    clock = FakeClock()
+    cache = make_cache(max_entries=2, clock=clock)
+    for destination in ("BCN", "STN"):
+        cache.set(_query(destination), {"to": destination})
+        clock.now += 1
+    assert cache.get(_query("BCN")) is not None  # STN is now the oldest
+    clock.now += 1
+    cache.set(_query("BGY"), {"to": "BGY"})
+
+    assert len(cache) == 2
+    assert cache.get(_query("STN")) is None
+    assert cache.get(_query("BCN")) is not None and cache.get(_query("BGY")) is not None
+    assert cache.stats.evictions == 1
+    cache.close()
+
+def test_max_bytes_counts_encoded_bytes(make_cache):
+    clock = FakeClock()
+    # {"c":"üüüüüüüüüüx"} is 19 characters, but 29 bytes in UTF-8
+    response = {"c": "ü" * 10 + "x"}
+    size = 29
+    cache = make_cache(max_bytes=2 * size - 1, clock=clock)
+    cache.set(_query("BCN"), response)
+    clock.now += 1
+    cache.set(_query("STN"), response)
+
+    assert len(cache) == 1
+    assert cache.get(_query("BCN")) is None and cache.get(_query("STN")) == response
+
+    too_big = make_cache(max_bytes=size - 1, clock=clock)
+    too_big.set(_query("BGY"), response)
+    assert too_big.get(_query("BGY")) is None
+    too_big.close()
+    cache.close()
+
+def test_sqlite_entries_survive_reopen(tmp_path):
+    clock = FakeClock()
+    cache = build_response_cache({"ttlSeconds": 60, "sqlitePath": str(tmp_path / "c.sqlite")})
+    assert isinstance(cache, SqliteResponseCache)
+    cache.set(_query(), {"trips": []})
+    cache.close()
+
+    reopened = SqliteResponseCache(tmp_path / "c.sqlite", ttl_seconds=60)
+    assert reopened.get(_query(locale="de-de")) == {"trips": []}  # locale is not part of the key
+    reopened.close()
+
+    expired = SqliteResponseCache(tmp_path / "c.sqlite", ttl_seconds=60, clock=clock)
+    clock.now = 1e12
+    assert expired.get(_query()) is None
+    expired.close()
+
+def test_caching_client_counts_hits_and_misses():
+    class Client:
+        calls = 0
+
+        def search_flights(self, query):
+            Client.calls += 1
+            return {"trips": [], "call": Client.calls}
+
+    hits, misses = CACHE_REQUESTS.value(result="hit"), CACHE_REQUESTS.value(result="miss")
+    client = CachingClient(Client(), MemoryResponseCache(ttl_seconds=60))
+    assert client.search_flights(_query()) == client.search_flights(_query()) == {"trips": [], "call": 1}
+    client.search_flights(_query("STN"))
+
+    assert Client.calls == 2
+    assert client.cache.stats.as_dict()["hits"] == 1
+    assert CACHE_REQUESTS.value(result="hit") == hits + 1
+    assert CACHE_REQUESTS.value(result="miss") == misses + 2
+
+def test_backends_validate_bounds_and_base_is_abstract():
+    with pytest.raises(TypeError):
+        _BaseResponseCache()
+    with pytest.raises(ValueError):
+        MemoryResponseCache(ttl_seconds=0)
+    with pytest.raises(ValueError):
+        MemoryResponseCache(max_bytes=0)
@@ -0,0 +1,159 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.api_client import build_search_params  # noqa: E402
+from flights.coalesce import AsyncCoalescingClient, CoalescingClient, rewrite_passenger_counts  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+
+from test_integration import DummyClient  # noqa: E402
+
+def _query(**overrides):
+    data = {
+        "origin": "VIE",
+        "destination": "BCN",
+        "dateFrom": "2024-05-02",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+        "currency": "EUR",
+    }
+    data.update(overrides)
+    return FlightSearchQuery.from_dict(data)
+
+class SlowClient(DummyClient):
+    def __init__(self, fail: bool = False) -> None:
+        super().__init__("https://example.test", 5, None, None)
+        self.fail = fail
+        self.calls = []
+        self.release = threading.Event()
+
+    def search_flights(self, query):
+        self.calls.append(query)
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("Ryanair API responded with an error")
+        return super().search_flights(query)
+
+def _run_concurrently(client, queries):
+    results = [None] * len(queries)
+
+    def _worker(index, query):
+        try:
+            results[index] = client.search_flights(query)
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=_worker, args=item) for item in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    # wait until every query has either started a call or joined one
+    while client.stats.calls + client.stats.coalesced + client.stats.passenger_coalesced < len(queries):
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    client.client.release.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_identical_queries_share_one_call():
+    client = CoalescingClient(SlowClient())
+    results = _run_concurrently(client, [_query(), _query(locale="de-de"), _query()])
+
+    assert len(client.client.calls) == 1
+    assert results[0] is results[1] is results[2]
+    assert client.stats.as_dict()["coalesced"] == 2
+
+def test_smaller_party_reuses_larger_party_call():
+    client = CoalescingClient(SlowClient(), coalesce_passengers=True)
+    larger, smaller = _run_concurrently(client, [_query(adults=3), _query(adults=2)])
+
+    assert len(client.client.calls) == 1
+    assert client.stats.passenger_coalesced == 1
+    fare = smaller["trips"][0]["dates"][0]["flights"][0]["regularFare"]["fares"][0]
+    assert fare["count"] == 2 and fare["amount"] == 19.79
+    assert larger["trips"][0]["dates"][0]["flights"][0]["regularFare"]["fares"][0]["count"] == 3
+
+def test_followers_receive_the_leader_error():
+    client = CoalescingClient(SlowClient(fail=True))
+    results = _run_concurrently(client, [_query(), _query()])
+
+    assert len(client.client.calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client._inflight == {}
+
+def test_rewrite_refuses_tight_inventory():
+    response = {
+        "trips": [
+            {
+                "dates": [
+                    {
+                        "flights": [
+                            {
+                                "faresLeft": 2,
+                                "regularFare": {"fares": [{"type": "ADT", "amount": 10.0, "count": 3}]},
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
+    assert rewrite_passenger_counts(response, (3, 0, 0, 0), (1, 0, 0, 0)) is None
+
+    response["trips"][0]["dates"][0]["flights"][0]["faresLeft"] = -1
+    rewritten = rewrite_passenger_counts(response, (3, 0, 0, 0), (1, 0, 0, 0))
+    assert rewritten["trips"][0]["dates"][0]["flights"][0]["regularFare"]["fares"][0]["count"] == 1
+    # the original payload is left untouched
+    assert response["trips"][0]["dates"][0]["flights"][0]["regularFare"]["fares"][0]["count"] == 3
+
+def test_async_queries_share_one_call():
+    class AsyncSlowClient(DummyClient):
+        calls = 0
+
+        async def search_flights(self, query):
+            AsyncSlowClient.calls += 1
+            await asyncio.sleep(0.01)
+            return DummyClient.search_flights(self, query)
+
+    async def _main():
+        client = AsyncCoalescingClient(AsyncSlowClient("https://example.test", 5, None, None))
+        results = await asyncio.gather(*(client.search_flights(_query()) for _ in range(5)))
+        await client.close()
+        return results
+
+    results = asyncio.run(_main())
+    assert AsyncSlowClient.calls == 1
+    assert all(result is results[0] for result in results)
+
+@pytest.mark.parametrize("other", [_query(adults=1, children=1), _query(dateFrom="2024-05-03")])
+def test_incompatible_queries_are_not_merged(other):
+    client = CoalescingClient(SlowClient())
+    _run_concurrently(client, [_query(adults=2), other])
+    assert len(client.client.calls) == 2
+
+def test_passenger_coalescing_is_opt_in():
+    client = CoalescingClient(SlowClient())
+    _run_concurrently(client, [_query(adults=3), _query(adults=2)])
+    assert len(client.client.calls) == 2
+    assert client.stats.passenger_coalesced == 0
+
+def test_key_uses_the_wrapped_client_params():
+    class LocaleClient(SlowClient):
+        def _build_params(self, query):
+            return dict(build_search_params(query), Locale=query.locale)
+
+    client = CoalescingClient(LocaleClient())
+    _run_concurrently(client, [_query(), _query(locale="de-de"), _query()])
+    assert sorted(query.locale for query in client.client.calls) == ["de-de", "en-gb"]
+    assert client.stats.coalesced == 1
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from outputs.exporter import (  # noqa: E402
+    EXPORTERS,
+    FlightWriter,
+    export_flights,
+    export_to_json,
+    read_columnar,
+)
+
+def _flights(n=3, origin="VIE"):
+    with (ROOT / "data" / "sample_output.json").open("r", encoding="utf-8") as f:
+        template = json.load(f)[0]
+    flights = []
+    for i in range(n):
+        flight = json.loads(json.dumps(template))
+        flight["Origin"] = origin
+        flight["Price"] = 10.0 + i
+        flight["key"] = f"{origin}-{i}"
+        flights.append(flight)
+    return flights
+
+def test_export_to_json_matches_pretty_dump(tmp_path: Path):
+    flights = _flights()
+    path = tmp_path / "out.json"
+
+    assert export_to_json(iter(flights), path) == 3
+    assert path.read_text(encoding="utf-8") == json.dumps(flights, ensure_ascii=False, indent=2)
+
+def test_json_append_extends_existing_array(tmp_path: Path):
+    path = tmp_path / "out.json"
+    export_to_json([], path)
+    export_flights(_flights(2), path, "json", append=True)
+    export_flights(_flights(1, origin="STN"), path, "json", append=True)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert [f["Origin"] for f in data] == ["VIE", "VIE", "STN"]
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_json_append_rejects_compression(tmp_path: Path, compression):
+    path = tmp_path / "out.json.gz"
+    with pytest.raises(ValueError, match="jsonl"):
+        export_flights(_flights(1), path, "json", append=True, compression=compression)
+    assert not path.exists()
+
+def test_writer_base_is_abstract(tmp_path: Path):
+    class Incomplete(FlightWriter):
+        def open(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(tmp_path / "out")
+
+def test_jsonl_gzip_append(tmp_path: Path):
+    path = tmp_path / "out.jsonl.gz"
+    export_flights(_flights(2), path, "jsonl", compression="gzip")
+    export_flights(_flights(1, origin="STN"), path, "jsonl", append=True, compression="gzip")
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["Origin"] for r in rows] == ["VIE", "VIE", "STN"]
+
+def test_csv_append_writes_header_once(tmp_path: Path):
+    path = tmp_path / "out.csv"
+    export_flights(_flights(2), path, "csv")
+    export_flights(_flights(1, origin="STN"), path, "csv", append=True)
+
+    with path.open("r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["Origin"] for r in rows] == ["VIE", "VIE", "STN"]
+    assert rows[0]["fareClass"] == "W"
+    assert rows[0]["Price"] == "10.0"
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_columnar_round_trip(tmp_path: Path, compression):
+    path = tmp_path / "out.rfc"
+    flights = _flights(3)
+    flights[1]["Price"] = None
+    export_flights(flights, path, "columnar", compression=compression)
+    export_flights(_flights(1, origin="STN"), path, "columnar", append=True, compression=compression)
+
+    columns = read_columnar(path)
+    assert columns["Origin"] == ["VIE", "VIE", "VIE", "STN"]
+    assert columns["Price"] == [10.0, None, 12.0, 10.0]
+    assert columns["Time departure"][0] == 1619974500
+    assert columns["hasDiscount"][0] is True
+
+def test_unknown_format_lists_registered_exporters(tmp_path: Path):
+    assert {"json", "jsonl", "csv", "columnar", "parquet"} <= set(EXPORTERS)
+    with pytest.raises(ValueError, match="Unknown output format"):
+        export_flights([], tmp_path / "out", "xml")
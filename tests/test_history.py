@@ -0,0 +1,103 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+import main  # noqa: E402
+from outputs.exporter import export_flights  # noqa: E402
+from outputs.history import FareHistoryStore  # noqa: E402
+
+def _flight(origin, destination, departure, price, key, scraped_at):
+    return {
+        "Origin": origin,
+        "Destination": destination,
+        "Flight number": "FR " + key,
+        "Price": price,
+        "Time departure": departure,
+        "Time arrival": departure,
+        "key": key,
+        "scrapedAt": scraped_at,
+        "regularFare": {"fareClass": "A", "fares": [{"amount": price}]},
+    }
+
+def _seed(store):
+    store.add_all(
+        [
+            _flight("VIE", "BCN", "2024-06-01T06:00:00.000Z", 49.99, "K1", "2024-05-01T00:00:00+00:00"),
+            _flight("VIE", "BCN", "2024-06-01T06:00:00.000Z", 39.99, "K1", "2024-05-02T00:00:00+00:00"),
+            _flight("VIE", "BCN", "2024-06-03T06:00:00.000Z", 29.99, "K2", "2024-05-02T00:00:00+00:00"),
+            _flight("VIE", "STN", "2024-06-02T08:00:00.000Z", 19.99, "K3", "2024-05-02T00:00:00+00:00"),
+            {"Origin": "VIE", "key": "K9", "change": "removed"},
+        ]
+    )
+
+def test_store_batches_and_answers_queries(tmp_path):
+    with FareHistoryStore(tmp_path / "history.db", batch_size=2) as store:
+        _seed(store)
+        assert store.skipped == 1
+        assert store.inserted == 4  # two full batches flushed before any query
+        assert len(store) == 4
+
+        cheapest = store.cheapest("VIE", "BCN", limit=2)
+        assert [row["price"] for row in cheapest] == [29.99, 39.99]
+        assert cheapest[0]["departureDate"] == "2024-06-03"
+        assert store.cheapest("VIE", "BCN", date_to="2024-06-01")[0]["price"] == 39.99
+        assert [row["price"] for row in store.cheapest("VIE", "BCN", since="2024-05-02")] == [29.99, 39.99]
+
+        history = store.price_history(flight_key="K1")
+        assert [row["price"] for row in history] == [49.99, 39.99]
+        route_history = store.price_history("VIE", "BCN", departure_date="2024-06-01")
+        assert [(row["minPrice"], row["flights"]) for row in route_history] == [(49.99, 1), (39.99, 1)]
+        with pytest.raises(ValueError):
+            store.price_history(origin="VIE")
+
+def test_route_summary_matches_with_and_without_since(tmp_path):
+    path = tmp_path / "history.db"
+    with FareHistoryStore(path, batch_size=3) as store:
+        _seed(store)
+    with FareHistoryStore(path) as store:
+        _seed(store)  # aggregates accumulate across sessions
+        summary = {(row["origin"], row["destination"]): row for row in store.route_summary()}
+        assert summary[("VIE", "BCN")]["observations"] == 6
+        assert summary[("VIE", "BCN")]["minPrice"] == 29.99
+        assert summary[("VIE", "BCN")]["maxPrice"] == 49.99
+        assert summary[("VIE", "BCN")]["avgPrice"] == pytest.approx((49.99 + 39.99 + 29.99) / 3)
+
+        scanned = store.route_summary("VIE", "BCN", since="2024-01-01")
+        assert len(scanned) == 1
+        assert scanned[0]["observations"] == 6
+        assert scanned[0]["avgPrice"] == pytest.approx(summary[("VIE", "BCN")]["avgPrice"])
+        assert store.route_summary(since="2024-05-02")[0]["observations"] == 4
+
+def test_sqlite_exporter_appends_to_history(tmp_path):
+    path = tmp_path / "fares.db"
+    flights = [_flight("VIE", "BCN", "2024-06-01T06:00:00.000Z", 49.99, "K1", "2024-05-01T00:00:00+00:00")]
+    assert export_flights(flights, path, "sqlite") == 1
+    export_flights(flights, path, "sqlite")
+    with FareHistoryStore(path) as store:
+        assert len(store) == 2
+    with pytest.raises(ValueError):
+        export_flights(flights, path, "sqlite", compression="gzip")
+
+def test_cli_queries_history(tmp_path, capsys):
+    path = tmp_path / "history.db"
+    with FareHistoryStore(path) as store:
+        _seed(store)
+
+    main.main(["cheapest", "--db", str(path), "--origin", "VIE", "--destination", "BCN", "--limit", "1"])
+    rows = json.loads(capsys.readouterr().out)
+    assert [row["key"] for row in rows] == ["K2"]
+
+    main.main(["route-summary", "--db", str(path)])
+    rows = json.loads(capsys.readouterr().out)
+    assert {(row["origin"], row["destination"]) for row in rows} == {("VIE", "BCN"), ("VIE", "STN")}
+
+    with pytest.raises(SystemExit):
+        main.main(["price-history", "--db", str(tmp_path / "missing.db"), "--key", "K1"])
@@ -1,5 +1,8 @@
+import asyncio
 import json
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Any, Dict
 
@@ -11,7 +14,7 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from main import run_search  # noqa: E402
+from main import run_batch_search, run_search, run_search_async  # noqa: E402
 
 class DummyClient:
     def __init__(self, base_url: str, timeout: int, proxies, logger) -> None:  # noqa: D401
@@ -92,4 +95,152 @@ def test_run_search_end_to_end(tmp_path: Path):
     assert len(data) == 1
     assert data[0]["Origin"] == "VIE"
     assert data[0]["Destination"] == "BCN"
-    assert flights[0]["Flight number"] == "FR 7350"
\ No newline at end of file
+    assert flights[0]["Flight number"] == "FR 7350"
+
+class FlakyClient(DummyClient):
+    def search_flights(self, query) -> Dict[str, Any]:  # noqa: D401
+        if query.destination == "XXX":
+            raise RuntimeError("route not served")
+        return super().search_flights(query)
+
+def test_run_batch_search_isolates_failures(tmp_path: Path):
+    base = {
+        "origin": "VIE",
+        "dateFrom": "2021-05-02",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+    }
+    search_inputs = [
+        dict(base, destination="BCN"),
+        dict(base, destination="XXX"),
+        dict(base, destination="BC"),
+        dict(base, destination="STN"),
+    ]
+
+    output_path = tmp_path / "batch.json"
+    results = run_batch_search(
+        search_inputs,
+        {"baseUrl": "https://example.test/availability"},
+        output_path,
+        client_cls=FlakyClient,
+        max_workers=2,
+    )
+
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert "route not served" in results[1].error
+    assert "IATA" in results[2].error
+
+    with output_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    # flights are streamed in completion order
+    assert sorted(flight["Destination"] for flight in data) == ["BCN", "STN"]
+    assert [r.flight_count for r in results] == [1, 0, 0, 1]
+
+class ConcurrencyTrackingClient(DummyClient):
+    lock = threading.Lock()
+    active = peak = 0
+
+    def search_flights(self, query) -> Dict[str, Any]:  # noqa: D401
+        cls = ConcurrencyTrackingClient
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.active -= 1
+        return super().search_flights(query)
+
+@pytest.mark.parametrize("setting, cap", [("maxInFlight", 2), ("maxConnectionsPerHost", 1)])
+def test_run_batch_search_caps_requests_in_flight(tmp_path: Path, setting, cap):
+    ConcurrencyTrackingClient.peak = 0
+    base = {"origin": "VIE", "destination": "BCN", "tripType": "ONE_WAY", "adults": 1}
+    search_inputs = [dict(base, dateFrom=f"2021-05-{day:02d}") for day in range(1, 9)]
+    results = run_batch_search(
+        search_inputs,
+        {"baseUrl": "https://example.test/availability", setting: cap},
+        tmp_path / "batch.json",
+        client_cls=ConcurrencyTrackingClient,
+        max_workers=4,
+    )
+    assert all(r.ok for r in results)
+    assert ConcurrencyTrackingClient.peak == cap
+
+class AsyncDummyClient(DummyClient):
+    async def search_flights(self, query) -> Dict[str, Any]:  # noqa: D401
+        return DummyClient.search_flights(self, query)
+
+def test_run_search_async_end_to_end(tmp_path: Path):
+    search_input = {
+        "origin": "VIE",
+        "destination": "BCN",
+        "dateFrom": "2021-05-02",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+    }
+    output_path = tmp_path / "flights.json"
+
+    flights = asyncio.run(
+        run_search_async(search_input, {}, output_path, client_cls=AsyncDummyClient)
+    )
+
+    assert output_path.is_file()
+    assert len(flights) == 1
+    assert flights[0]["Origin"] == "VIE"
+
+class CountingClient(DummyClient):
+    calls = 0
+
+    def search_flights(self, query) -> Dict[str, Any]:  # noqa: D401
+        CountingClient.calls += 1
+        return super().search_flights(query)
+
+def test_run_batch_search_uses_response_cache(tmp_path: Path):
+    CountingClient.calls = 0
+    search_input = {
+        "origin": "VIE",
+        "destination": "BCN",
+        "dateFrom": "2021-05-02",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+    }
+    settings = {"cache": {"ttlSeconds": 60, "sqlitePath": str(tmp_path / "cache.sqlite")}}
+
+    results = run_batch_search(
+        [search_input, dict(search_input, locale="de-de"), dict(search_input, maxItems=1)],
+        settings,
+        tmp_path / "batch.json",
+        client_cls=CountingClient,
+        max_workers=1,
+    )
+    assert all(r.ok for r in results)
+    assert CountingClient.calls == 1
+
+    # a fresh process-level client reuses the on-disk entry
+    run_search(search_input, settings, tmp_path / "single.json", client_cls=CountingClient)
+    assert CountingClient.calls == 1
+
+class AsyncCountingClient(DummyClient):
+    calls = 0
+
+    async def search_flights(self, query) -> Dict[str, Any]:  # noqa: D401
+        AsyncCountingClient.calls += 1
+        return DummyClient.search_flights(self, query)
+
+def test_run_search_async_uses_response_cache(tmp_path: Path):
+    AsyncCountingClient.calls = 0
+    search_input = {
+        "origin": "VIE",
+        "destination": "BCN",
+        "dateFrom": "2021-05-02",
+        "tripType": "ONE_WAY",
+        "adults": 1,
+    }
+    settings = {"cache": {"ttlSeconds": 60, "sqlitePath": str(tmp_path / "cache.sqlite")}}
+
+    for _ in range(2):
+        flights = asyncio.run(
+            run_search_async(search_input, settings, tmp_path / "flights.json", client_cls=AsyncCountingClient)
+        )
+        assert len(flights) == 1
+    assert AsyncCountingClient.calls == 1
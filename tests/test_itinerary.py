@@ -0,0 +1,125 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.api_client import build_search_params  # noqa: E402
+from flights.itinerary import ItinerarySearch, RouteGraph  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from main import run_itinerary_search  # noqa: E402
+
+def _flight(origin, destination, departure, arrival, price, number):
+    return {
+        "Origin": origin,
+        "Destination": destination,
+        "Flight number": number,
+        "Price": price,
+        "Time departure": departure,
+        "Time arrival": arrival,
+        "key": f"{number}~{departure}",
+    }
+
+# VIE -> BCN direct at 120; via STN (cheap but a 30 minute connection at 11:00)
+# or via BGY (valid 2h connection).
+FLIGHTS = [
+    _flight("VIE", "BCN", "2024-06-01T09:00:00.000", "2024-06-01T11:30:00.000", 120.0, "FR1"),
+    _flight("VIE", "STN", "2024-06-01T08:00:00.000", "2024-06-01T10:30:00.000", 20.0, "FR2"),
+    _flight("STN", "BCN", "2024-06-01T11:00:00.000", "2024-06-01T14:00:00.000", 20.0, "FR3"),
+    _flight("STN", "BCN", "2024-06-01T15:00:00.000", "2024-06-01T18:00:00.000", 45.0, "FR4"),
+    _flight("VIE", "BGY", "2024-06-01T07:00:00.000", "2024-06-01T08:30:00.000", 30.0, "FR5"),
+    _flight("BGY", "BCN", "2024-06-01T10:30:00.000", "2024-06-01T12:15:00.000", 25.0, "FR6"),
+    _flight("BGY", "VIE", "2024-06-01T10:30:00.000", "2024-06-01T12:00:00.000", 1.0, "FR7"),
+]
+
+def test_cheapest_itineraries_respect_connection_times():
+    graph = RouteGraph()
+    assert graph.add_flights(FLIGHTS) == len(FLIGHTS)
+    assert graph.add_flight(FLIGHTS[0]) is False  # duplicate
+
+    itineraries = graph.cheapest_itineraries("VIE", "BCN", min_connection_minutes=60, limit=5)
+    assert [(it.price, it.via) for it in itineraries] == [(55.0, ["BGY"]), (65.0, ["STN"]), (120.0, [])]
+    assert itineraries[1].legs[1].flight["Flight number"] == "FR4"
+
+    relaxed = graph.cheapest_itineraries("VIE", "BCN", min_connection_minutes=30, limit=1)
+    assert [leg.flight["Flight number"] for leg in relaxed[0].legs] == ["FR2", "FR3"]
+
+    direct_only = graph.cheapest_itineraries("VIE", "BCN", max_legs=1)
+    assert [it.price for it in direct_only] == [120.0]
+
+    row = itineraries[0].to_dict()
+    assert row["Stops"] == 1 and row["Via"] == ["BGY"] and row["Duration minutes"] == 315
+
+class HubClient:
+    """Serves FLIGHTS by route and records the (origin, destination) pairs searched."""
+
+    def __init__(self, base_url="https://example.test/availability", timeout=5, proxies=None, logger=None, delay=0.0):
+        self.base_url = base_url
+        self.delay = delay
+        self.calls: List[Tuple[str, str]] = []
+        self.lock = threading.Lock()
+
+    def search_flights(self, query) -> Dict[str, Any]:
+        with self.lock:
+            self.calls.append((query.origin, query.destination))
+        time.sleep(self.delay)
+        flights = [
+            {
+                "flightNumber": f["Flight number"],
+                "timeUTC": [f["Time departure"], f["Time arrival"]],
+                "regularFare": {"fareClass": "A", "fares": [{"type": "ADT", "amount": f["Price"], "count": 1}]},
+                "key": f["key"],
+            }
+            for f in FLIGHTS
+            if (f["Origin"], f["Destination"]) == (query.origin, query.destination)
+        ]
+        dates = [{"dateOut": "2024-06-01T00:00:00.000", "flights": flights}] if flights else []
+        return {"trips": [{"origin": query.origin, "destination": query.destination, "dates": dates}]}
+
+SEARCH = {
+    "origin": "VIE",
+    "destination": "BCN",
+    "dateFrom": "2024-06-01",
+    "tripType": "ONE_WAY",
+    "adults": 1,
+    "hubs": ["STN", "BGY", "DUB", "STN"],
+    "minConnectionMinutes": 60,
+}
+
+def test_hub_search_fetches_each_leg_once_in_parallel():
+    hubs = ["STN", "BGY"] + ["H" + a + b for a in "ABCDE" for b in "ABCDEF"]
+    client = HubClient(delay=0.05)
+    engine = ItinerarySearch(client, hubs=hubs, min_connection_minutes=60, max_workers=16)
+    started = time.perf_counter()
+    itineraries = engine.search(dict(SEARCH))
+    elapsed = time.perf_counter() - started
+
+    assert [it.via for it in itineraries][:2] == [["BGY"], ["STN"]]
+    assert len(client.calls) == len(set(client.calls))
+    # round 1: origin -> every hub + direct; round 2: only hubs with flights -> destination
+    assert set(client.calls) >= {("VIE", "BCN"), ("STN", "BCN"), ("BGY", "BCN")}
+    assert ("HAA", "BCN") not in set(client.calls)
+    assert engine.stats.leg_queries == len(client.calls)
+    assert elapsed < 0.05 * len(client.calls) / 2
+
+def test_round_trip_bad_hub_and_connecting_option():
+    with pytest.raises(ValueError):
+        ItinerarySearch(HubClient(), hubs=["ST1"])
+    with pytest.raises(ValueError):
+        ItinerarySearch(HubClient(), hubs=["STN"]).search(dict(SEARCH, tripType="ROUND_TRIP", dateTo="2024-06-05"))
+    query = FlightSearchQuery.from_dict(dict(SEARCH, includeConnectingFlights=True))
+    assert build_search_params(query)["IncludeConnectingFlights"] == "true"
+
+def test_run_itinerary_search_exports_rows(tmp_path: Path):
+    settings = {"baseUrl": "https://example.test/availability", "timeoutSeconds": 5}
+    rows = run_itinerary_search(dict(SEARCH), settings, tmp_path / "out.json", client_cls=HubClient)
+    assert [row["Price"] for row in rows] == [55.0, 65.0, 120.0]
+    assert (tmp_path / "out.json").is_file()
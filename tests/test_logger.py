@@ -0,0 +1,119 @@
+import json
+import logging
+import sys
+import threading
+from pathlib import Path
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from utils.logger import (  # noqa: E402
+    CorrelationIdFilter,
+    JsonFormatter,
+    RateLimitFilter,
+    _TextFormatter,
+    configure_logging,
+    correlation_scope,
+    shutdown_logging,
+)
+
+def _record(msg, *args, level=logging.WARNING, **extra):
+    record = logging.makeLogRecord(
+        {"name": "ryanair_scraper", "levelno": level, "levelname": logging.getLevelName(level), "msg": msg, "args": args}
+    )
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_includes_correlation_id_and_extra_fields():
+    record = _record("Refreshed %s", "VIE-BCN", route="VIE-BCN")
+    with correlation_scope("abc123"):
+        CorrelationIdFilter().filter(record)
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "Refreshed VIE-BCN"
+    assert payload["correlationId"] == "abc123"
+    assert payload["route"] == "VIE-BCN"
+    assert payload["level"] == "WARNING"
+
+def test_correlation_ids_are_per_thread():
+    seen = {}
+
+    def _worker(name):
+        with correlation_scope(name):
+            record = _record("x")
+            CorrelationIdFilter().filter(record)
+            seen[name] = record.correlation_id
+
+    threads = [threading.Thread(target=_worker, args=(f"q{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {f"q{i}": f"q{i}" for i in range(4)}
+
+def test_rate_limit_filter_suppresses_repeats_and_reports_count():
+    limiter = RateLimitFilter(rate_per_second=0.001, burst=2)
+    template = "Network error while calling Ryanair API (attempt %d/%d): %s"
+    passed = [limiter.filter(_record(template, i, 3, "timeout")) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+
+    # other messages have their own budget; other levels, INFO included, are never dropped
+    assert limiter.filter(_record("Proxy %s on cooldown", "p1"))
+    assert all(limiter.filter(_record(template, 1, 3, "x", level=logging.ERROR)) for _ in range(5))
+    assert all(limiter.filter(_record("Refreshed %s", "VIE-BCN", level=logging.INFO)) for _ in range(5))
+
+    limiter._buckets[("ryanair_scraper", template)]._tokens = 1.0
+    record = _record(template, 9, 3, "timeout")
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+    assert record.getMessage() == "Network error while calling Ryanair API (attempt 9/3): timeout"
+    assert _TextFormatter().format(record).endswith("(+3 similar suppressed)")
+
+def test_rate_limit_filter_tracks_a_bounded_number_of_groups():
+    limiter = RateLimitFilter(rate_per_second=0.001, burst=1, max_groups=2)
+    for n in range(10):
+        assert limiter.filter(_record(f"message {n}"))
+    assert len(limiter._buckets) == 2
+    assert not limiter.filter(_record("message 9"))
+
+def test_queue_logging_writes_json_off_thread(capsys):
+    logger = configure_logging(name="test_queue_logger", structured=True, use_queue=True)
+    try:
+        with correlation_scope("cid-1"):
+            logger.info("Completed search: %d flights", 3)
+    finally:
+        shutdown_logging("test_queue_logger")
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines == [
+        {
+            "ts": lines[0]["ts"],
+            "level": "INFO",
+            "logger": "test_queue_logger",
+            "message": "Completed search: 3 flights",
+            "correlationId": "cid-1",
+        }
+    ]
+
+def test_queue_logging_keeps_exceptions_out_of_the_json_message(capsys):
+    logger = configure_logging(name="test_queue_exc_logger", structured=True, use_queue=True)
+    try:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("Failed to fetch %s", "VIE-BCN")
+    finally:
+        shutdown_logging("test_queue_exc_logger")
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+    (line,) = capsys.readouterr().out.splitlines()
+    payload = json.loads(line)
+    assert payload["message"] == "Failed to fetch VIE-BCN"
+    assert payload["level"] == "ERROR"
+    assert payload["exception"].startswith("Traceback") and "RuntimeError: boom" in payload["exception"]
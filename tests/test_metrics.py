@@ -0,0 +1,71 @@
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.parser import ROWS_PARSED, parse_availability_response  # noqa: E402
+from outputs.exporter import BYTES_WRITTEN, ROWS_EXPORTED, export_flights  # noqa: E402
+from utils.metrics import REGISTRY, MetricsRegistry, MetricsServer  # noqa: E402
+
+from test_parser import _sample_response  # noqa: E402
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Requests.", ("status",))
+    latency = registry.histogram("demo_seconds", "Latency.", buckets=(0.1, 1.0))
+    requests.inc(status=200)
+    requests.inc(2, status='5"03')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{status="200"} 1' in text
+    assert 'demo_requests_total{status="5\\"03"} 2' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+    assert "demo_seconds_sum 5.55" in text
+
+    assert registry.counter("demo_requests_total", "Requests.", ("status",)) is requests
+    with pytest.raises(ValueError):
+        registry.histogram("demo_requests_total", "Clash.")
+    with pytest.raises(ValueError):
+        requests.inc(code=200)
+
+def test_metrics_file_dump_and_http_endpoint(tmp_path: Path):
+    registry = MetricsRegistry()
+    registry.gauge("demo_routes", "Watched routes.").set(3)
+
+    registry.write_to(tmp_path / "metrics.prom")
+    assert "demo_routes 3" in (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+
+    server = MetricsServer(registry, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert "demo_routes 3" in resp.read().decode("utf-8")
+    finally:
+        server.stop()
+
+def test_parse_and_export_are_instrumented(tmp_path: Path):
+    rows_before = ROWS_PARSED.value()
+    exported_before = ROWS_EXPORTED.value(format="jsonl")
+    bytes_before = BYTES_WRITTEN.value(format="jsonl")
+
+    flights = parse_availability_response(_sample_response())
+    export_flights(flights, tmp_path / "out.jsonl", "jsonl")
+
+    assert ROWS_PARSED.value() == rows_before + 1
+    assert ROWS_EXPORTED.value(format="jsonl") == exported_before + 1
+    assert BYTES_WRITTEN.value(format="jsonl") - bytes_before == (tmp_path / "out.jsonl").stat().st_size
+    assert "ryanair_parse_seconds_count" in REGISTRY.render()
@@ -1,3 +1,4 @@
+import json
 import sys
 from pathlib import Path
 
@@ -7,7 +8,14 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from flights.parser import parse_availability_response  # noqa: E402
+from flights.parser import (  # noqa: E402
+    Flight,
+    iter_availability,
+    iter_flights,
+    merge_availability_responses,
+    parse_availability_by_date,
+    parse_availability_response,
+)
 
 def _sample_response():
     return {
@@ -64,4 +72,133 @@ def test_parse_availability_response_basic():
     assert flight["Time arrival"] == "2021-05-02T19:15:00.000"
     assert flight["regularFare"]["fareClass"] == "W"
     assert flight["operatedBy"] == "Buzz"
-    assert "scrapedAt" in flight
\ No newline at end of file
+    assert "scrapedAt" in flight
+
+def _day_block(day, flight_number):
+    return {
+        "dateOut": f"{day}T00:00:00.000",
+        "flights": [
+            {
+                "flightNumber": flight_number,
+                "timeUTC": [f"{day}T16:55:00.000", f"{day}T19:15:00.000"],
+                "duration": "02:20",
+                "regularFare": {"fareClass": "W", "fares": [{"type": "ADT", "amount": 10.0}]},
+                "key": f"{flight_number}~{day}",
+            }
+        ],
+    }
+
+def test_merge_and_split_flex_window_responses():
+    first = {"trips": [{"origin": "VIE", "destination": "BCN", "dates": [
+        _day_block("2021-05-01", "FR 1"), _day_block("2021-05-02", "FR 2")]}]}
+    second = {"trips": [{"origin": "VIE", "destination": "BCN", "dates": [
+        _day_block("2021-05-02", "FR 2"), _day_block("2021-05-03", "FR 3"),
+        {"dateOut": "2021-05-04T00:00:00.000", "flights": []}]}]}
+
+    merged = merge_availability_responses([first, second])
+    assert [d["dateOut"][:10] for d in merged["trips"][0]["dates"]] == [
+        "2021-05-01", "2021-05-02", "2021-05-03", "2021-05-04"]
+
+    flights = parse_availability_response(merged, date_range=("2021-05-02", "2021-05-03"))
+    assert [f["Flight number"] for f in flights] == ["FR 2", "FR 3"]
+
+    by_date = parse_availability_by_date(merged, date_range=("2021-05-02", "2021-05-04"))
+    assert list(by_date) == ["2021-05-02", "2021-05-03", "2021-05-04"]
+    assert by_date["2021-05-04"] == []
+    assert by_date["2021-05-03"][0]["Flight number"] == "FR 3"
+
+def test_iter_availability_is_lazy_and_stops_at_max_items():
+    response = {"trips": [{"origin": "VIE", "destination": "BCN", "dates": [
+        _day_block("2021-05-01", "FR 1"), _day_block("2021-05-02", "FR 2"),
+        _day_block("2021-05-03", "FR 3")]}]}
+
+    flights = iter_availability(response, max_items=2)
+    assert not isinstance(flights, list)
+    assert next(flights)["Flight number"] == "FR 1"
+    assert [f["Flight number"] for f in flights] == ["FR 2"]
+
+def test_iter_flights_compact_record_round_trips_to_dict():
+    response = _sample_response()
+    record = next(iter_flights(response))
+
+    assert isinstance(record, Flight)
+    assert not hasattr(record, "__dict__")
+    assert record.price == 19.79
+    assert record.fare_class == "W"
+    assert record.has_discount is True
+    assert record.departure == 1619974500
+
+    expected = parse_availability_response(response)[0]
+    expected["scrapedAt"] = record.scraped_at
+    assert record.to_dict() == expected
+
+def test_compact_record_round_trips_real_shaped_payload():
+    fare = {
+        "type": "ADT",
+        "amount": 24.99,
+        "count": 1,
+        "hasDiscount": False,
+        "publishedFare": 24.99,
+        "discountInPercent": 0,
+        "hasPromoDiscount": False,
+        "discountAmount": 0.0,
+        "hasBogof": False,
+    }
+    response = {
+        "trips": [
+            {
+                "origin": "VIE",
+                "destination": "STN",
+                "dates": [
+                    {
+                        "dateOut": "2021-05-02T00:00:00.000",
+                        "flights": [
+                            {
+                                "faresLeft": 4,
+                                "flightKey": "FR~1234~ ~~VIE~05/02/2021 16:55~STN~05/02/2021 18:10~~",
+                                "flightNumber": "FR 1234",
+                                "timeUTC": ["2021-05-02T16:55:00.000Z", "2021-05-02T18:10:00.000Z"],
+                                "duration": "02:15",
+                                "regularFare": {"fareKey": "ABCD1234", "fareClass": "Q", "fares": [fare]},
+                                "operatedBy": "",
+                                "key": "FR~1234~ ~~VIE~05/02/2021 16:55~STN~05/02/2021 18:10~~",
+                            }
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+    record = next(iter_flights(response))
+    expected = parse_availability_response(response)[0]
+    expected["scrapedAt"] = record.scraped_at
+
+    assert record.to_dict() == expected
+    assert record.to_dict()["Time departure"] == "2021-05-02T16:55:00.000Z"
+    assert record.to_dict()["regularFare"]["fareKey"] == "ABCD1234"
+    assert record.to_dict()["regularFare"]["fares"][0]["publishedFare"] == 24.99
+    assert json.dumps(record.to_dict()["regularFare"]) == json.dumps(expected["regularFare"])
+
+def test_compact_record_holds_only_scalars():
+    child = {"type": "CHD", "amount": 19.99, "count": 1, "hasDiscount": False}
+    response = _sample_response()
+    flight = response["trips"][0]["dates"][0]["flights"][0]
+    flight["regularFare"]["fares"].append(child)
+    flight["timeUTC"] = ["not a timestamp", "2021-05-02T19:15:00.000"]
+    record = next(iter_flights(response))
+
+    def _scalars_only(value):
+        if isinstance(value, tuple):
+            return all(_scalars_only(item) for item in value)
+        return not isinstance(value, (dict, list, set))
+
+    assert all(_scalars_only(getattr(record, name)) for name in Flight.__slots__)
+
+    expected = parse_availability_response(response)[0]
+    expected["scrapedAt"] = record.scraped_at
+    assert record.to_dict() == expected
+    assert record.to_dict()["Time departure"] == "not a timestamp"
+    assert record.to_dict()["regularFare"]["fares"][1] == child
+
+    response["trips"][0]["dates"][0]["flights"][0]["regularFare"] = None
+    assert next(iter_flights(response)).to_dict()["regularFare"] is None
@@ -0,0 +1,127 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.parser import ROWS_PARSED, parse_availability_response  # noqa: E402
+from flights.pipeline import ScrapePipeline  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from main import run_pipeline_search  # noqa: E402
+from outputs.exporter import encode_items, export_flights, open_exporter  # noqa: E402
+
+def _payload(origin, destination, day, flights=3):
+    return {
+        "trips": [
+            {
+                "origin": origin,
+                "destination": destination,
+                "dates": [
+                    {
+                        "dateOut": f"{day}T00:00:00.000",
+                        "flights": [
+                            {
+                                "flightNumber": f"FR {1000 + n}",
+                                "timeUTC": [f"{day}T{6 + n:02d}:00:00.000Z", f"{day}T{8 + n:02d}:30:00.000Z"],
+                                "duration": "02:30",
+                                "regularFare": {"fareClass": "W", "fares": [{"type": "ADT", "amount": 19.5 + n}]},
+                                "key": f"FR~{1000 + n}~{origin}~{destination}~{day}",
+                            }
+                            for n in range(flights)
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+class RawClient:
+    """Returns undecoded bodies, as a client built with `raw_body` does; BAD routes fail."""
+
+    def __init__(self, base_url="http://test", timeout=10, proxies=None, logger=None, **options):
+        self.base_url = base_url
+        self.options = options
+        self.calls = 0
+
+    def fetch_windows(self, query):
+        self.calls += 1
+        if query.destination == "BAD":
+            raise RuntimeError("HTTP 503")
+        return [json.dumps(_payload(query.origin, query.destination, query.date_from)).encode("utf-8")]
+
+def _inputs(count):
+    return [
+        {"origin": "VIE", "destination": "BAD" if n == 3 else "BCN", "dateFrom": f"2030-06-{n + 1:02d}", "tripType": "ONE_WAY"}
+        for n in range(count)
+    ]
+
+def _without_scraped_at(lines):
+    return sorted(json.dumps({k: v for k, v in json.loads(line).items() if k != "scrapedAt"}) for line in lines)
+
+def _expected_lines(inputs):
+    lines = []
+    for search_input in inputs:
+        if search_input["destination"] == "BAD":
+            continue
+        query = FlightSearchQuery.from_dict(search_input)
+        for flight in parse_availability_response(_payload(query.origin, query.destination, query.date_from)):
+            lines.append(encode_items("jsonl", [flight]))
+    return _without_scraped_at(lines)
+
+@pytest.mark.parametrize("slot_bytes", [1 << 20, 64])
+def test_pipeline_writes_every_flight_once(tmp_path, slot_bytes):
+    # 64-byte slots force every response through a dedicated overflow segment
+    inputs = _inputs(12)
+    output = tmp_path / "flights.jsonl"
+    with open_exporter(output, "jsonl") as writer:
+        pipeline = ScrapePipeline(
+            RawClient(), writer, encode_items, fetch_workers=3, process_workers=2, slots=2, slot_bytes=slot_bytes
+        )
+        results = list(pipeline.run(inputs))
+
+    assert sorted(r.index for r in results) == list(range(12))
+    failed = [r for r in results if not r.ok]
+    assert [r.index for r in failed] == [3] and "503" in failed[0].error
+    assert sum(r.flight_count for r in results) == writer.count == 33
+
+    lines = output.read_text(encoding="utf-8").splitlines(keepends=True)
+    assert _without_scraped_at(lines) == _expected_lines(inputs)
+
+    summary = pipeline.summary()
+    assert [summary[stage]["items"] for stage in ("fetch", "process", "write")] == [11, 11, 11]
+    assert summary["process"]["bytes"] > 0 and summary["write"]["itemsPerSecond"] > 0
+
+def test_encode_items_matches_writer_output(tmp_path):
+    flights = parse_availability_response(_payload("VIE", "BCN", "2030-06-01"))
+    export_flights(flights[:1], tmp_path / "a.json", "json")
+    with open_exporter(tmp_path / "b.json", "json") as writer:
+        writer.write_encoded(encode_items("json", flights[:1]), 1)
+        writer.write_encoded(encode_items("json", flights[1:]), len(flights) - 1)
+    export_flights(flights, tmp_path / "c.json", "json")
+    assert (tmp_path / "b.json").read_text() == (tmp_path / "c.json").read_text()
+    assert json.loads((tmp_path / "a.json").read_text()) == json.loads(json.dumps(flights[:1]))
+
+def test_run_pipeline_search_uses_raw_client(tmp_path):
+    output = tmp_path / "out.json"
+    settings = {"pipeline": {"processWorkers": 2, "slots": 2}, "outputFormat": "json"}
+    rows_before = ROWS_PARSED.value()
+    results = run_pipeline_search(_inputs(5), settings, output, client_cls=RawClient)
+
+    assert [r.ok for r in results] == [True, True, True, False, True]
+    assert len(json.loads(output.read_text(encoding="utf-8"))) == 12
+    # parsed in worker processes, recorded in this one
+    assert ROWS_PARSED.value() == rows_before + 12
+
+    # invalid configs are rejected before the existing output is truncated
+    existing = output.read_text(encoding="utf-8")
+    with pytest.raises(ValueError):
+        run_pipeline_search(_inputs(1), dict(settings, outputFormat="csv"), output, client_cls=RawClient)
+    with pytest.raises(ValueError):
+        run_pipeline_search(_inputs(1), dict(settings, historyPath=str(tmp_path / "h.db")), output, client_cls=RawClient)
+    assert output.read_text(encoding="utf-8") == existing
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+import main  # noqa: E402
+from utils.rate_limiter import FileStateBackend, RateLimiter  # noqa: E402
+
+def test_token_bucket_mode_limits_bursts():
+    limiter = RateLimiter(rate=1, burst=2)
+
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() == 0.0
+    assert 0 < limiter.try_acquire() <= 1.0
+
+def test_aimd_mode_backs_off_on_429_and_recovers():
+    limiter = RateLimiter(rate=4, mode="aimd", min_rate=1, max_rate=8, increase_step=1.0)
+
+    limiter.on_response(429)
+    assert limiter.current_rate == 2.0
+    limiter.on_response(429)  # within decrease_interval: ignored
+    assert limiter.current_rate == 2.0
+
+    for _ in range(10):
+        limiter.on_response(200)
+    assert 2.0 < limiter.current_rate <= 8.0
+
+def test_file_backend_shares_budget_between_limiters(tmp_path: Path):
+    state_file = tmp_path / "rate.state"
+    first = RateLimiter(rate=0.5, burst=2, backend=FileStateBackend(state_file))
+    second = RateLimiter(rate=0.5, burst=2, backend=FileStateBackend(state_file))
+    try:
+        assert first.try_acquire() == 0.0
+        assert second.try_acquire() == 0.0
+        assert first.try_acquire() > 0
+        assert second.try_acquire() > 0
+    finally:
+        first.close()
+        second.close()
+
+def test_client_closes_the_limiter_it_was_built_with(tmp_path: Path):
+    settings = {"rateLimit": {"ratePerSecond": 5, "stateFile": str(tmp_path / "rate.state")}}
+    client = main._build_client(settings, logger=None)
+    backend = client.rate_limiter.backend  # forwarded through the coalescing wrapper
+    assert backend._fd >= 0
+    main._close_client(client)
+    assert backend._fd == -1
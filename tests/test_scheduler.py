@@ -0,0 +1,154 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.scheduler import RefreshPolicy, RouteScheduler, WatchedRoute, cap_cache_ttls, load_watchlist  # noqa: E402
+from flights.watchlist import WatchlistError  # noqa: E402
+from main import run_scheduler  # noqa: E402
+
+from test_integration import DummyClient  # noqa: E402
+
+def _route(date_from, **extra):
+    return dict(
+        {
+            "origin": "VIE",
+            "destination": "BCN",
+            "dateFrom": date_from,
+            "dateTo": date_from,
+            "tripType": "ONE_WAY",
+            "adults": 1,
+            "currency": "EUR",
+        },
+        **extra,
+    )
+
+def test_refresh_policy_tiers_and_volatility():
+    policy = RefreshPolicy()
+    today = date(2024, 1, 1)
+    soon, later = load_watchlist([_route("2024-01-02"), _route("2024-06-01")])
+
+    assert policy.interval_for(soon, today) == 15 * 60
+    assert policy.interval_for(later, today) == 24 * 60 * 60
+
+    later.volatility = 1.0
+    assert policy.interval_for(later, today) == 6 * 60 * 60
+
+def test_scheduler_orders_by_deadline_and_retires_expired_routes():
+    now = [1000.0]
+    client = DummyClient("https://example.test", 5, None, None)
+    watchlist = {
+        "defaults": {"tripType": "ONE_WAY", "adults": 1, "currency": "EUR"},
+        "routes": [
+            dict(_route("2024-01-10"), refreshSeconds=300),
+            dict(_route("2024-01-02"), refreshSeconds=60, priority=-1),
+            dict(_route("2023-12-01"), priority=-2),
+        ],
+    }
+    seen = []
+    scheduler = RouteScheduler(
+        client,
+        load_watchlist(watchlist),
+        max_workers=1,
+        on_result=lambda route, flights: seen.append((route.query.date_from, len(flights))),
+        clock=lambda: now[0],
+        today=lambda: date(2024, 1, 1),
+    )
+
+    assert scheduler.run(max_refreshes=2) == 2
+    # the expired route is dropped, the higher-priority route goes first
+    assert [route.query.date_from for route in scheduler.routes] == ["2024-01-10", "2024-01-02"]
+    assert seen == [("2024-01-02", 1), ("2024-01-10", 1)]
+    # the next deadlines follow each route's own interval
+    assert sorted(deadline for deadline, *_ in scheduler._queue) == [1060.0, 1300.0]
+
+def test_watched_route_tracks_volatility():
+    route = WatchedRoute(query=load_watchlist([_route("2024-01-02")])[0].query)
+    route.observe([{"key": "a", "Price": 10.0}, {"key": "b", "Price": 20.0}])
+    assert route.volatility == 0.0
+    route.observe([{"key": "a", "Price": 12.0}, {"key": "b", "Price": 20.0}])
+    assert 0.0 < route.volatility < 1.0
+
+def test_run_scheduler_appends_results(tmp_path: Path):
+    output_path = tmp_path / "watch.jsonl"
+    settings = {"baseUrl": "https://example.test", "timeoutSeconds": 5, "outputFormat": "jsonl"}
+
+    scheduler = run_scheduler([_route("2099-01-02"), _route("2099-02-02")], settings, output_path, DummyClient, max_refreshes=2)
+
+    lines = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) == 2
+    assert all(route.refreshes == 1 for route in scheduler.routes)
+
+def test_priority_orders_routes_due_together():
+    now = [1000.0]
+    client = DummyClient("https://example.test", 5, None, None)
+    routes = load_watchlist([_route("2024-01-10"), _route("2024-01-11", priority=-1)])
+    seen = []
+    scheduler = RouteScheduler(
+        client,
+        [],
+        max_workers=1,
+        on_result=lambda route, flights: seen.append(route.query.date_from),
+        clock=lambda: now[0],
+        today=lambda: date(2024, 1, 1),
+    )
+    # the priority route became due a little later, but both are due now
+    scheduler.add_route(routes[0], deadline=990.0)
+    scheduler.add_route(routes[1], deadline=995.5)
+
+    assert scheduler.run(max_refreshes=2) == 2
+    assert seen == ["2024-01-11", "2024-01-10"]
+
+def test_load_watchlist_reports_invalid_schedule_fields():
+    with pytest.raises(WatchlistError) as excinfo:
+        load_watchlist(
+            [
+                _route("2024-01-10", refreshSeconds="soon"),
+                _route("2024-01-10", priority="high"),
+                _route("2024-01-10", refreshSeconds=-5, priority=1.5),
+            ]
+        )
+    assert [error.split(":")[0] for error in excinfo.value.errors] == ["routes[0]", "routes[1]", "routes[2]", "routes[2]"]
+    assert load_watchlist([_route("2024-01-10", priority="-2")])[0].priority == -2
+
+def test_cache_ttls_are_capped_below_each_route_refresh_interval():
+    policy = RefreshPolicy(min_seconds=60)
+    fixed, tiered = load_watchlist([_route("2099-01-02", refreshSeconds=30), _route("2099-01-02", destination="STN")])
+    options = {"ttlSeconds": 300, "maxEntries": 10, "routeTtlSeconds": {"vie-stn": 100, "VIE-BGY": 900}}
+
+    capped = cap_cache_ttls(options, [fixed, tiered], policy)
+    assert capped["routeTtlSeconds"] == {"VIE-BCN": 15, "VIE-STN": 100, "VIE-BGY": 900}
+    assert capped["ttlSeconds"] == 300 and capped["maxEntries"] == 10
+    assert cap_cache_ttls({"ttlSeconds": 30}, [tiered], policy)["routeTtlSeconds"] == {"VIE-STN": 30}
+    assert cap_cache_ttls(options, [tiered], RefreshPolicy(min_seconds=0, tiers=[(3, 0)])) is None
+
+def test_run_scheduler_caps_cache_ttl_and_rejects_snapshots(tmp_path: Path):
+    class CountingClient(DummyClient):
+        calls = 0
+
+        def search_flights(self, query):
+            CountingClient.calls += 1
+            return super().search_flights(query)
+
+    settings = {
+        "baseUrl": "https://example.test",
+        "outputFormat": "jsonl",
+        "cache": {"ttlSeconds": 300},
+        "minRefreshSeconds": 0,
+    }
+    route = _route("2099-01-02", refreshSeconds=0.01)
+    run_scheduler([route], settings, tmp_path / "watch.jsonl", CountingClient, max_refreshes=3)
+    assert CountingClient.calls == 3
+
+    with pytest.raises(ValueError, match="jsonl"):
+        run_scheduler([route], dict(settings, outputFormat="json", outputCompression="gzip"), tmp_path / "w.json.gz")
+    with pytest.raises(ValueError, match="snapshotPath"):
+        run_scheduler([route], dict(settings, snapshotPath=str(tmp_path / "s.json")), tmp_path / "w.jsonl", CountingClient)
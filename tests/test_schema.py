@@ -0,0 +1,59 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.parser import parse_availability_response  # noqa: E402
+from flights.schema import build_availability_decoder  # noqa: E402
+from utils.json_backend import available_backends, get_json_decoder  # noqa: E402
+
+from test_parser import _sample_response  # noqa: E402
+
+INSTALLED = [name for name, installed in available_backends().items() if installed]
+
+def _payload():
+    response = _sample_response()
+    response.update({"termsOfUse": "https://example.test/terms", "currency": "EUR"})
+    flight = response["trips"][0]["dates"][0]["flights"][0]
+    flight.update({"segments": [{"segmentNr": 0, "origin": "VIE"}], "infantsLeft": 18, "faresLeft": 4})
+    return json.dumps(response).encode("utf-8")
+
+@pytest.mark.parametrize("backend", INSTALLED)
+@pytest.mark.parametrize("schema", [True, False])
+def test_decoders_produce_identical_flights(backend, schema):
+    body = _payload()
+    expected = parse_availability_response(json.loads(body))
+    decoded = build_availability_decoder(schema=schema, backend=backend)(body)
+
+    flights = parse_availability_response(decoded)
+    for flight in flights + expected:
+        flight.pop("scrapedAt")
+    assert flights == expected
+    assert decoded["trips"][0]["dates"][0]["flights"][0]["faresLeft"] == 4
+
+@pytest.mark.parametrize("backend", INSTALLED)
+def test_malformed_json_raises_value_error(backend):
+    with pytest.raises(ValueError):
+        build_availability_decoder(backend=backend)(b'{"trips": [')
+
+def test_schema_decoder_drops_unused_fields_and_tolerates_type_drift():
+    pytest.importorskip("msgspec")
+    decode = build_availability_decoder(schema=True)
+
+    flight = decode(_payload())["trips"][0]["dates"][0]["flights"][0]
+    assert "segments" not in flight and "infantsLeft" not in flight
+
+    drifted = json.loads(_payload())
+    drifted["trips"][0]["dates"][0]["flights"][0]["duration"] = 140
+    assert decode(json.dumps(drifted))["trips"][0]["dates"][0]["flights"][0]["duration"] == 140
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_json_decoder("simdjson")
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from outputs.snapshot import FareSnapshot, SnapshotDiffer, diff_and_update, write_snapshot  # noqa: E402
+
+def _flight(key, price):
+    return {"Origin": "VIE", "Destination": "BCN", "key": key, "Price": price}
+
+def test_diff_reports_only_changes(tmp_path: Path):
+    path = tmp_path / "fares.snap"
+
+    first = diff_and_update(path, [_flight("a", 10.0), _flight("b", 20.0), _flight("c", None)])
+    assert [(d["change"], d["key"]) for d in first] == [("new", "a"), ("new", "b"), ("new", "c")]
+
+    second = diff_and_update(path, [_flight("a", 10.0), _flight("b", 25.0), _flight("c", None), _flight("d", 5.0)])
+    assert [(d["change"], d["key"], d["oldPrice"]) for d in second] == [
+        ("price", "b", 20.0),
+        ("new", "d", None),
+    ]
+    assert second[0]["Price"] == 25.0
+
+    third = diff_and_update(path, [_flight("a", 10.0), _flight("b", 25.0), _flight("c", None)])
+    assert third == [{"change": "removed", "key": "d", "oldPrice": 5.0}]
+
+def test_truncated_results_report_no_removals(tmp_path: Path):
+    path = tmp_path / "fares.snap"
+    write_snapshot(path, [("a", 1.0), ("b", 2.0), ("c", 3.0)])
+
+    # maxItems 2 cut off "c", which must not look removed
+    deltas = diff_and_update(path, [_flight("a", 1.0), _flight("b", 2.5)], max_items=2)
+    assert [(d["change"], d["key"]) for d in deltas] == [("price", "b")]
+    with FareSnapshot(path) as snapshot:
+        assert dict(snapshot.items()) == {"a": 1.0, "b": 2.5, "c": 3.0}
+
+    deltas = diff_and_update(path, [_flight("a", 1.0), _flight("b", 2.5)], max_items=5)
+    assert deltas == [{"change": "removed", "key": "c", "oldPrice": 3.0}]
+
+def test_carry_over_keeps_unseen_keys(tmp_path: Path):
+    path = tmp_path / "fares.snap"
+    write_snapshot(path, [("a", 1.0), ("b", 2.0)])
+
+    differ = SnapshotDiffer(path)
+    assert list(differ.feed_all([_flight("a", 1.5)]))[0]["change"] == "price"
+    differ.commit(carry_over_unseen=True)
+
+    with FareSnapshot(path) as snapshot:
+        assert dict(snapshot.items()) == {"a": 1.5, "b": 2.0}
+
+def test_snapshot_lookup_over_many_keys(tmp_path: Path):
+    path = tmp_path / "fares.snap"
+    write_snapshot(path, ((f"FR~{i}", float(i)) for i in range(20000)))
+
+    with FareSnapshot(path) as snapshot:
+        assert len(snapshot) == 20000
+        assert snapshot.get_price("FR~12345") == 12345.0
+        assert "FR~20000" not in snapshot
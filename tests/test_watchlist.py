@@ -0,0 +1,132 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on the path when running tests from repo root
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from flights.scheduler import load_watchlist  # noqa: E402
+from flights.validator import FlightSearchQuery  # noqa: E402
+from flights.watchlist import (  # noqa: E402
+    WatchlistError,
+    WatchlistSpec,
+    expand_specs,
+    expand_watchlist,
+    load_specs,
+    validate_search_inputs,
+)
+
+def test_spec_expands_weekdays_stays_and_profiles():
+    spec = WatchlistSpec.from_dict(
+        {
+            "origins": ["VIE", "vie", "BUD"],
+            "destinations": ["BCN", "BUD"],
+            "dates": {"from": "2030-06-03", "to": "2030-06-16", "weekdays": ["fri", "sat"]},
+            "stayNights": [2],
+            "passengers": [{"adults": 1}, {"adults": 2, "children": 1}, {"adults": 1}],
+        }
+    )
+    queries = list(spec.iter_queries())
+
+    # VIE-BCN, VIE-BUD, BUD-BCN; 4 matching days; 2 distinct passenger profiles
+    assert len(spec) == len(queries) == 3 * 4 * 2
+    first = queries[0]
+    assert (first.origin, first.destination, first.date_from, first.date_to) == ("VIE", "BCN", "2030-06-07", "2030-06-09")
+    assert first.trip_type == "ROUND_TRIP"
+    assert {q.date_from for q in queries} == {"2030-06-07", "2030-06-08", "2030-06-14", "2030-06-15"}
+
+def test_overlapping_specs_are_deduplicated():
+    queries = list(
+        expand_watchlist(
+            {
+                "defaults": {"dates": ["2030-06-01", "2030-06-02"]},
+                "specs": [
+                    {"origins": ["VIE"], "destinations": ["BCN", "STN"]},
+                    {"routes": [["VIE", "BCN"], ["BUD", "BCN"]]},
+                ],
+            }
+        )
+    )
+    routes = [(q.origin, q.destination, q.date_from) for q in queries]
+    assert len(routes) == len(set(routes)) == 6
+
+def test_all_errors_are_reported_together():
+    with pytest.raises(WatchlistError) as excinfo:
+        expand_watchlist(
+            {
+                "specs": [
+                    {"origins": ["VIE", "X1"], "destinations": ["BCN"], "dates": {"from": "2030-02-30"}},
+                    {"routes": [["VIE"]], "dates": ["2030-06-01"], "passengers": [{"adults": 0}], "currency": "EURO"},
+                ]
+            }
+        )
+    errors = excinfo.value.errors
+    assert len(errors) == 5
+    assert errors[0].startswith("specs[0]: Invalid origins")
+    assert any("specs[1]" in e and "currency" in e.lower() for e in errors)
+
+def test_validate_search_inputs_collects_errors_and_dedupes():
+    entry = {"origin": "VIE", "destination": "BCN", "dateFrom": "2030-06-01", "tripType": "ONE_WAY"}
+    assert len(validate_search_inputs([entry, dict(entry)])) == 1
+
+    with pytest.raises(WatchlistError) as excinfo:
+        validate_search_inputs([entry, {"origin": "VIE"}, dict(entry, dateFrom="June")])
+    assert [e.split(":")[0] for e in excinfo.value.errors] == ["#1", "#2"]
+
+def test_dedupe_keeps_queries_that_differ_in_locale_or_max_items():
+    entry = {"origin": "VIE", "destination": "BCN", "dateFrom": "2030-06-01", "tripType": "ONE_WAY"}
+    queries = validate_search_inputs([entry, dict(entry, locale="de-de"), dict(entry, maxItems=5), dict(entry)])
+    assert [(q.locale, q.max_items) for q in queries] == [("en-gb", None), ("de-de", None), ("en-gb", 5)]
+
+    spec = {"origins": ["VIE"], "destinations": ["BCN"], "dates": ["2030-06-01"]}
+    specs = load_specs({"specs": [spec, dict(spec, locale="de-de"), dict(spec, maxItems=5)]})
+    assert len(list(expand_specs(specs))) == 3
+
+def test_booleans_are_not_weekdays_or_stay_nights():
+    spec = {"origins": ["VIE"], "destinations": ["BCN"], "dates": {"from": "2030-06-01", "weekdays": [True]}}
+    with pytest.raises(WatchlistError) as excinfo:
+        WatchlistSpec.from_dict(dict(spec, stayNights=[False, 3]))
+    assert len(excinfo.value.errors) == 2
+    assert any("weekday" in e for e in excinfo.value.errors)
+    assert any("stayNights" in e and "False" in e for e in excinfo.value.errors)
+
+def test_scheduler_loads_spec_watchlists():
+    routes = load_watchlist(
+        {"origins": ["VIE"], "destinations": ["BCN"], "dates": ["2030-06-01"], "refreshSeconds": 600, "priority": 2}
+    )
+    assert len(routes) == 1
+    assert isinstance(routes[0].query, FlightSearchQuery)
+    assert (routes[0].refresh_seconds, routes[0].priority) == (600.0, 2)
+
+    with pytest.raises(WatchlistError) as excinfo:
+        load_watchlist([{"origin": "VIE"}, {"origin": "VIE", "destination": "BCN", "dateFrom": "x", "tripType": "ONE_WAY"}])
+    assert len(excinfo.value.errors) == 2
+
+def test_expands_100k_queries_quickly():
+    airports = [chr(65 + i // 26) + chr(65 + i % 26) + "X" for i in range(50)]
+    started = time.perf_counter()
+    queries = list(
+        expand_watchlist(
+            {
+                "origins": airports[:10],
+                "destinations": airports[10:],
+                "dates": {"from": "2030-01-01", "to": "2030-04-10"},
+                "passengers": [{"adults": 1}, {"adults": 2}, {"adults": 2, "children": 2}],
+            }
+        )
+    )
+    elapsed = time.perf_counter() - started
+    assert len(queries) == 10 * 40 * 100 * 3
+    assert elapsed < 2.0
+
+def test_spec_schedule_fields_are_validated_with_the_rest():
+    with pytest.raises(WatchlistError) as excinfo:
+        WatchlistSpec.from_dict(
+            {"origins": ["VIE"], "destinations": ["X"], "dates": ["2030-06-01"], "refreshSeconds": "x", "priority": None}
+        )
+    assert len(excinfo.value.errors) == 3